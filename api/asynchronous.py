@@ -0,0 +1,158 @@
+"""
+Async views & middleware for the ASGI deployment
+
+Django 3.1 has no async ORM yet, so the async views keep the event loop for everything but the database: the
+ORM work of a request runs in one hop on a thread of the database pool, with `database_sync_to_async`, while
+middleware, authentication, content negotiation & exception handling run on the loop. A thread is thus only
+held while the database is being used rather than for the whole request. The request's execute wrappers
+(metrics, Server-Timing, slow query log) follow its queries to the database threads.
+"""
+import asyncio
+import functools
+import inspect
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connections
+
+try:
+    from asgiref.sync import markcoroutinefunction
+except ImportError:  # asgiref < 3.7
+    def markcoroutinefunction(func):
+        """
+        Mark an object whose calls return coroutines as a coroutine function, like asgiref 3.7+ does
+        """
+
+        if hasattr(inspect, 'markcoroutinefunction'):
+            return inspect.markcoroutinefunction(func)
+        marker = getattr(asyncio.coroutines, '_is_coroutine', None)
+        if marker is not None:
+            func._is_coroutine = marker
+        return func
+
+
+# Execute wrappers of the request being handled, installed on the connection of every thread that queries for it
+request_execute_wrappers = ContextVar('request_execute_wrappers', default=())
+
+
+@contextmanager
+def execute_wrapper(wrapper):
+    """
+    Install an execute wrapper on the connections for the rest of the request, the queries that async views run
+    on database threads included
+    """
+
+    token = request_execute_wrappers.set(request_execute_wrappers.get() + (wrapper,))
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(wrapper))
+            yield
+    finally:
+        request_execute_wrappers.reset(token)
+
+
+def database_sync_to_async(func):
+    """
+    Turn a function using the ORM into a coroutine function running it on a database thread
+
+    Database threads keep their connection between calls, which are closed once unusable or older than
+    CONN_MAX_AGE like the connections of request threads.
+    """
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            with ExitStack() as stack:
+                for wrapper in request_execute_wrappers.get():
+                    for alias in connections:
+                        stack.enter_context(connections[alias].execute_wrapper(wrapper))
+                return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+class AsyncCapableMiddleware:
+    """
+    Base class of middleware that wrap the handling of requests, running on the event loop under ASGI
+
+    Subclasses set the request up in `handling()`, a context manager around the rest of the chain, and look at
+    the response in `process_response()`.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Tell Django the middleware is to be awaited, like django.utils.deprecation.MiddlewareMixin does
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        with self.handling(request):
+            response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        with self.handling(request):
+            response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    @contextmanager
+    def handling(self, request):
+        yield
+
+    def process_response(self, request, response):
+        return response
+
+
+class AsyncAPIViewMixin:
+    """
+    Turn a DRF view into an async view, whose handlers run on a database thread
+
+    Authentication & permission checks must not hit the database, which holds for the token authentication
+    of the API since it loads users lazily.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super(AsyncAPIViewMixin, cls).as_view(**initkwargs)
+
+        @functools.wraps(view)
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        return async_view
+
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        `APIView.dispatch()` running the handler on a database thread
+        """
+
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.initial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = await database_sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
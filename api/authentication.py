@@ -0,0 +1,146 @@
+import copy
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from api.replica import primary_reads
+from api.timing import timed
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified access tokens and of the users they were issued to
+
+    An entry lives until its token expires, for JWT_AUTH_CACHE_TTL seconds at most so that changes made to a
+    user by other processes are picked up, and is evicted right away when the user is saved or deleted here.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.user_tokens = defaultdict(set)
+
+    def get(self, raw_token):
+        """
+        Return the entry of a token, a [validated token, user id, cached user] list, or None
+        """
+
+        with self._lock:
+            entry = self.entries.get(raw_token)
+            if entry is None:
+                return None
+            if entry[3] <= time.time():
+                self._remove(raw_token)
+                return None
+            self.entries.move_to_end(raw_token)
+            return entry
+
+    def add(self, raw_token, validated_token, user_id):
+        expires = min(validated_token['exp'], time.time() + settings.JWT_AUTH_CACHE_TTL)
+        entry = [validated_token, user_id, None, expires]
+        with self._lock:
+            self._remove(raw_token)
+            self.entries[raw_token] = entry
+            self.user_tokens[user_id].add(raw_token)
+            while len(self.entries) > settings.JWT_AUTH_CACHE_SIZE:
+                self._remove(next(iter(self.entries)))
+        return entry
+
+    def evict_user(self, user_id):
+        """
+        Forget the tokens of a user, so that the next request of the user loads it again
+        """
+
+        with self._lock:
+            for raw_token in self.user_tokens.pop(user_id, ()):
+                self.entries.pop(raw_token, None)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.user_tokens.clear()
+
+    def _remove(self, raw_token):
+        entry = self.entries.pop(raw_token, None)
+        if entry is not None:
+            tokens = self.user_tokens[entry[1]]
+            tokens.discard(raw_token)
+            if not tokens:
+                del self.user_tokens[entry[1]]
+
+
+token_cache = TokenCache()
+
+
+class TokenUser(SimpleLazyObject):
+    """
+    The user of a verified token, whose User row is only loaded once something else than its id is needed
+
+    Views that only filter by the logged in user (`user_id=request.user.pk`) never load it at all.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, load):
+        self.__dict__['_user_id'] = user_id
+        super(TokenUser, self).__init__(load)
+
+    @property
+    def pk(self):
+        return self._user_id
+
+    id = pk
+
+    def __bool__(self):
+        # Permission checks like `request.user and request.user.is_authenticated` must not load the user
+        return True
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    JWT authentication that verifies every token once and loads its user lazily
+
+    Tokens are kept in a bounded LRU cache once verified, along with their user once it has been loaded.
+    Timed as the auth metric of the Server-Timing header.
+    """
+
+    def authenticate(self, request):
+        with timed('auth'):
+            header = self.get_header(request)
+            if header is None:
+                return None
+
+            raw_token = self.get_raw_token(header)
+            if raw_token is None:
+                return None
+
+            entry = token_cache.get(raw_token)
+            if entry is None:
+                validated_token = self.get_validated_token(raw_token)
+                try:
+                    user_id = validated_token[api_settings.USER_ID_CLAIM]
+                except KeyError:
+                    raise InvalidToken(_('Token contained no recognizable user identification'))
+                entry = token_cache.add(raw_token, validated_token, user_id)
+
+            return TokenUser(entry[1], lambda: self.load_user(entry)), entry[0]
+
+    def load_user(self, entry):
+        """
+        Return a copy of the cached user of a token entry, loading the user first if needed
+        """
+
+        if entry[2] is None:
+            # A user who has just signed up may not have been copied to the replica yet
+            with primary_reads():
+                entry[2] = self.get_user(entry[0])
+        # Every request gets its own instance, the cached one is shared between threads
+        return copy.copy(entry[2])
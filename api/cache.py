@@ -0,0 +1,150 @@
+"""
+Versioned caching of API responses
+
+Cached entries are keyed on a global content version which is bumped on every write, so that entries
+never have to be invalidated one by one: once the version moves on they are simply never read again
+and the cache backend expires them.
+"""
+import hashlib
+import random
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from api.metrics import cache_requests
+from api.replica import replica_generation
+
+CONTENT_VERSION_KEY = 'api:content-version'
+
+
+def get_content_version():
+    """
+    Return the current content version, initializing it if the cache does not hold one
+    """
+
+    version = cache.get(CONTENT_VERSION_KEY)
+    if version is None:
+        # Start from a random version rather than 1, so that a version that got evicted from the cache
+        # does not start over from a value that entries were already cached under
+        cache.add(CONTENT_VERSION_KEY, random.getrandbits(48), timeout=None)
+        version = cache.get(CONTENT_VERSION_KEY)
+    return version
+
+
+def get_read_version():
+    """
+    Return the version of the content the current request reads, which is the content version along with the
+    generation of the replica for requests reading from it
+
+    Entries cached from the replica are keyed on its generation, so that data copied before the last write is
+    cached no longer than that copy is read.
+    """
+
+    version = get_content_version()
+    generation = replica_generation()
+    return version if generation is None else '%s.%s' % (version, generation)
+
+
+def bump_content_version():
+    """
+    Move the content version on, so that every response cached so far is stale
+
+    The version is bumped right away and once more when the current transaction commits, so responses that
+    concurrent requests cached while the transaction was still running are dropped as well.
+    """
+
+    def bump():
+        try:
+            cache.incr(CONTENT_VERSION_KEY)
+        except ValueError:
+            get_content_version()
+
+    bump()
+    transaction.on_commit(bump)
+
+
+class CacheStats:
+    """
+    In-process hit/miss counters of a cache, also counted in the `cache_requests_total` metric
+    """
+
+    def __init__(self, name):
+        self._lock = threading.Lock()
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        cache_requests.inc(self.name, 'hit' if hit else 'miss')
+
+    def snapshot(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+response_cache_stats = CacheStats('response')
+pagination_count_stats = CacheStats('pagination_count')
+
+
+def response_cache_key(request, etag=None):
+    """
+    Build the cache key of a request from its url and normalized query parameters at the version it reads
+
+    The ETag of the response, when known, is part of the key as well: the content version only moves on with
+    the writes of the current process (unless the cache is shared), while the ETag is derived from the database,
+    so that a cached body is never served along with the ETag of another one.
+    """
+
+    params = sorted(
+        (name, value) for name, values in request.query_params.lists() for value in values if value != ''
+    )
+    # The absolute url is part of the key, as responses embed it in their pagination links
+    fingerprint = '%s?%r:%s' % (request.build_absolute_uri(request.path), params, etag)
+    return 'api:response:%s:%s' % (get_read_version(), hashlib.md5(fingerprint.encode('utf-8')).hexdigest())
+
+
+class AnonymousListCacheMixin:
+    """
+    Serve the list responses of anonymous users from the cache
+
+    Anonymous users all get the same response for the same query parameters, so only the first
+    one after a write pays for the queries and the serialization. Combined with ConditionalGetMixin,
+    responses are cached per ETag.
+    """
+
+    cache_timeout = 300
+
+    def list(self, request, *args, **kwargs):
+        if not request.user.is_anonymous:
+            return super(AnonymousListCacheMixin, self).list(request, *args, **kwargs)
+
+        key = response_cache_key(request, getattr(self, 'etag', None))
+        data = cache.get(key)
+        response_cache_stats.record(hit=data is not None)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super(AnonymousListCacheMixin, self).list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.cache_timeout)
+        response['X-Cache'] = 'MISS'
+        return response
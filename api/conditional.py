@@ -0,0 +1,55 @@
+"""
+Conditional GET support for the API resources
+
+Views derive an ETag and a Last-Modified date from a small aggregate query, so that clients revalidating
+an unchanged resource get a 304 without the resource being queried, serialized or rendered.
+"""
+import calendar
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET requests with validators and return 304 Not Modified when the client's copy is still current
+
+    Runs after authentication and permission checks, so unauthorized requests never get a 304.
+    """
+
+    # Whether the response depends on the logged in user, who is then part of the ETag
+    per_user_etag = False
+
+    # ETag of the response being served, for e.g. cached responses to be keyed on it
+    etag = None
+
+    def get_validators(self):
+        """
+        Return a tuple of values that changes whenever the response changes, and the last modification date
+        of the resource, or (None, None) when it can not be determined
+        """
+
+        raise NotImplementedError('`get_validators()` must be implemented.')
+
+    def get(self, request, *args, **kwargs):
+        values, last_modified = self.get_validators()
+        if values is None:
+            return super(ConditionalGetMixin, self).get(request, *args, **kwargs)
+
+        if self.per_user_etag:
+            values = (request.user.pk,) + tuple(values)
+        etag = self.etag = quote_etag(hashlib.md5(repr(values).encode('utf-8')).hexdigest())
+        last_modified = calendar.timegm(last_modified.utctimetuple()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super(ConditionalGetMixin, self).get(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            if self.per_user_etag:
+                patch_vary_headers(response, ('Authorization',))
+        return response
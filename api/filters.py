@@ -0,0 +1,58 @@
+"""
+Full-text search of the movie list, over the FTS5 index of movie titles & descriptions (see MovieSearch)
+"""
+from django.db.models import F
+from rest_framework import filters
+
+
+class MovieSearchFilter(filters.SearchFilter):
+    """
+    Filter the movies matching every term of the `search` parameter
+
+    Terms are matched as whole words, regardless of case & diacritics, in the title or the description, instead
+    of the `LIKE '%term%'` scan of every row DRF's SearchFilter would run.
+    """
+
+    search_description = 'Words the title or description of the movies must contain, ranked by relevance'
+
+    def get_search_query(self, request):
+        """
+        Return the FTS5 query of the search terms, each one quoted so that it is searched for as is
+        """
+
+        return ' '.join('"%s"' % term.replace('"', '""') for term in self.get_search_terms(request))
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+        return queryset.filter(search__document__match=query)
+
+
+class RankOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that orders searches by their bm25 `rank` as well, the best matches first by default
+
+    The rank is only selected when ordering by it, as SQLite would otherwise compute it for every match of the
+    search before sorting them, e.g. by date.
+    """
+
+    def is_search(self, request):
+        return bool(MovieSearchFilter().get_search_terms(request))
+
+    def get_ordering(self, request, queryset, view):
+        if self.is_search(request) and not request.query_params.get(self.ordering_param):
+            return ('rank',)
+        return super(RankOrderingFilter, self).get_ordering(request, queryset, view)
+
+    def get_valid_fields(self, queryset, view, context={}):
+        valid_fields = super(RankOrderingFilter, self).get_valid_fields(queryset, view, context)
+        if 'request' in context and self.is_search(context['request']):
+            valid_fields = list(valid_fields) + [('rank', 'rank')]
+        return valid_fields
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if ordering and any(field.lstrip('-') == 'rank' for field in ordering):
+            queryset = queryset.annotate(rank=F('search__rank'))
+        return super(RankOrderingFilter, self).filter_queryset(request, queryset, view)
@@ -0,0 +1,150 @@
+"""
+Password hashing off the request threads
+
+The password hashers are slow on purpose, a PBKDF2 hash takes a few hundred milliseconds of CPU. make_password &
+check_password run them on a pool of PASSWORD_HASHING_WORKERS threads, or processes with
+PASSWORD_HASHING_EXECUTOR = 'process' for hashers that hold the GIL. At most PASSWORD_HASHING_QUEUE more hashes
+wait for a worker, any further one is turned down with a 429 response and a Retry-After header, so a burst of
+signups or logins only ever takes a bounded share of the CPU and of the request threads of a server worker. As
+the request threads wait for the hashes they send, hashes in flight are also capped to one less than the
+REQUEST_THREADS of a server worker, for a thread to always be left to serve other requests.
+"""
+import math
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import Throttled
+
+from api.metrics import Counter, Histogram
+
+hash_duration = Histogram('password_hash_duration_seconds', 'Time spent hashing passwords by operation',
+                          ('operation',))
+hash_wait = Histogram('password_hash_wait_seconds', 'Time password hashes waited for a worker by operation',
+                      ('operation',))
+hash_rejected = Counter('password_hash_rejected_total', 'Password hashes turned down with a full queue by operation',
+                        ('operation',))
+
+
+class HashingBusy(Throttled):
+    default_detail = _('Too many passwords are being checked right now.')
+    default_code = 'hashing_busy'
+
+
+def timed_call(func, *args):
+    """
+    Call func on a worker, returning its result and the time it took
+    """
+
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class HashingPool:
+    """
+    Pool of workers running password hashes, with a bounded number of hashes in flight
+    """
+
+    def __init__(self, executor, workers, queue_size, request_threads):
+        self.workers = workers
+        self.capacity = max(1, min(workers + queue_size, request_threads - 1))
+        self.mean_duration = None
+        if not workers:
+            self.executor = None
+        elif executor == 'process':
+            self.executor = ProcessPoolExecutor(workers, initializer=django.setup)
+        else:
+            self.executor = ThreadPoolExecutor(workers, thread_name_prefix='password-hashing')
+        self.slots = threading.BoundedSemaphore(self.capacity)
+
+    def run(self, operation, func, *args):
+        """
+        Run func on a worker and wait for its result, raising HashingBusy when too many hashes are in flight
+        """
+
+        start = time.perf_counter()
+        if self.executor is None:
+            result, duration = timed_call(func, *args)
+        else:
+            if not self.slots.acquire(blocking=False):
+                hash_rejected.inc(operation)
+                raise HashingBusy(wait=self.retry_after())
+            try:
+                result, duration = self.executor.submit(timed_call, func, *args).result()
+            finally:
+                self.slots.release()
+
+        hash_duration.observe(duration, operation)
+        hash_wait.observe(max(0.0, time.perf_counter() - start - duration), operation)
+        self.mean_duration = duration if self.mean_duration is None else 0.9 * self.mean_duration + 0.1 * duration
+        return result
+
+    def retry_after(self):
+        """
+        Return the seconds it should take the workers to go through the hashes in flight
+        """
+
+        return max(1, math.ceil(self.capacity * (self.mean_duration or 0) / self.workers))
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(settings.PASSWORD_HASHING_EXECUTOR, settings.PASSWORD_HASHING_WORKERS,
+                                    settings.PASSWORD_HASHING_QUEUE, settings.REQUEST_THREADS)
+    return _pool
+
+
+@receiver(setting_changed)
+def reset_pool(setting, **kwargs):
+    global _pool
+    if (setting.startswith('PASSWORD_HASHING_') or setting == 'REQUEST_THREADS') and _pool is not None:
+        with _pool_lock:
+            _pool.shutdown()
+            _pool = None
+
+
+def make_password(password):
+    """
+    Hash a password like django.contrib.auth.hashers.make_password, on the hashing pool
+    """
+
+    if password is None:
+        # Unusable passwords cost nothing to make
+        return hashers.make_password(None)
+    return get_pool().run('make', hashers.make_password, password)
+
+
+def check_password(password, encoded, setter=None):
+    """
+    Check a password like django.contrib.auth.hashers.check_password, on the hashing pool
+
+    The setter is called on the calling thread, with the password, when the hash is to be upgraded.
+    """
+
+    if password is None or not hashers.is_password_usable(encoded):
+        return False
+
+    is_correct = get_pool().run('check', hashers.check_password, password, encoded)
+    if setter and is_correct:
+        preferred = hashers.get_hasher('default')
+        if hashers.identify_hasher(encoded).algorithm != preferred.algorithm or preferred.must_update(encoded):
+            setter(password)
+    return is_correct
@@ -0,0 +1,206 @@
+"""
+Helpers of the management commands that write rows in bulk
+"""
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.db import connection, transaction
+
+
+def chunked(iterable, size):
+    """
+    Yield lists of up to `size` consecutive items of the iterable, without reading it any further ahead
+    """
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@contextmanager
+def keep_timestamps(*models):
+    """
+    Let bulk inserts keep the dates set on the instances of the models' `auto_now`/`auto_now_add` fields,
+    instead of overriding them with the current time
+    """
+
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+@contextmanager
+def deferred_indexes(model):
+    """
+    Drop the plain (non unique) indexes of the model's table and create them again on exit
+
+    Building an index once over all rows is several times faster than updating it on every insert. Meant to
+    be used inside a transaction, so that on databases with transactional DDL a failed insert leaves the
+    indexes in place. The indexes are created again when the block raises as well, unless the transaction
+    has to be rolled back.
+    """
+
+    table = model._meta.db_table
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        indexes = {
+            name: constraint for name, constraint in connection.introspection.get_constraints(cursor, table).items()
+            if constraint['index'] and not constraint['unique'] and not constraint['primary_key']
+        }
+        for name in indexes:
+            cursor.execute('DROP INDEX %s' % quote_name(name))
+
+    try:
+        yield
+    finally:
+        # Rolling the failed transaction back restores the dropped indexes, it no longer accepts queries anyway
+        if not connection.needs_rollback:
+            with connection.cursor() as cursor:
+                for name, constraint in indexes.items():
+                    orders = constraint.get('orders') or ['ASC'] * len(constraint['columns'])
+                    cursor.execute('CREATE INDEX %s ON %s (%s)' % (quote_name(name), quote_name(table), ', '.join(
+                        '%s %s' % (quote_name(column), order)
+                        for column, order in zip(constraint['columns'], orders))))
+
+
+class BulkInserter:
+    """
+    Insert a stream of model instances with `bulk_create`, `batch_size` rows per INSERT and `transaction_size`
+    rows per transaction, so memory stays bounded by a single transaction's rows whatever the stream's length
+
+    `rows` counts the instances sent to the database and `inserted` the rows it actually inserted, fewer when
+    conflicting rows are ignored.
+    """
+
+    def __init__(self, model, batch_size=1000, transaction_size=10000, ignore_conflicts=True, on_progress=None):
+        self.model = model
+        self.batch_size = batch_size
+        self.transaction_size = transaction_size
+        self.ignore_conflicts = ignore_conflicts
+        self.on_progress = on_progress
+        self.rows = 0
+        self.inserted = 0
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        """
+        Rows inserted per second so far
+        """
+
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def insert(self, instances):
+        """
+        Insert all instances of the iterable and return the number of rows sent to the database
+        """
+
+        start = time.perf_counter()
+        for chunk in chunked(instances, self.transaction_size):
+            with transaction.atomic(), connection.execute_wrapper(self.count_inserted):
+                self.model.objects.bulk_create(chunk, batch_size=self.batch_size,
+                                               ignore_conflicts=self.ignore_conflicts)
+            self.rows += len(chunk)
+            self.elapsed = time.perf_counter() - start
+            if self.on_progress:
+                self.on_progress(self)
+        return self.rows
+
+    def count_inserted(self, execute, sql, params, many, context):
+        """
+        Execute wrapper adding the rows the INSERTs of `bulk_create` inserted, i.e. SQLite's `changes()`
+        """
+
+        result = execute(sql, params, many, context)
+        self.inserted += max(context['cursor'].rowcount, 0)
+        return result
+
+
+def insert_rows(model, fields, rows, transaction_size=10000, on_progress=None):
+    """
+    Insert tuples of field values with a raw `executemany`, `transaction_size` rows per transaction
+
+    Skips building a model instance per row, for generated rows that are known to be valid and unique.
+    Returns the number of rows inserted.
+    """
+
+    fields = [model._meta.get_field(name) for name in fields]
+    quote_name = connection.ops.quote_name
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        quote_name(model._meta.db_table),
+        ', '.join(quote_name(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    return execute_rows(sql, fields, rows, transaction_size, on_progress)
+
+
+def update_rows(model, fields, rows, transaction_size=10000):
+    """
+    Update fields of rows by primary key with a raw `executemany`, from tuples of the field values and the key
+
+    Skips the `CASE WHEN` expression of every row that `QuerySet.bulk_update()` builds & compiles.
+    Returns the number of rows given.
+    """
+
+    fields = [model._meta.get_field(name) for name in fields]
+    quote_name = connection.ops.quote_name
+    sql = 'UPDATE %s SET %s WHERE %s = %%s' % (
+        quote_name(model._meta.db_table),
+        ', '.join('%s = %%s' % quote_name(field.column) for field in fields),
+        quote_name(model._meta.pk.column),
+    )
+    return execute_rows(sql, fields + [model._meta.pk], rows, transaction_size)
+
+
+def delete_rows(queryset):
+    """
+    Delete the rows of the queryset with a single raw `DELETE` of the primary keys it selects
+
+    Skips the per-row cascades & signals of `QuerySet.delete()`, for rows whose dependent rows are deleted first.
+    Returns the number of rows deleted.
+    """
+
+    model = queryset.model
+    quote_name = connection.ops.quote_name
+    subquery, params = queryset.order_by().values('pk').query.sql_with_params()
+    sql = 'DELETE FROM %s WHERE %s IN (%s)' % (
+        quote_name(model._meta.db_table), quote_name(model._meta.pk.column), subquery)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def execute_rows(sql, fields, rows, transaction_size, on_progress=None):
+    """
+    Execute the statement for every tuple of field values, `transaction_size` rows per transaction
+    """
+
+    converters = [
+        connection.ops.adapt_datetimefield_value if field.get_internal_type() == 'DateTimeField' else None
+        for field in fields
+    ]
+    if any(converters):
+        rows = (tuple(value if convert is None else convert(value) for convert, value in zip(converters, row))
+                for row in rows)
+
+    executed = 0
+    for chunk in chunked(rows, transaction_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, chunk)
+        executed += len(chunk)
+        if on_progress:
+            on_progress(executed)
+    return executed
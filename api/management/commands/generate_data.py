@@ -0,0 +1,206 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.cache import bump_content_version
+from api.management.bulk import BulkInserter, deferred_indexes, delete_rows, insert_rows, keep_timestamps
+from api.management.commands.reconcile_vote_counts import Command as ReconcileCommand
+from api.models import User, Movie, Vote
+
+
+class Command(BaseCommand):
+    """
+    Generates a seeded, production shaped data set of users, movies and votes
+
+    Movie popularity and voter activity both follow a Zipf distribution, so a few hot movies get most of
+    the votes and a few heavy voters cast most of them, while every movie has its own like/hate ratio
+    spread around `--like-ratio`. The same seed always produces the same rows, dated relative to today.
+    Votes are generated lazily and written with a raw `executemany` before their indexes are rebuilt, so a
+    million of them take seconds rather than the hours of saving them one by one.
+    """
+
+    help = 'Generate a seeded synthetic data set with Zipf distributed votes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to generate')
+        parser.add_argument('--movies', type=int, default=10000, help='Number of movies to generate')
+        parser.add_argument('--votes', type=int, default=100000, help='Approximate number of votes to generate')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator')
+        parser.add_argument('--movie-skew', type=float, default=1.1,
+                            help='Zipf exponent of the movie popularity, higher means hotter hot movies')
+        parser.add_argument('--voter-skew', type=float, default=1.0,
+                            help='Zipf exponent of the voter activity, higher means heavier heavy voters')
+        parser.add_argument('--like-ratio', type=float, default=0.7, help='Average share of likes among votes')
+        parser.add_argument('--days', type=int, default=365, help='Number of days the data set spans')
+        parser.add_argument('--prefix', default='synthetic', help='Prefix of the generated usernames & titles')
+        parser.add_argument('--password', default='Testing-123', help='Password of every generated user')
+        parser.add_argument('--flush', action='store_true',
+                            help='Delete a data set previously generated with the prefix')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows per INSERT')
+        parser.add_argument('--transaction-size', type=int, default=50000, help='Number of rows per transaction')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.prefix = options['prefix'] + '_'
+        self.end = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start = self.end - timedelta(days=options['days'])
+
+        users = User.objects.filter(username__startswith=self.prefix)
+        if not options['flush'] and users.exists():
+            raise CommandError('A data set with the prefix %r already exists, use --flush to replace it'
+                               % options['prefix'])
+
+        start = time.perf_counter()
+        # A single transaction, so that a failure never leaves a partial data set or the votes without indexes
+        with transaction.atomic(), deferred_indexes(Vote):
+            if options['flush']:
+                self.flush(users)
+            with keep_timestamps(User, Movie):
+                self.timed('users', lambda: BulkInserter(
+                    User, options['batch_size'], options['transaction_size']).insert(self.build_users()))
+                users = list(users.order_by('id').values_list('id', 'created'))
+                self.timed('movies', lambda: BulkInserter(
+                    Movie, options['batch_size'], options['transaction_size']).insert(self.build_movies(users)))
+            movies = list(Movie.objects.filter(title__startswith=self.prefix).order_by('id')
+                          .values_list('id', 'user_id', 'created'))
+            self.timed('votes', lambda: insert_rows(
+                Vote, ('user', 'movie', 'reaction', 'created'), self.build_votes(users, movies),
+                transaction_size=options['transaction_size']))
+
+        # The raw inserts bypass Vote.save(), count the votes of all generated movies in a single UPDATE
+        Movie.objects.filter(title__startswith=self.prefix).update(
+            likes_count=ReconcileCommand.vote_count(Vote.SupportedMovieVotes.LIKE),
+            hates_count=ReconcileCommand.vote_count(Vote.SupportedMovieVotes.HATE),
+        )
+        bump_content_version()
+        self.stdout.write(self.style.SUCCESS('Generated the data set in %.1fs' % (time.perf_counter() - start)))
+
+    def timed(self, name, insert):
+        start = time.perf_counter()
+        rows = insert()
+        elapsed = time.perf_counter() - start
+        self.stdout.write('%d %s in %.1fs (%d rows/s)' % (rows, name, elapsed, rows / elapsed if elapsed else 0))
+
+    def flush(self, users):
+        """
+        Delete the previously generated rows, skipping the per-row cascades & signals of `QuerySet.delete()`
+        """
+
+        movies = Movie.objects.filter(title__startswith=self.prefix)
+        for queryset in (Vote.objects.filter(user__in=users), Vote.objects.filter(movie__in=movies),
+                         Movie.objects.filter(user__in=users), movies, users):
+            delete_rows(queryset)
+
+    def random_date(self, after):
+        return after + (self.end - after) * self.rng.random()
+
+    def build_users(self):
+        password = make_password(self.options['password'])
+        for i in range(self.options['users']):
+            created = self.random_date(self.start)
+            yield User(username='%s%d' % (self.prefix, i), email='%s%d@example.com' % (self.prefix, i),
+                       first_name='Synthetic', last_name='User %d' % i, password=password,
+                       created=created, updated=created)
+
+    def build_movies(self, users):
+        # Heavy voters tend to be heavy submitters as well
+        submitters = zipf_cum_weights(len(users), self.options['voter_skew'])
+        for i in range(self.options['movies']):
+            user_id, user_created = self.rng.choices(users, cum_weights=submitters)[0]
+            created = self.random_date(user_created)
+            yield Movie(title='%s%d' % (self.prefix, i), description='Synthetic movie %d' % i,
+                        user_id=user_id, created=created, updated=created)
+
+    def build_votes(self, users, movies):
+        """
+        Lazily generate the (user, movie, reaction, created) rows of the vote matrix
+        """
+
+        rng = self.rng
+        if not users or not movies:
+            return
+
+        # Shuffle which movies are hot and which users vote the most
+        popularity = list(range(len(movies)))
+        rng.shuffle(popularity)
+        popularity_weights = zipf_cum_weights(len(movies), self.options['movie_skew'])
+        activity = list(range(len(users)))
+        rng.shuffle(activity)
+
+        # Every movie gets its own like probability around the average like ratio
+        ratio = min(max(self.options['like_ratio'], 0.01), 0.99)
+        like_probability = [rng.betavariate(ratio * 4, (1 - ratio) * 4) for _ in movies]
+
+        # Nobody votes for more than half of the movies so that weighted sampling without replacement converges
+        cap = max(len(movies) // 2, 1)
+        wanted_votes = allot(self.options['votes'], zipf_weights(len(users), self.options['voter_skew']), cap)
+        for user_index, wanted in zip(activity, wanted_votes):
+            if not wanted:
+                continue
+            user_id, user_created = users[user_index]
+
+            picked = {}
+            for _ in range(8):
+                for index in rng.choices(popularity, cum_weights=popularity_weights, k=(wanted - len(picked)) * 2):
+                    if movies[index][1] != user_id:
+                        picked.setdefault(index, None)
+                if len(picked) >= wanted:
+                    break
+            else:
+                # Fill up with the movies a heavily skewed distribution hardly ever picks, from a random rank on
+                offset = rng.randrange(len(movies))
+                for index in reversed(popularity[offset:] + popularity[:offset]):
+                    if movies[index][1] != user_id:
+                        picked.setdefault(index, None)
+                        if len(picked) >= wanted:
+                            break
+
+            for index in list(picked)[:wanted]:
+                movie_id, owner_id, movie_created = movies[index]
+                reaction = 'like' if rng.random() < like_probability[index] else 'hate'
+                yield user_id, movie_id, reaction, self.random_date(max(user_created, movie_created))
+
+
+def allot(total, weights, cap):
+    """
+    Split the total into counts proportional to the weights, none of them above the cap
+    """
+
+    counts = [0] * len(weights)
+    uncapped = list(range(len(weights)))
+    while total > 0 and uncapped:
+        weight = sum(weights[i] for i in uncapped)
+        capped = [i for i in uncapped if total * weights[i] / weight >= cap]
+        if not capped:
+            for i in uncapped:
+                counts[i] = round(total * weights[i] / weight)
+            break
+        # Hand the share of the capped counts over to the rest
+        for i in capped:
+            counts[i] = cap
+        total -= cap * len(capped)
+        uncapped = [i for i in uncapped if not counts[i]]
+    return counts
+
+
+def zipf_weights(n, exponent):
+    """
+    Return the weights of the ranks 1..n under a Zipf distribution with the given exponent
+    """
+
+    return [1 / rank ** exponent for rank in range(1, n + 1)]
+
+
+def zipf_cum_weights(n, exponent):
+    """
+    Return the cumulative Zipf weights of the ranks 1..n, for `random.choices`
+    """
+
+    return list(accumulate(zipf_weights(n, exponent)))
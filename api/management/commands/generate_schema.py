@@ -0,0 +1,27 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from movierama.schema import generate_schema
+
+
+class Command(BaseCommand):
+    """
+    Writes the OpenAPI schema of the API to disk, for the documentation view to serve it as is
+
+    Run at build time and whenever the API changes, the view generates the schema itself if the file is missing.
+    """
+
+    help = 'Write the OpenAPI schema of the API to the OPENAPI_SCHEMA file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.OPENAPI_SCHEMA, help='Path to write the schema to')
+
+    def handle(self, *args, **options):
+        schema = generate_schema()
+        with open(options['output'] + '.tmp', 'wb') as f:
+            f.write(schema)
+        os.replace(options['output'] + '.tmp', options['output'])
+        self.stdout.write(self.style.SUCCESS('Wrote %d bytes of OpenAPI schema to %s' % (len(schema),
+                                                                                         options['output'])))
@@ -0,0 +1,167 @@
+import csv
+import json
+import os
+import sys
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.cache import bump_content_version
+from api.management.bulk import BulkInserter, keep_timestamps
+from api.models import User, Movie, Vote
+
+FORMATS = {
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.csv': 'csv',
+}
+
+
+class Command(BaseCommand):
+    """
+    Streams users, movies or votes from a JSON lines or CSV file into the database
+
+    The file is read row by row and inserted with `bulk_create` in batches, committing every
+    `--transaction-size` rows, so memory use does not grow with the size of the file. References are given
+    by natural keys (usernames & movie titles) and resolved through in-memory maps loaded once per run.
+    Rows that already exist are skipped, so an interrupted import can simply be run again.
+    """
+
+    help = 'Bulk import users, movies or votes from a JSON lines or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=('users', 'movies', 'votes'), help='Kind of rows in the file')
+        parser.add_argument('path', help='Path of the file to import, or - to read from stdin')
+        parser.add_argument('--format', choices=sorted(set(FORMATS.values())),
+                            help='Format of the file, inferred from its extension by default')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows per INSERT')
+        parser.add_argument('--transaction-size', type=int, default=10000, help='Number of rows per transaction')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.skipped = 0
+        model = options['model']
+        file_format = options['format'] or FORMATS.get(os.path.splitext(options['path'])[1].lower())
+        if file_format is None:
+            raise CommandError('Can not infer the format of %s, use --format' % options['path'])
+
+        inserter = BulkInserter(
+            {'users': User, 'movies': Movie, 'votes': Vote}[model],
+            batch_size=options['batch_size'],
+            transaction_size=options['transaction_size'],
+            on_progress=self.report if self.verbosity >= 2 else None,
+        )
+
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8')
+        try:
+            rows = read_rows(stream, file_format)
+            with keep_timestamps(User, Movie, Vote):
+                inserter.insert(getattr(self, 'build_' + model)(rows))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        # Bulk inserts bypass Vote.save() and the post_save signals, as well as the update date of the movies the
+        # hot scores are updated after
+        if model == 'votes':
+            call_command('reconcile_vote_counts', verbosity=0, stdout=self.stdout)
+            call_command('update_hot_scores', once=True, all=True, verbosity=0, stdout=self.stdout)
+        bump_content_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            'Imported %d %s in %.1fs (%d rows/s), %d already present, skipped %d row(s)' % (
+                inserter.inserted, model, inserter.elapsed, inserter.rate, inserter.rows - inserter.inserted,
+                self.skipped)))
+
+    def report(self, inserter):
+        self.stdout.write('%d rows, %d inserted (%d rows/s)' % (inserter.rows, inserter.inserted, inserter.rate))
+
+    def skip(self, row, reason):
+        self.skipped += 1
+        if self.verbosity >= 2:
+            self.stderr.write('Skipped %s: %s' % (row, reason))
+
+    def build_users(self, rows):
+        for row in rows:
+            try:
+                yield User(
+                    username=row['username'],
+                    email=row['email'],
+                    first_name=row.get('first_name') or '',
+                    last_name=row.get('last_name') or '',
+                    # Passwords are expected already hashed, e.g. as dumped by `dumpdata`
+                    password=row.get('password') or make_password(None),
+                    created=parse_date(row.get('created')),
+                    updated=parse_date(row.get('updated') or row.get('created')),
+                )
+            except (KeyError, ValueError) as e:
+                self.skip(row, e)
+
+    def build_movies(self, rows):
+        users = dict(User.objects.values_list('username', 'id').iterator())
+        for row in rows:
+            user_id = None
+            if row.get('user'):
+                user_id = users.get(row['user'])
+                if user_id is None:
+                    self.skip(row, 'unknown user')
+                    continue
+            try:
+                yield Movie(
+                    title=row['title'],
+                    description=row.get('description') or '',
+                    user_id=user_id,
+                    created=parse_date(row.get('created')),
+                    updated=parse_date(row.get('updated') or row.get('created')),
+                )
+            except (KeyError, ValueError) as e:
+                self.skip(row, e)
+
+    def build_votes(self, rows):
+        users = dict(User.objects.values_list('username', 'id').iterator())
+        movies = {title: (movie_id, user_id) for title, movie_id, user_id in
+                  Movie.objects.values_list('title', 'id', 'user_id').iterator()}
+        for row in rows:
+            user_id = users.get(row.get('user'))
+            movie_id, owner_id = movies.get(row.get('movie'), (None, None))
+            if user_id is None or movie_id is None:
+                self.skip(row, 'unknown user or movie')
+            elif user_id == owner_id:
+                self.skip(row, 'vote for own movie')
+            elif row.get('reaction') not in Vote.SupportedMovieVotes.values:
+                self.skip(row, 'unsupported reaction')
+            else:
+                try:
+                    yield Vote(user_id=user_id, movie_id=movie_id, reaction=row['reaction'],
+                               created=parse_date(row.get('created')))
+                except ValueError as e:
+                    self.skip(row, e)
+
+
+def read_rows(stream, file_format):
+    """
+    Lazily parse the stream into dicts, one per non empty line or CSV record
+    """
+
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def parse_date(value):
+    """
+    Parse an ISO 8601 date time, assuming the current time zone when naive and now when missing
+    """
+
+    if not value:
+        return timezone.now()
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError('invalid date %r' % value)
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
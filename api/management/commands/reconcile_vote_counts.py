@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from api.models import Movie, Vote
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the denormalized like/hate counters of movies from their votes
+
+    Counters drift when votes are written without going through `Vote.save()`/`Vote.delete()`,
+    e.g. by `loaddata`, queryset deletes or cascading user deletes.
+    """
+
+    help = 'Recompute the like/hate counters of movies from their votes and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the movies with drifted counters')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of movies to update per query')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = list(
+                Movie.objects.annotate(
+                    actual_likes=self.vote_count(Vote.SupportedMovieVotes.LIKE),
+                    actual_hates=self.vote_count(Vote.SupportedMovieVotes.HATE),
+                ).exclude(
+                    likes_count=F('actual_likes'),
+                    hates_count=F('actual_hates'),
+                ).only('id', 'likes_count', 'hates_count')
+            )
+
+            for movie in drifted:
+                if options['verbosity'] >= 1:
+                    self.stdout.write('Movie %d: likes %d -> %d, hates %d -> %d' % (
+                        movie.id, movie.likes_count, movie.actual_likes, movie.hates_count, movie.actual_hates))
+                movie.likes_count = movie.actual_likes
+                movie.hates_count = movie.actual_hates
+
+            if not options['dry_run']:
+                Movie.objects.bulk_update(drifted, ['likes_count', 'hates_count'], batch_size=options['batch_size'])
+
+        action = 'Found' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS('%s %d movie(s) with drifted vote counters' % (action, len(drifted))))
+
+    @staticmethod
+    def vote_count(reaction):
+        """
+        Correlated subquery counting the votes of the outer movie with the given reaction
+        """
+
+        votes = Vote.objects.filter(movie=OuterRef('pk'), reaction=reaction).order_by().values('movie')
+        return Coalesce(Subquery(votes.annotate(c=Count('pk')).values('c'), output_field=IntegerField()), 0)
@@ -0,0 +1,69 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.replica import read_state, write_state
+
+
+class Command(BaseCommand):
+    """
+    Keeps the REPLICA_DATABASE read-only replica in sync with the database, see api/replica.py
+
+    The database is copied whenever its `data_version` moved on, which another connection committing does, with
+    SQLite's backup API. Every copy reads the whole database and writes the whole replica however little changed,
+    so after each copy the replicator waits until it spent at most `--max-duty` of its time copying. A stepped
+    backup would not bound that cost: SQLite restarts it whenever another connection writes the database, which
+    under vote traffic means copying the first pages over and over without ever finishing.
+
+    Every check that finds the replica up to date is recorded in its state file, along with the generation of the
+    copy, so that requests stop reading from the replica once the replicator stops or falls behind.
+    """
+
+    help = 'Copy the database to the REPLICA_DATABASE replica whenever it changes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=settings.REPLICA_INTERVAL,
+                            help='Seconds between two checks of the database')
+        parser.add_argument('--max-duty', type=float, default=settings.REPLICA_MAX_DUTY,
+                            help='Largest share of the time spent copying the database')
+        parser.add_argument('--once', action='store_true', help='Copy the database once and exit')
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASE:
+            raise CommandError('Set REPLICA_DATABASE to the path of the replica.')
+        if not 0 < options['max_duty'] <= 1:
+            raise CommandError('--max-duty must be within (0, 1].')
+
+        connection.ensure_connection()
+        replica = sqlite3.connect(settings.REPLICA_DATABASE)
+        state = read_state()
+        generation, data_version, next_copy = state[0] if state else 0, None, 0
+        try:
+            while True:
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA data_version')
+                    version = cursor.fetchone()[0]
+                if version != data_version and time.monotonic() >= next_copy:
+                    start = time.monotonic()
+                    connection.connection.backup(replica)
+                    elapsed = time.monotonic() - start
+                    next_copy = start + elapsed / options['max_duty']
+                    # Generations go on increasing across restarts, responses are cached per generation
+                    generation, data_version = max(generation + 1, int(time.time() * 1000)), version
+                    if options['verbosity'] > 1:
+                        self.stdout.write('Copied generation %d in %.1f ms' % (generation, elapsed * 1000))
+
+                # A change waiting for its copy leaves the replica unchecked, its readers go back to the primary
+                # database once that takes longer than REPLICA_MAX_LAG
+                if version == data_version:
+                    write_state(generation)
+
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            replica.close()
+            connection.close()
@@ -0,0 +1,63 @@
+import glob
+import json
+import os
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Summarizes the slow query log by query fingerprint, the worst total time first
+
+    The rotated files of the log are read as well, so the summary covers everything still on disk.
+    """
+
+    help = 'Summarize the slow query log by query fingerprint, worst total time first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=settings.SLOW_QUERY_LOG, help='Path of the slow query log')
+        parser.add_argument('--top', type=int, default=10, help='Number of fingerprints to show')
+        parser.add_argument('--plans', action='store_true', help='Show the query plan of the slowest query')
+
+    def handle(self, *args, **options):
+        paths = [path for path in self.log_files(options['path']) if os.path.exists(path)]
+        if not paths:
+            raise CommandError('No slow query log found at %s' % options['path'])
+
+        fingerprints = defaultdict(lambda: {'count': 0, 'total': 0.0, 'max': 0.0, 'views': set(), 'slowest': None})
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        query = json.loads(line)
+                    except ValueError:
+                        continue
+                    summary = fingerprints[query['fingerprint']]
+                    summary['count'] += 1
+                    summary['total'] += query['duration_ms']
+                    summary['views'].add(query['view'] or '-')
+                    if query['duration_ms'] >= summary['max']:
+                        summary['max'] = query['duration_ms']
+                        summary['slowest'] = query
+
+        worst = sorted(fingerprints.items(), key=lambda item: item[1]['total'], reverse=True)[:options['top']]
+        for rank, (statement, summary) in enumerate(worst, 1):
+            self.stdout.write(self.style.SUCCESS(
+                '#%d total %.1f ms, %d queries, mean %.1f ms, max %.1f ms, views: %s' % (
+                    rank, summary['total'], summary['count'], summary['total'] / summary['count'], summary['max'],
+                    ', '.join(sorted(summary['views'])))))
+            self.stdout.write('   %s' % statement)
+            if options['plans'] and summary['slowest']['plan']:
+                for step in summary['slowest']['plan']:
+                    self.stdout.write('     %s' % step)
+
+    @staticmethod
+    def log_files(path):
+        """
+        Return the path of the log and of its rotated files, the oldest first
+        """
+
+        rotated = [name for name in glob.glob(glob.escape(path) + '.*') if name.rsplit('.', 1)[1].isdigit()]
+        return sorted(rotated, key=lambda name: int(name.rsplit('.', 1)[1]), reverse=True) + [path]
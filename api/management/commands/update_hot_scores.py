@@ -0,0 +1,84 @@
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+
+from api.cache import bump_content_version
+from api.management.bulk import update_rows
+from api.models import Movie, Vote
+from api.models.movie import hot_score
+
+
+class Command(BaseCommand):
+    """
+    Keeps the materialized hot scores of movies up to date, for the `hot` ordering of the movie list
+
+    Hot scores only change with the votes of a movie (see `hot_score()`), and writing a vote updates the counters
+    of the movie along with its `updated` date. Every run thus only scores again, from all their votes, the movies
+    updated since the previous run, which is the latest `hot_updated` date of the movies, as well as the movies
+    never scored, e.g. bulk inserted ones. Movies updated within `--overlap` seconds before the previous run are
+    scored again, so that the votes of transactions still running at the time are counted too.
+    """
+
+    help = 'Update the hot scores of the movies voted for since the previous run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=settings.HOT_INTERVAL,
+                            help='Seconds between two runs')
+        parser.add_argument('--once', action='store_true', help='Update the scores once and exit')
+        parser.add_argument('--all', action='store_true', help='Score every movie, e.g. after changing the half-life')
+        parser.add_argument('--overlap', type=float, default=60, help='Seconds of updates to score again')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of movies to update per query')
+
+    def handle(self, *args, **options):
+        score_all = options['all']
+        while True:
+            start = time.perf_counter()
+            scored = self.update(score_all, options['overlap'], options['batch_size'])
+            if scored:
+                # Queryset updates do not send the post_save signal that invalidates the cached responses. The workers
+                # only see this bump through a shared cache, but their cached lists are keyed on their ETag as well,
+                # which the latest `hot_updated` date is part of
+                bump_content_version()
+            if options['verbosity'] > (0 if options['once'] else 1):
+                self.stdout.write(self.style.SUCCESS('Scored %d movie(s) in %.1f ms' % (
+                    scored, (time.perf_counter() - start) * 1000)))
+
+            if options['once']:
+                break
+            score_all = False
+            time.sleep(options['interval'])
+
+    def update(self, score_all, overlap, batch_size):
+        """
+        Score the movies updated since the previous run, or all of them, and return their number
+        """
+
+        now = timezone.now()
+        if score_all:
+            ids = Movie.objects.values_list('id', flat=True)
+        else:
+            # A union rather than an OR, for both sides to be looked up in their index instead of scanning the movies
+            ids = Movie.objects.filter(hot_updated=None).values_list('id', flat=True)
+            since = Movie.objects.aggregate(since=Max('hot_updated'))['since']
+            if since is not None:
+                ids = ids.union(Movie.objects.filter(
+                    updated__gte=since - timedelta(seconds=overlap)).values_list('id', flat=True))
+        ids = sorted(ids)
+
+        # Every batch is written in a transaction of its own, not to hold the write lock for long
+        for i in range(0, len(ids), batch_size):
+            batch = ids[i:i + batch_size]
+            votes = defaultdict(list)
+            for movie_id, reaction, created in Vote.objects.filter(movie_id__in=batch).values_list(
+                    'movie_id', 'reaction', 'created'):
+                votes[movie_id].append((created, 1 if reaction == Vote.SupportedMovieVotes.LIKE else -1))
+
+            update_rows(Movie, ('hot_score', 'hot_updated'), [
+                (hot_score(created, votes[movie_id]), now, movie_id)
+                for movie_id, created in Movie.objects.filter(id__in=batch).values_list('id', 'created')])
+        return len(ids)
@@ -0,0 +1,402 @@
+"""
+Prometheus metrics of the API, exposed in the text format at /metrics
+
+Samples are aggregated in process under a single short lived lock. With the METRICS_DIR setting, every worker
+process also writes its samples to a file of its own in that directory (from a thread, every
+METRICS_FLUSH_INTERVAL seconds they changed, as well as on every scrape & at exit) and the scraped worker sums the
+files of all workers up, so the counters stay correct whichever worker serves the scrape. Files are named after the
+pid and start time of their process, for a new process reusing the pid of an exited one not to overwrite its
+counters. The directory should be emptied whenever the server (re)starts.
+"""
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+
+from api.asynchronous import AsyncCapableMiddleware, execute_wrapper
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Files of the shared directory holding the summed samples of the exited processes, and serializing the scrapes
+EXITED_FILE = 'exited.json'
+LOCK_FILE = 'collect.lock'
+
+# Buckets of request & query durations in seconds, and of the number of queries per request
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 13, 21, 34, 55, 89)
+
+
+class Registry:
+    """
+    The metrics of the process and their samples
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.metrics = {}
+        self.ratios = []
+        self.samples = defaultdict(float)
+        self.changed = False
+        self.pid = None
+        self.started = 0
+        self.flusher = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def ratio(self, name, documentation, counter, label, numerator, denominators):
+        """
+        Derive a gauge from a counter at scrape time, the share of `label=numerator` among `label=denominators`
+        """
+
+        self.ratios.append((name, documentation, counter, label, numerator, denominators))
+
+    def add(self, *updates):
+        """
+        Add amounts to samples, given as (key, amount) pairs
+        """
+
+        with self._lock:
+            for key, amount in updates:
+                self.samples[key] += amount
+            self.changed = True
+        if getattr(settings, 'METRICS_DIR', None) and self.flusher != os.getpid():
+            self.start_flusher()
+
+    def start_flusher(self):
+        """
+        Start the thread flushing the samples of the process every METRICS_FLUSH_INTERVAL seconds they changed
+
+        Threads do not survive a fork, every worker process starts its own on its first sample.
+        """
+
+        with self._lock:
+            if self.flusher == os.getpid():
+                return
+            self.flusher = os.getpid()
+        threading.Thread(target=self.flush_changes, name='metrics-flush', daemon=True).start()
+
+    def flush_changes(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            if self.changed:
+                self.flush()
+
+    def path(self, directory):
+        """
+        Return the path of the file of the process in the shared directory
+        """
+
+        pid = os.getpid()
+        if pid != self.pid:
+            # Workers forked after the registry was created get a file of their own
+            self.pid, self.started = pid, process_start_time(pid)
+        return os.path.join(directory, '%d-%d.json' % (pid, self.started))
+
+    def flush(self):
+        """
+        Write the samples of the process to its file in the shared directory
+        """
+
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return
+        with self._lock:
+            samples = list(self.samples.items())
+            self.changed = False
+        write_samples(self.path(directory), samples)
+
+    def collect(self):
+        """
+        Return the samples of the process or, in multiprocess mode, the samples of all processes summed up
+
+        Gauges only count the samples of live processes, counters & histograms those of exited ones too. The
+        files of exited processes are folded into a single file as they are found, under a lock held by one
+        scrape at a time, so that recycled workers do not make every scrape read more files.
+        """
+
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            with self._lock:
+                return dict(self.samples)
+
+        self.flush()
+        samples = defaultdict(float)
+        exited_path = os.path.join(directory, EXITED_FILE)
+        with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            exited = defaultdict(float, read_samples(exited_path))
+            folded = []
+            for filename in os.listdir(directory):
+                if filename == EXITED_FILE or not filename.endswith('.json'):
+                    continue
+                pid, started = (int(part) for part in filename[:-len('.json')].split('-'))
+                alive = process_alive(pid, started)
+                for key, value in read_samples(os.path.join(directory, filename)):
+                    metric = self.metrics.get(key[0])
+                    if metric is not None and (alive or metric.type != 'gauge'):
+                        (samples if alive else exited)[key] += value
+                if not alive:
+                    folded.append(os.path.join(directory, filename))
+
+            if folded:
+                write_samples(exited_path, exited.items())
+                for path in folded:
+                    os.remove(path)
+
+        for key, value in exited.items():
+            samples[key] += value
+        return samples
+
+    def expose(self):
+        """
+        Render all samples in the Prometheus text format
+        """
+
+        samples = self.collect()
+        by_metric = defaultdict(list)
+        for key, value in sorted(samples.items()):
+            by_metric[key[0]].append((key, value))
+
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append('# HELP %s %s' % (name, metric.documentation))
+            lines.append('# TYPE %s %s' % (name, metric.type))
+            lines.extend(metric.expose(by_metric[name]))
+
+        for name, documentation, counter, label, numerator, denominators in self.ratios:
+            metric = self.metrics[counter]
+            index = metric.labelnames.index(label)
+            totals = defaultdict(lambda: defaultdict(float))
+            for (_, _, labels), value in by_metric[counter]:
+                totals[labels[:index] + labels[index + 1:]][labels[index]] += value
+            lines.append('# HELP %s %s' % (name, documentation))
+            lines.append('# TYPE %s gauge' % name)
+            labelnames = metric.labelnames[:index] + metric.labelnames[index + 1:]
+            for labels, values in sorted(totals.items()):
+                total = sum(values[value] for value in denominators)
+                lines.append('%s%s %s' % (
+                    name, format_labels(labelnames, labels), format_value(values[numerator] / total if total else 0)))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class Metric:
+    """
+    Base class of the metric types, samples are keyed on (metric name, sample suffix, label values)
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def expose(self, samples):
+        return ['%s%s%s %s' % (self.name, suffix, format_labels(self.labelnames, labels), format_value(value))
+                for (_, suffix, labels), value in samples]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labels, amount=1):
+        registry.add(((self.name, '', labels), amount))
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        registry.add(((self.name, '', labels), amount))
+
+    def dec(self, *labels, amount=1):
+        registry.add(((self.name, '', labels), -amount))
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, *labels):
+        # Only the bucket of the value is counted, buckets are made cumulative when exposed
+        bucket = self.buckets[bisect_left(self.buckets, value)]
+        registry.add(
+            ((self.name, '_bucket', labels + (bucket,)), 1),
+            ((self.name, '_sum', labels), value),
+            ((self.name, '_count', labels), 1),
+        )
+
+    def expose(self, samples):
+        lines, counts = [], defaultdict(lambda: defaultdict(float))
+        for (_, suffix, labels), value in samples:
+            if suffix == '_bucket':
+                counts[labels[:-1]][labels[-1]] += value
+
+        labelnames = self.labelnames + ('le',)
+        for labels, buckets in sorted(counts.items()):
+            cumulative = 0
+            for bound in self.buckets:
+                cumulative += buckets[bound]
+                lines.append('%s_bucket%s %s' % (
+                    self.name, format_labels(labelnames, labels + ('+Inf' if bound == float('inf') else bound,)),
+                    format_value(cumulative)))
+        lines.extend(super(Histogram, self).expose(
+            [sample for sample in samples if sample[0][1] != '_bucket']))
+        return lines
+
+
+def read_samples(path):
+    """
+    Return the (key, value) samples of a file of the shared directory, none if it can not be read
+    """
+
+    try:
+        with open(path) as f:
+            return [((name, suffix, tuple(labels)), value) for (name, suffix, labels), value in json.load(f)]
+    except (OSError, ValueError):
+        return []
+
+
+def write_samples(path, samples):
+    """
+    Replace a file of the shared directory with (key, value) samples, for readers to never see it half written
+    """
+
+    with open(path + '.tmp', 'w') as f:
+        json.dump([[list(key), value] for key, value in samples], f)
+    os.replace(path + '.tmp', path)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, str(value).replace('\\', r'\\').replace('"', r'\"')
+                                          .replace('\n', r'\n')) for name, value in zip(names, values))
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def process_alive(pid, started=0):
+    """
+    Return whether a process is running, and is the one started at `started` when both start times are known
+    """
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    current = process_start_time(pid)
+    return not started or not current or current == started
+
+
+def process_start_time(pid):
+    """
+    Return the start time of a process in clock ticks since boot, or 0 where /proc does not tell it
+    """
+
+    try:
+        with open('/proc/%d/stat' % pid) as f:
+            stat = f.read()
+    except OSError:
+        return 0
+    # The command name in parentheses may contain spaces, the start time is the 20th field following it
+    return int(stat.rsplit(')', 1)[1].split()[19])
+
+
+# Metrics of the API
+requests_total = Counter('http_requests_total', 'Requests by view, method & status code',
+                         ('view', 'method', 'status'))
+request_duration = Histogram('http_request_duration_seconds', 'Request latency by view', ('view', 'method'))
+requests_in_flight = Gauge('http_requests_in_flight', 'Requests being handled')
+request_queries = Histogram('db_queries_per_request', 'SQL queries per request by view', ('view',),
+                            buckets=QUERY_BUCKETS)
+request_db_duration = Histogram('db_duration_seconds', 'Time spent in SQL queries per request by view', ('view',))
+cache_requests = Counter('cache_requests_total', 'Cache lookups by cache & result', ('cache', 'result'))
+registry.ratio('cache_hit_ratio', 'Share of cache lookups that hit, by cache', 'cache_requests_total', 'result',
+               'hit', ('hit', 'miss'))
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting the queries of a request and summing their time
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - start
+            self.queries += 1
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Record the count, latency & SQL queries of every request by URL name
+
+    Enabled with the METRICS setting, the middleware removes itself from the stack otherwise.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS', False):
+            raise MiddlewareNotUsed()
+        super(MetricsMiddleware, self).__init__(get_response)
+        if getattr(settings, 'METRICS_DIR', None):
+            atexit.register(registry.flush)
+
+    @contextmanager
+    def handling(self, request):
+        requests_in_flight.inc()
+        request.query_counter = QueryCounter()
+        request.metrics_start = time.perf_counter()
+        try:
+            with execute_wrapper(request.query_counter):
+                yield
+        finally:
+            requests_in_flight.dec()
+
+    def process_response(self, request, response):
+        duration = time.perf_counter() - request.metrics_start
+        counter = request.query_counter
+
+        match = request.resolver_match
+        view = match.url_name or match.view_name if match else 'unmatched'
+        requests_total.inc(view, request.method, str(response.status_code))
+        request_duration.observe(duration, view, request.method)
+        request_queries.observe(counter.queries, view)
+        request_db_duration.observe(counter.time, view)
+        return response
+
+
+def metrics_view(request):
+    """
+    Expose the metrics in the Prometheus text format
+    """
+
+    return HttpResponse(registry.expose(), content_type=CONTENT_TYPE)
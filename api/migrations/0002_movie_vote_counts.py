@@ -0,0 +1,49 @@
+# Generated by Django 3.1.14
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_vote_counts(apps, schema_editor):
+    """
+    Populate the like/hate counters of existing movies from their votes
+    """
+
+    Movie = apps.get_model('api', 'Movie')
+    Vote = apps.get_model('api', 'Vote')
+
+    def count(reaction):
+        votes = Vote.objects.filter(movie=OuterRef('pk'), reaction=reaction).order_by().values('movie')
+        return Coalesce(Subquery(votes.annotate(c=Count('pk')).values('c'), output_field=IntegerField()), 0)
+
+    Movie.objects.update(likes_count=count('like'), hates_count=count('hate'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='hates_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['likes_count', 'id'], name='movie_likes_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['hates_count', 'id'], name='movie_hates_count_idx'),
+        ),
+        migrations.RunPython(backfill_vote_counts, migrations.RunPython.noop),
+    ]
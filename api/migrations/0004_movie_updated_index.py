@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['updated'], name='movie_updated_idx'),
+        ),
+    ]
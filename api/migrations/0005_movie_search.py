@@ -0,0 +1,48 @@
+# Generated by Django 3.1.14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+import api.models.search
+
+CREATE_SEARCH = [
+    "CREATE VIRTUAL TABLE api_movie_fts USING fts5("
+    "title, description, content='api_movie', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO api_movie_fts(api_movie_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    *api.models.search.TRIGGERS,
+    "INSERT INTO api_movie_fts(api_movie_fts) VALUES ('rebuild')",
+]
+
+DROP_SEARCH = [
+    "DROP TRIGGER api_movie_fts_update",
+    "DROP TRIGGER api_movie_fts_delete",
+    "DROP TRIGGER api_movie_fts_insert",
+    "DROP TABLE api_movie_fts",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_movie_updated_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SEARCH, DROP_SEARCH),
+        migrations.CreateModel(
+            name='MovieSearch',
+            fields=[
+                ('movie', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING,
+                                               primary_key=True, related_name='search', serialize=False,
+                                               to='api.movie')),
+                ('title', models.TextField()),
+                ('description', models.TextField()),
+                ('document', api.models.search.SearchField(db_column='api_movie_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'api_movie_fts',
+                'managed': False,
+            },
+        ),
+    ]
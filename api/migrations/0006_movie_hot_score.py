@@ -0,0 +1,37 @@
+# Generated by Django 3.1.14
+
+from django.db import migrations, models
+
+import api.models.movie
+import api.models.search
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_movie_search'),
+    ]
+
+    # Adding & removing columns remakes the movie table on SQLite, along with the triggers of its search index
+    operations = [
+        migrations.RunSQL(migrations.RunSQL.noop, api.models.search.TRIGGERS),
+        migrations.AddField(
+            model_name='movie',
+            name='hot_score',
+            field=models.FloatField(default=api.models.movie.initial_hot_score, editable=False),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='hot_updated',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['hot_score', 'id'], name='movie_hot_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['hot_updated', 'updated'], name='movie_hot_updated_idx'),
+        ),
+        migrations.RunSQL(api.models.search.TRIGGERS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.1.14
+
+from django.db import migrations, models
+
+import api.models.movie
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_movie_hot_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieDeletions',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunSQL(["INSERT INTO api_moviedeletions (id, count) VALUES (1, 0)"], migrations.RunSQL.noop),
+        migrations.RunSQL(api.models.movie.DELETION_TRIGGERS, ["DROP TRIGGER api_movie_deleted"]),
+    ]
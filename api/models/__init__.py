@@ -1,3 +1,4 @@
 from api.models.user import User
-from api.models.movie import Movie
-from api.models.vote import Vote
+from api.models.movie import Movie, MovieDeletions
+from api.models.vote import MovieNotVotable, Vote
+from api.models.search import MovieSearch
@@ -1,7 +1,47 @@
+import math
+from datetime import datetime
+
+from django.conf import settings
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 
+from api.cache import bump_content_version
 from api.models.user import User
 
+# Origin of the hot scores, which count the half-lives elapsed since then, see hot_score()
+HOT_EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def hot_score(created, votes):
+    """
+    Return the hot score of a movie submitted at `created`, from its (created, 1 for likes or -1 for hates) votes
+
+    Every vote counts for half as much every HOT_HALF_LIFE_HOURS, and so does the submission of the movie itself,
+    which counts as one more like for new movies to get a chance. The score is the base 2 logarithm of the sum of
+    the votes weighed by 2 ** (half-lives since HOT_EPOCH): doubling the recent net likes of a movie is worth one
+    half-life of recency. As time decays all the sums alike, the order of the scores only changes with votes.
+    """
+
+    half_life = settings.HOT_HALF_LIFE_HOURS * 3600
+    terms = [((created - HOT_EPOCH).total_seconds() / half_life, 1)]
+    terms.extend(((voted - HOT_EPOCH).total_seconds() / half_life, sign) for voted, sign in votes)
+
+    # The weights overflow floats within a few years, sum them relative to the largest one
+    top = max(age for age, sign in terms)
+    total = math.fsum(sign * 2 ** (age - top) for age, sign in terms)
+    if not total:
+        return 0.0
+    return math.copysign(top + math.log2(abs(total)), total)
+
+
+def initial_hot_score():
+    """
+    Return the hot score of a movie submitted now, until it is scored from its votes
+    """
+
+    return hot_score(timezone.now(), ())
+
 
 class Movie(models.Model):
     """
@@ -14,3 +54,71 @@ class Movie(models.Model):
                              related_name='movies_submitted')
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    hates_count = models.PositiveIntegerField(default=0, editable=False)
+    # Materialized by `manage.py update_hot_scores` from the votes of the movie, see hot_score()
+    hot_score = models.FloatField(default=initial_hot_score, editable=False)
+    hot_updated = models.DateTimeField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created', 'id'], name='movie_created_idx'),
+            models.Index(fields=['user', 'created', 'id'], name='movie_user_created_idx'),
+            models.Index(fields=['updated'], name='movie_updated_idx'),
+            models.Index(fields=['likes_count', 'id'], name='movie_likes_count_idx'),
+            models.Index(fields=['hates_count', 'id'], name='movie_hates_count_idx'),
+            models.Index(fields=['hot_score', 'id'], name='movie_hot_score_idx'),
+            models.Index(fields=['hot_updated', 'updated'], name='movie_hot_updated_idx'),
+        ]
+
+    # Denormalized counter column per supported vote reaction
+    COUNT_FIELDS = {
+        'like': 'likes_count',
+        'hate': 'hates_count',
+    }
+
+    @classmethod
+    def update_vote_counts(cls, movie_id, added=None, removed=None, voter_id=None):
+        """
+        Move the movie's like/hate counters by a vote being added, removed or switched from one reaction to another
+
+        When the voter is given, movies they submitted are left untouched. Returns the number of movies updated.
+        """
+
+        counts = {}
+        if added:
+            counts[cls.COUNT_FIELDS[added]] = F(cls.COUNT_FIELDS[added]) + 1
+        if removed:
+            counts[cls.COUNT_FIELDS[removed]] = F(cls.COUNT_FIELDS[removed]) - 1
+        if added == removed or not counts:
+            return 0
+
+        movies = cls.objects.filter(pk=movie_id)
+        if voter_id is not None:
+            movies = movies.exclude(user_id=voter_id)
+
+        # The counters are part of the movie, so it counts as updated too
+        updated = movies.update(updated=timezone.now(), **counts)
+
+        # Queryset updates do not send the post_save signal that invalidates the cached responses
+        bump_content_version()
+        return updated
+
+
+# Counts the deletions of movies in the single row of MovieDeletions, including the raw & cascading ones. Like the
+# triggers of the search index, it has to be created again by migrations that remake the movie table
+DELETION_TRIGGERS = [
+    "CREATE TRIGGER api_movie_deleted AFTER DELETE ON api_movie BEGIN "
+    "INSERT INTO api_moviedeletions (id, count) VALUES (1, 1) ON CONFLICT (id) DO UPDATE SET count = count + 1; END",
+]
+
+
+class MovieDeletions(models.Model):
+    """
+    Number of movies ever deleted, counted by a trigger on the movie table
+
+    Along with the latest update & id of the movies, which are looked up at the end of their index, it tells
+    whether the movie list changed without counting every movie.
+    """
+
+    count = models.PositiveBigIntegerField(default=0)
@@ -0,0 +1,55 @@
+from django.db import models
+from django.db.models import Lookup
+
+from api.models.movie import Movie
+
+# Triggers keeping the index of the movies in sync with their inserts, deletes & updates. Migrations that remake the
+# movie table on SQLite (e.g. to add a column to it) drop them with the old table, and must then create them again.
+TRIGGERS = [
+    "CREATE TRIGGER api_movie_fts_insert AFTER INSERT ON api_movie BEGIN "
+    "INSERT INTO api_movie_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER api_movie_fts_delete AFTER DELETE ON api_movie BEGIN "
+    "INSERT INTO api_movie_fts(api_movie_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    # Vote counter updates leave the title & description out and so do not touch the index
+    "CREATE TRIGGER api_movie_fts_update AFTER UPDATE OF title, description ON api_movie BEGIN "
+    "INSERT INTO api_movie_fts(api_movie_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO api_movie_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+
+class SearchField(models.TextField):
+    """
+    The hidden column of a FTS5 table named after the table, matching a full-text query against all its columns
+    """
+
+
+@SearchField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return '%s MATCH %s' % (lhs, rhs), lhs_params + rhs_params
+
+
+class MovieSearch(models.Model):
+    """
+    Model of the FTS5 full-text index of movie titles & descriptions, kept in sync by triggers on the movie table
+
+    The index is an external content table, which holds no copy of the text but only the index of the movie
+    rows, joined on their id. Movies are ranked by bm25 with title matches weighing 10 times description matches.
+    """
+
+    movie = models.OneToOneField(Movie, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING,
+                                 related_name='search')
+    title = models.TextField()
+    description = models.TextField()
+    document = SearchField(db_column='api_movie_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'api_movie_fts'
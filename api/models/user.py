@@ -3,6 +3,8 @@ from django.contrib.auth.models import UserManager
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import models
 
+from api import hashing
+
 
 class User(AbstractBaseUser):
     """
@@ -20,3 +22,29 @@ class User(AbstractBaseUser):
 
     USERNAME_FIELD = 'username'
     EMAIL_FIELD = 'email'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created'], name='user_created_idx'),
+        ]
+
+    def set_password(self, raw_password):
+        """
+        Hash the password on the password hashing pool
+        """
+
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """
+        Check the password on the password hashing pool, upgrading its hash if needed
+        """
+
+        def setter(raw_password):
+            self.set_password(raw_password)
+            # Upgrading the hash does not change the password
+            self._password = None
+            self.save(update_fields=['password'])
+
+        return hashing.check_password(raw_password, self.password, setter)
@@ -1,9 +1,15 @@
-from django.db import models
+from django.db import models, transaction
 
 from api.models.movie import Movie
 from api.models.user import User
 
 
+class MovieNotVotable(Exception):
+    """
+    Raised when a user votes for a movie they submitted or for a movie that does not exist
+    """
+
+
 class Vote(models.Model):
     """
     Model for the relation between a user and his votes to movies
@@ -21,3 +27,48 @@ class Vote(models.Model):
     class Meta:
         # Users can have only one vote for a Movie
         unique_together = ('user', 'movie')
+        indexes = [
+            models.Index(fields=['movie', 'reaction', 'created'], name='vote_movie_reaction_idx'),
+            models.Index(fields=['movie', 'created'], name='vote_movie_created_idx'),
+        ]
+
+    def stored_reaction(self):
+        """
+        Return the reaction of the vote as stored in the database, or None if it is not stored
+
+        Read within the transaction that writes the vote, which holds the write lock of the database from its start,
+        so that a concurrent switch of the reaction can not change it in between.
+        """
+
+        if self._state.adding:
+            return None
+        return Vote.objects.filter(pk=self.pk).values_list('reaction', flat=True).first()
+
+    def save(self, *args, **kwargs):
+        """
+        Save the vote and update the movie's like/hate counters within the same transaction
+
+        Counting a new vote doubles as the check that the user may vote for the movie: the counters
+        of movies the user submitted are not updated, in which case the vote is rolled back.
+        """
+
+        adding = self._state.adding
+        with transaction.atomic():
+            removed = self.stored_reaction()
+            super(Vote, self).save(*args, **kwargs)
+            counted = Movie.update_vote_counts(self.movie_id, added=self.reaction, removed=removed,
+                                               voter_id=self.user_id if adding else None)
+            if adding and not counted:
+                raise MovieNotVotable()
+
+    def delete(self, *args, **kwargs):
+        """
+        Delete the vote and update the movie's like/hate counters within the same transaction
+        """
+
+        with transaction.atomic():
+            removed = self.stored_reaction()
+            result = super(Vote, self).delete(*args, **kwargs)
+            if result[0]:
+                Movie.update_vote_counts(self.movie_id, removed=removed)
+        return result
@@ -0,0 +1,224 @@
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from api.cache import get_read_version, pagination_count_stats
+
+
+class KeysetPagination(pagination.CursorPagination):
+    """
+    Cursor pagination that seeks on every ordering field plus the primary key
+
+    DRF's CursorPagination only seeks on the first ordering field and walks an offset to get past rows
+    sharing the same value, so paging through e.g. `likes` gets slower the more movies share a count.
+    Here the cursor holds the full sort key of the boundary row, the id is always appended as a tie-breaker
+    and every page is a single `WHERE (key) > (cursor) ORDER BY key LIMIT n` query, whatever the page depth.
+    """
+
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created',)
+
+    # The total count is only computed when asked for and is then cached per filtered queryset until the next write
+    count_query_param = 'count'
+    count_cache_timeout = 300
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Append the primary key to the requested ordering so every row has a unique position
+        """
+
+        ordering = tuple(
+            field for field in super(KeysetPagination, self).get_ordering(request, queryset, view)
+            if field.lstrip('-') not in ('id', 'pk')
+        )
+        # Follow the direction of the last field so the database can walk a single index backwards
+        tie_breaker = '-id' if ordering and ordering[-1].startswith('-') else 'id'
+        return ordering + (tie_breaker,)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.ordering_fields = get_ordering_fields(queryset, self.ordering)
+        self.count = self.get_count(queryset, request)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, position = False, None
+        else:
+            reverse, position = self.cursor.reverse, self.cursor.position
+
+        ordering = reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(seek_filter(ordering, position))
+
+        # Fetch an extra row to find out whether there is a page following this one
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = bool(self.page)
+            self.has_previous = has_following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = position is not None and bool(self.page)
+
+        if self.page:
+            self.previous_position = self._get_position_from_instance(self.page[0], self.ordering)
+            self.next_position = self._get_position_from_instance(self.page[-1], self.ordering)
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_count(self, queryset, request):
+        """
+        Return the cached number of rows of the filtered queryset, or None if the client did not ask for it
+        """
+
+        if request.query_params.get(self.count_query_param, '').lower() not in ('1', 'true'):
+            return None
+
+        queryset = queryset.order_by()
+        key = 'pagination:count:%s:%s' % (
+            get_read_version(), hashlib.md5(str(queryset.values('pk').query).encode('utf-8')).hexdigest())
+        count = cache.get(key)
+        pagination_count_stats.record(hit=count is not None)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            tokens = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            reverse = bool(tokens['r'])
+            position = tokens['p']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # A cursor taken from a differently ordered listing can not be applied to this one
+        if not isinstance(position, list) or len(position) != len(self.ordering) or \
+                any(isinstance(value, (list, dict)) for value in position):
+            raise NotFound(self.invalid_cursor_message)
+
+        # Clients may tamper with the cursor, its values are checked against the fields they are compared with
+        try:
+            position = [self.to_position_value(field, value) for field, value in zip(self.ordering_fields, position)]
+        except (TypeError, ValueError, ValidationError, OverflowError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def to_position_value(self, field, value):
+        """
+        Convert a value of the cursor to the type of its ordering field, raising ValueError if it does not fit
+        """
+
+        value = field.get_prep_value(field.to_python(value))
+        if value is None:
+            raise ValueError('Cursor values can not be null')
+        return value
+
+    def encode_cursor(self, cursor):
+        tokens = {'r': int(cursor.reverse), 'p': cursor.position}
+        encoded = urlsafe_b64encode(json.dumps(tokens, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field in ordering:
+            field_name = field.lstrip('-')
+            value = instance[field_name] if isinstance(instance, dict) else getattr(instance, field_name)
+            position.append(value.isoformat() if isinstance(value, datetime) else value)
+        return position
+
+    def get_paginated_response(self, data):
+        response = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.count is not None:
+            response['count'] = self.count
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super(KeysetPagination, self).get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {
+            'type': 'integer',
+            'example': 123,
+        }
+        return response_schema
+
+
+def reverse_ordering(ordering):
+    """
+    Flip the direction of every field of an ordering tuple
+    """
+
+    return tuple(field[1:] if field.startswith('-') else '-' + field for field in ordering)
+
+
+def get_ordering_fields(queryset, ordering):
+    """
+    Return the model field, or the output field of the annotation, each field of an ordering tuple sorts on
+    """
+
+    fields = []
+    for field in ordering:
+        field_name = field.lstrip('-')
+        if field_name in queryset.query.annotations:
+            fields.append(queryset.query.annotations[field_name].output_field)
+        else:
+            fields.append(queryset.model._meta.get_field(field_name))
+    return fields
+
+
+def seek_filter(ordering, position):
+    """
+    Build the row-value comparison `(f1, f2, ..., id) > (v1, v2, ..., vid)` honouring each field's direction
+    """
+
+    seek = Q()
+    equal = Q()
+    for field, value in zip(ordering, position):
+        field_name = field.lstrip('-')
+        lookup = '__lt' if field.startswith('-') else '__gt'
+        seek |= equal & Q(**{field_name + lookup: value})
+        equal &= Q(**{field_name: value})
+    return seek
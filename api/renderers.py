@@ -0,0 +1,70 @@
+"""
+Renderers of the export endpoints, which stream their rows line by line instead of rendering a response body
+
+Both renderers also render the error responses of the export views, as a single row.
+"""
+import csv
+import json
+
+from rest_framework import renderers
+
+
+class StreamingRenderer(renderers.BaseRenderer):
+    """
+    Base class of renderers of rows with the same fields
+    """
+
+    charset = 'utf-8'
+
+    def lines(self, fields, rows):
+        """
+        Yield the text lines of the rows, a dict per row
+        """
+
+        raise NotImplementedError('`lines()` must be implemented.')
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows and isinstance(rows[0], dict) else ['detail']
+        rows = [row if isinstance(row, dict) else {'detail': row} for row in rows]
+        return ''.join(self.lines(fields, rows)).encode(self.charset)
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """
+    Newline delimited JSON, a JSON object per row
+    """
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def lines(self, fields, rows):
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        for row in rows:
+            yield dumps(row) + '\n'
+
+
+class CSVRenderer(StreamingRenderer):
+    """
+    Comma separated values, with a header line of the field names
+    """
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+    class Line:
+        # csv.writer writes to a file, whose write() here returns the line instead
+        def write(self, line):
+            return line
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            # Fields of validation errors hold lists of messages
+            data = {field: ' '.join(value) if isinstance(value, list) else value for field, value in data.items()}
+        return super(CSVRenderer, self).render(data, accepted_media_type, renderer_context)
+
+    def lines(self, fields, rows):
+        writer = csv.writer(self.Line())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([row[field] for field in fields])
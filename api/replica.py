@@ -0,0 +1,166 @@
+"""
+Reads from a read-only replica of the SQLite database
+
+`manage.py replicate` copies the database to the REPLICA_DATABASE file with SQLite's backup API whenever it
+changed. Every copy is a single read transaction of the database, which in WAL mode neither blocks its writers
+nor the readers of the replica, who keep reading the previous copy until it is committed. It reads and writes
+the whole database however little changed, so the replicator copies at most REPLICA_MAX_DUTY of the time.
+
+The queries of safe requests go to the replica while it is fresh, i.e. while the replicator has checked it
+within the last REPLICA_MAX_LAG seconds, so that list traffic does not compete with vote writes for the lock of
+the database file. Users who wrote or just signed up are pinned to the primary database for REPLICA_PIN_SECONDS
+afterwards, so that they read their own writes. Pins are kept in the cache, set CACHE_DIR to share them between
+processes.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from api.asynchronous import AsyncCapableMiddleware
+
+REPLICA = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Replica reads of the request being handled, None when its queries go to the primary database
+request_reads = ContextVar('request_reads', default=None)
+
+
+def state_path():
+    """
+    Return the path of the file in which the replicator records the generation of the replica
+    """
+
+    return settings.REPLICA_DATABASE + '.state'
+
+
+def write_state(generation):
+    """
+    Record the generation of the replica, as checked against the primary database just now
+    """
+
+    path = state_path()
+    with open(path + '.tmp', 'w') as f:
+        f.write('%d %f' % (generation, time.time()))
+    os.replace(path + '.tmp', path)
+
+
+def read_state():
+    """
+    Return the generation of the replica and when it was last checked, or None if it never was
+    """
+
+    try:
+        with open(state_path()) as f:
+            generation, checked = f.read().split()
+    except (OSError, ValueError):
+        return None
+    return int(generation), float(checked)
+
+
+def pin_key(user_id):
+    return 'api:replica-pin:%s' % user_id
+
+
+def pin_to_primary(user_id):
+    """
+    Let the requests of the user read from the primary database for REPLICA_PIN_SECONDS
+    """
+
+    if settings.REPLICA_DATABASE:
+        cache.set(pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+class ReplicaReads:
+    """
+    Whether the queries of a safe request go to the replica, decided on its first query
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    @cached_property
+    def generation(self):
+        """
+        The generation of the replica the request reads from, or None when it reads from the primary database
+        """
+
+        state = read_state()
+        if state is None or time.time() - state[1] > settings.REPLICA_MAX_LAG:
+            return None
+
+        # DRF sets the user of the request once authenticated, which is before any query of the view
+        user = getattr(self.request, 'user', None)
+        if user is not None and user.is_authenticated and cache.get(pin_key(user.pk)):
+            return None
+        return state[0]
+
+
+def replica_generation():
+    """
+    Return the generation of the replica the current request reads from, or None
+    """
+
+    reads = request_reads.get()
+    return reads.generation if reads is not None else None
+
+
+@contextmanager
+def primary_reads():
+    """
+    Read from the primary database within the block
+    """
+
+    token = request_reads.set(None)
+    try:
+        yield
+    finally:
+        request_reads.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Database router sending the reads of safe requests to the replica, see ReplicaMiddleware
+    """
+
+    def db_for_read(self, model, **hints):
+        return REPLICA if replica_generation() is not None else None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary database, their rows may relate to each other
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db == REPLICA else None
+
+
+class ReplicaMiddleware(AsyncCapableMiddleware):
+    """
+    Let the queries of safe requests go to the replica and pin users to the primary database once they wrote
+    """
+
+    @contextmanager
+    def handling(self, request):
+        if not settings.REPLICA_DATABASE or request.method not in SAFE_METHODS:
+            yield
+            return
+
+        token = request_reads.set(ReplicaReads(request))
+        try:
+            yield
+        finally:
+            request_reads.reset(token)
+
+    def process_response(self, request, response):
+        user = getattr(request, 'user', None)
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and user is not None and user.is_authenticated):
+            pin_to_primary(user.pk)
+        return response
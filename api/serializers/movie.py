@@ -1,7 +1,9 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.settings import api_settings
 
-from api.models import Movie, Vote
+from api.models import Movie, MovieNotVotable, Vote
 from api.serializers.user import UserSerializer
 
 
@@ -39,24 +41,107 @@ class MovieVoteSerializer(serializers.ModelSerializer):
         model = Vote
         fields = ('reaction', 'user', 'created')
 
-    def validate(self, attrs):
-        # Do not allow logged in user to vote for movies he/she submitted
-        movie_id = int(self.context['request'].resolver_match.kwargs.get('movie_id'))
-        if Movie.objects.filter(user=self.context['request'].user, id=movie_id).exists():
-            raise ValidationError("You can not vote for movies you submitted.")
+    # Votes are validated by the database while they are written, instead of being looked up beforehand:
+    # the unique constraint rejects a second vote and counting the vote skips movies the user submitted
+    own_movie_message = "You can not vote for movies you submitted."
+    duplicate_message = "You can not vote for this movie twice."
 
-        # Do not allow logged in user to vote for a movie twice
-        if self.context['request'].method == 'POST' and \
-                Vote.objects.filter(user=self.context['request'].user, movie_id=movie_id).exists():
-            raise ValidationError("You can not vote for this movie twice.")
+    def get_movie_id(self):
+        return int(self.context['request'].resolver_match.kwargs.get('movie_id'))
 
-        return attrs
+    def vote_error(self, message):
+        return ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]})
+
+    def insert(self, validated_data):
+        """
+        Insert the vote and count it in one transaction
+        """
+
+        # The user is only loaded to serialize the vote, after the transaction rather than within it
+        validated_data['user_id'] = self.context['request'].user.pk
+        validated_data['movie_id'] = self.get_movie_id()
+        try:
+            with transaction.atomic():
+                return super(MovieVoteSerializer, self).create(validated_data)
+        except MovieNotVotable:
+            # Only a rejected vote pays for finding out why
+            if not Movie.objects.filter(pk=validated_data['movie_id']).exists():
+                raise NotFound()
+            raise self.vote_error(self.own_movie_message)
 
     def create(self, validated_data):
         """
         Create vote for movie
         """
 
-        validated_data['user'] = self.context['request'].user
-        validated_data['movie_id'] = int(self.context['request'].resolver_match.kwargs.get('movie_id'))
-        return super(MovieVoteSerializer, self).create(validated_data)
+        try:
+            return self.insert(validated_data)
+        except IntegrityError:
+            raise self.vote_error(self.duplicate_message)
+
+    def upsert(self, validated_data, create=True):
+        """
+        Set the reaction of the logged in user's vote for the movie, creating the vote if allowed
+
+        The vote is not fetched before it is written: switching the reaction is a single conditional UPDATE,
+        and a vote is only created when there was none to update. Returns the vote and whether it was created.
+        """
+
+        user = self.context['request'].user
+        movie_id = self.get_movie_id()
+        reaction = validated_data.get('reaction')
+        votes = Vote.objects.filter(user_id=user.pk, movie_id=movie_id)
+
+        with transaction.atomic():
+            if reaction and votes.exclude(reaction=reaction).update(reaction=reaction):
+                # There are only two reactions, so the vote was switched from the other one
+                removed, = (other for other in Vote.SupportedMovieVotes.values if other != reaction)
+                Movie.update_vote_counts(movie_id, added=reaction, removed=removed)
+            vote = votes.select_related('user').first()
+
+        if vote is not None:
+            return vote, False
+        if not create or not reaction:
+            raise NotFound()
+
+        try:
+            return self.insert(validated_data), True
+        except IntegrityError:
+            # A concurrent request created the vote in the meantime, so update it instead
+            return self.upsert(validated_data, create=False)
+
+
+class MovieVoteOperationSerializer(serializers.Serializer):
+    """
+    Movie Vote Operation Serializer for bulk votes, a null reaction removes the vote
+    """
+
+    movie_id = serializers.IntegerField()
+    reaction = serializers.ChoiceField(choices=Vote.SupportedMovieVotes.choices, allow_null=True)
+
+
+class MovieExportSerializer(serializers.ModelSerializer):
+    """
+    Movie Serializer for exports, one flat row per movie
+    """
+
+    user_id = serializers.IntegerField(source='user.id', read_only=True)
+    likes = serializers.IntegerField(source='likes_count', read_only=True)
+    hates = serializers.IntegerField(source='hates_count', read_only=True)
+
+    class Meta:
+        model = Movie
+        fields = ('id', 'title', 'description', 'user_id', 'created', 'updated', 'likes', 'hates')
+
+
+class MovieVoteExportSerializer(serializers.ModelSerializer):
+    """
+    Movie Vote Serializer for exports, one flat row per vote
+    """
+
+    movie_id = serializers.IntegerField(source='movie.id', read_only=True)
+    user_id = serializers.IntegerField(source='user.id', read_only=True)
+
+    class Meta:
+        model = Vote
+        fields = ('id', 'movie_id', 'user_id', 'reaction', 'created')
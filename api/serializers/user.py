@@ -1,6 +1,6 @@
-from django.contrib.auth.hashers import make_password
 from rest_framework import serializers
 
+from api.hashing import make_password
 from api.models import User
 
 
@@ -19,6 +19,6 @@ class UserSerializer(serializers.ModelSerializer):
         Create user
         """
 
-        # Hash the password before saving the user
+        # Hash the password before saving the user, on the password hashing pool
         validated_data['password'] = make_password(validated_data['password'])
         return super(UserSerializer, self).create(validated_data)
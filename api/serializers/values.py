@@ -0,0 +1,111 @@
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Compiled ValuesSerializer per ModelSerializer class
+_compiled = {}
+
+
+class ValuesSerializer:
+    """
+    Read only counterpart of a ModelSerializer, for list responses
+
+    Serializes the plain rows of `QuerySet.values()` into the very same representation as the given
+    ModelSerializer, but the field getters are compiled once and no model instance, serializer or
+    field is bound per row. Writes and validation still go through the ModelSerializer.
+    """
+
+    def __init__(self, serializer_class, context=None):
+        self.columns, self.getters = self.compile(serializer_class(context=context))
+
+    def compile(self, serializer, prefix=''):
+        """
+        Return the `.values()` lookups and the (field name, getter) pairs of the serializer's readable fields
+        """
+
+        columns, getters = [], []
+        for field in serializer._readable_fields:
+            key = prefix + field.source.replace('.', '__')
+            if isinstance(field, serializers.BaseSerializer):
+                # The foreign key tells whether there is a related object at all
+                nested_columns, nested_getters = self.compile(field, prefix=key + '__')
+                columns.append(key)
+                columns.extend(nested_columns)
+                getters.append((field.field_name, nested_getter(key, nested_getters)))
+            else:
+                columns.append(key)
+                getters.append((field.field_name, field_getter(key, field)))
+        return columns, getters
+
+    def values(self, queryset):
+        """
+        Fetch the serialized columns of the queryset as plain rows
+
+        Fields that are neither model fields nor annotations of the queryset (e.g. values set on the rows
+        after they are fetched) are left out of the query, while the other annotations of the queryset (e.g. the
+        `rank` of searches) are kept, for the rows to hold every key they may be ordered & paginated by.
+        """
+
+        model_fields = {field.name for field in queryset.model._meta.get_fields()}
+        available = model_fields.union(queryset.query.annotations)
+        columns = [column for column in self.columns if '__' in column or column in available]
+        return queryset.values(*columns, *[name for name in queryset.query.annotations if name not in columns])
+
+    def to_representation(self, row):
+        return {name: getter(row) for name, getter in self.getters}
+
+    def many(self, rows):
+        return [{name: getter(row) for name, getter in self.getters} for row in rows]
+
+
+class ValuesListMixin:
+    """
+    Serialize list responses with the ValuesSerializer of the view's serializer class
+    """
+
+    def get_values_serializer(self):
+        serializer_class = self.get_serializer_class()
+        if serializer_class not in _compiled:
+            _compiled[serializer_class] = ValuesSerializer(serializer_class)
+        return _compiled[serializer_class]
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = self.get_values_serializer()
+        queryset = values_serializer.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.many(page))
+
+        return Response(values_serializer.many(queryset))
+
+
+def field_getter(key, field):
+    """
+    Compile the getter of a row's value, skipping the field machinery for plain char & integer fields
+    """
+
+    if type(field) is serializers.CharField:
+        to_representation = str
+    elif type(field) is serializers.IntegerField:
+        to_representation = int
+    else:
+        to_representation = field.to_representation
+
+    def getter(row):
+        value = row.get(key)
+        return None if value is None else to_representation(value)
+
+    return getter
+
+
+def nested_getter(key, getters):
+    """
+    Compile the getter of a nested serializer's representation, null when the related object is missing
+    """
+
+    def getter(row):
+        if row.get(key) is None:
+            return None
+        return {name: nested(row) for name, nested in getters}
+
+    return getter
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.authentication import token_cache
+from api.cache import bump_content_version
+from api.models import Movie, User, Vote
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+@receiver(post_save, sender=Vote)
+@receiver(post_delete, sender=Vote)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def content_changed(sender, **kwargs):
+    """
+    Invalidate the cached responses whenever a movie, vote or user is written
+    """
+
+    bump_content_version()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """
+    Drop the cached tokens of a user whenever the user is written, so that its next request loads it again
+    """
+
+    token_cache.evict_user(instance.pk)
@@ -0,0 +1,102 @@
+"""
+Log of the SQL queries slower than the SLOW_QUERY_MS setting
+
+Every slow query is written as a JSON line to the `api.slow_queries` logger (a file reopened once rotated, see the
+LOGGING setting) with its parameters, the view that ran it and the plan the database chose for it, so that a query
+that got slow under load can still be looked at afterwards. `manage.py slow_queries` sums the log up.
+"""
+import json
+import logging
+import re
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError
+from django.utils import timezone
+
+from api.asynchronous import AsyncCapableMiddleware, execute_wrapper
+
+logger = logging.getLogger(__name__)
+
+# Literals & placeholders normalized away from fingerprints
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+IN_LISTS = re.compile(r'\bIN \((?:\?, )*\?\)')
+
+
+def fingerprint(sql):
+    """
+    Return the statement of a query with its literals and parameters replaced, to group its variants
+    """
+
+    return IN_LISTS.sub('IN (...)', LITERALS.sub('?', sql))
+
+
+class SlowQueryRecorder:
+    """
+    Database execute wrapper logging the queries of a request that take longer than the threshold
+    """
+
+    def __init__(self, request, threshold):
+        self.request = request
+        self.threshold = threshold
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            if duration >= self.threshold and not self.explaining:
+                self.record(context['connection'], sql, params, many, duration)
+
+    def record(self, connection, sql, params, many, duration):
+        match = self.request.resolver_match
+        logger.warning(json.dumps({
+            'time': timezone.now().isoformat(),
+            'duration_ms': round(duration, 3),
+            'view': (match.url_name or match.view_name) if match else None,
+            'method': self.request.method,
+            'path': self.request.get_full_path(),
+            'fingerprint': fingerprint(sql),
+            'sql': sql,
+            'params': repr(params)[:1000],
+            'plan': None if many else self.explain(connection, sql, params),
+        }))
+
+    def explain(self, connection, sql, params):
+        """
+        Return the query plan of a query, one line per step, or None if the database can not tell
+        """
+
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        self.explaining = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                # SQLite returns (id, parent, notused, detail) rows, other databases a line per row
+                return [' '.join(str(column) for column in row[3 if len(row) == 4 else 0:]) for row in cursor]
+        except DatabaseError:
+            return None
+        finally:
+            self.explaining = False
+
+
+class SlowQueryMiddleware(AsyncCapableMiddleware):
+    """
+    Log the slow SQL queries of every request
+
+    Enabled when the SLOW_QUERY_MS setting is set, the middleware removes itself from the stack otherwise.
+    """
+
+    def __init__(self, get_response):
+        if getattr(settings, 'SLOW_QUERY_MS', None) is None:
+            raise MiddlewareNotUsed()
+        super(SlowQueryMiddleware, self).__init__(get_response)
+
+    @contextmanager
+    def handling(self, request):
+        with execute_wrapper(SlowQueryRecorder(request, settings.SLOW_QUERY_MS)):
+            yield
@@ -0,0 +1,169 @@
+import asyncio
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync
+from django.test import override_settings
+from django.urls import path, resolve, reverse
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import User, Movie, Vote
+from api.views import movie, user
+
+# The endpoints that have async implementations, as the ASGI entry point serves them
+urlpatterns = [
+    path('api/users/<int:pk>', user.AsyncUserDetail.as_view(), name='user_retrieve'),
+    path('api/movies', movie.AsyncMovieListCreate.as_view(), name='movie_list_create'),
+    path('api/movies/<int:movie_id>/votes', movie.AsyncMovieVoteListCreateUpdateDelete.as_view(),
+         name='movie_vote_list_create_update_delete'),
+]
+
+
+@override_settings(ROOT_URLCONF='api.tests.test_async')
+class AsyncViewTests(APITransactionTestCase):
+    """
+    TestCase class that exercises the async views through the ASGI handler
+
+    Async views query the database from other threads, so the data is committed rather than rolled back.
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        # Create users
+        self.user1 = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com",
+                                         password="Testing-123")
+        self.user2 = User.objects.create(first_name="Jane", last_name="Doe", username="jane", email="jane@mr.com",
+                                         password="Testing-123")
+
+        # Create movies
+        self.movie1 = Movie.objects.create(title="Madagascar", description="Animation", user=self.user1)
+        self.movie2 = Movie.objects.create(title="Ice Age", description="Animation", user=self.user2)
+        Vote.objects.create(movie=self.movie1, user=self.user2, reaction=Vote.SupportedMovieVotes.LIKE)
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        Vote.objects.all().delete()
+        Movie.objects.all().delete()
+        User.objects.all().delete()
+
+    def request(self, method, url, data=None, user=None, **extra):
+        """
+        Send a request through the ASGI handler, authenticated as `user` if given
+        """
+
+        if user is not None:
+            extra['authorization'] = 'Bearer %s' % RefreshToken.for_user(user).access_token
+        if method == 'get':
+            # The async test client of Django 3.1 drops the data of GET requests
+            url, data = url + '?' + urlencode(data or {}), None
+        else:
+            extra['content_type'] = 'application/json'
+        send = getattr(self.async_client, method)
+        return async_to_sync(send)(url, data if data is not None else {}, **extra)
+
+    def test_async_views(self):
+        """
+        Test the views resolved by the async URLs
+        """
+
+        # Make sure the views are coroutine functions, that Django awaits on its event loop
+        for url in (reverse('movie_list_create'), reverse('user_retrieve', kwargs={'pk': self.user1.pk}),
+                    reverse('movie_vote_list_create_update_delete', kwargs={'movie_id': self.movie1.pk})):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func))
+
+    def test_movie_list(self):
+        """
+        Test GET & POST: /api/movies
+        """
+
+        url = reverse('movie_list_create')
+
+        # Make sure the endpoint is publicly accessible and returns the movies with their votes
+        response = self.request('get', url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([movie['title'] for movie in response.data['results']], ["Ice Age", "Madagascar"])
+        self.assertEqual(response.data['results'][1]['likes'], 1)
+
+        # Make sure the logged in user's votes, filtering & ordering behave like the sync view
+        response = self.request('get', url, {'ordering': 'title'}, user=self.user2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(movie['title'], movie['vote']) for movie in response.data['results']],
+                         [("Ice Age", None), ("Madagascar", 'like')])
+        response = self.request('get', url, {'user_id': self.user2.pk})
+        self.assertEqual([movie['title'] for movie in response.data['results']], ["Ice Age"])
+
+        # Make sure an unchanged list is answered with a 304
+        response = self.request('get', url, user=self.user2)
+        response = self.request('get', url, user=self.user2, if_none_match=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Make sure only logged in users can submit movies
+        response = self.request('post', url, {"title": "Shrek"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.request('post', url, {"title": "Shrek"}, user=self.user1)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Movie.objects.filter(title="Shrek", user=self.user1).exists())
+
+    def test_movie_votes(self):
+        """
+        Test GET, POST, PUT, PATCH & DELETE: /api/movies/<movie_id>/votes
+        """
+
+        url = reverse('movie_vote_list_create_update_delete', kwargs={'movie_id': self.movie2.pk})
+
+        # Make sure the endpoint is not publicly accessible
+        response = self.request('get', url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Make sure users can not vote for their own movies
+        response = self.request('post', url, {"reaction": "like"}, user=self.user2)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Make sure the vote is created, updated & deleted along with the movie's counters
+        response = self.request('post', url, {"reaction": "like"}, user=self.user1)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.request('patch', url, {"reaction": "hate"}, user=self.user1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.movie2.refresh_from_db()
+        self.assertEqual((self.movie2.likes_count, self.movie2.hates_count), (0, 1))
+
+        response = self.request('get', url, {'reaction': 'hate'}, user=self.user1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+        response = self.request('delete', url, user=self.user1)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.request('put', url, {"reaction": "like"}, user=self.user1)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.movie2.refresh_from_db()
+        self.assertEqual((self.movie2.likes_count, self.movie2.hates_count), (1, 0))
+
+    def test_user_retrieve(self):
+        """
+        Test GET: /api/users/<id>
+        """
+
+        # Make sure the endpoint is publicly accessible and returns 404 for unknown users
+        response = self.request('get', reverse('user_retrieve', kwargs={'pk': self.user1.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['username'], self.user1.username)
+        response = self.request('get', reverse('user_retrieve', kwargs={'pk': 0}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(SERVER_TIMING=True)
+    def test_queries_followed(self):
+        """
+        Test the execute wrappers of the middleware on the queries of async views
+        """
+
+        # Make sure the queries run on database threads are counted for the request
+        response = self.request('get', reverse('movie_list_create'), user=self.user2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
@@ -0,0 +1,131 @@
+import csv
+import json
+from unittest import mock
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import User, Movie, Vote
+from api.views.export import ExportView
+
+
+class ExportTests(APITestCase):
+    """
+    TestCase class that exercises the export endpoints of the Movie & Movie Vote API Resources
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        # Create users
+        self.user1 = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com",
+                                         password="Testing-123")
+        self.user2 = User.objects.create(first_name="Jane", last_name="Doe", username="jane", email="jane@mr.com",
+                                         password="Testing-123")
+
+        # Create movies
+        self.movie1 = Movie.objects.create(title="Madagascar", description="Animation, \"2005\"", user=self.user1)
+        self.movie2 = Movie.objects.create(title="Ice Age", description="Animation", user=self.user2)
+        self.movie3 = Movie.objects.create(title="Shrek", description="Animation", user=self.user2)
+
+        # Create votes
+        Vote.objects.create(movie=self.movie1, user=self.user2, reaction=Vote.SupportedMovieVotes.LIKE)
+        Vote.objects.create(movie=self.movie2, user=self.user1, reaction=Vote.SupportedMovieVotes.HATE)
+        Vote.objects.create(movie=self.movie3, user=self.user1, reaction=Vote.SupportedMovieVotes.LIKE)
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        User.objects.all().delete()
+        Movie.objects.all().delete()
+        Vote.objects.all().delete()
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(RefreshToken.for_user(user).access_token))
+
+    def read_ndjson(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def read_csv(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+
+    def test_movie_export(self):
+        """
+        Test GET: /api/movies/export
+        """
+
+        url = reverse('movie_export')
+
+        # Make sure the endpoint is publicly accessible and streams every movie in id order as NDJSON
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = self.read_ndjson(response)
+        self.assertEqual([row['title'] for row in rows], ["Madagascar", "Ice Age", "Shrek"])
+        self.assertEqual(rows[0], {
+            'id': self.movie1.pk, 'title': "Madagascar", 'description': "Animation, \"2005\"",
+            'user_id': self.user1.pk, 'created': rows[0]['created'], 'updated': rows[0]['updated'],
+            'likes': 1, 'hates': 0,
+        })
+
+        # Make sure the movies are streamed as CSV too, filtered & resumed after the last id seen
+        response = self.client.get(url, {'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="movies.csv"')
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0]['description'], "Animation, \"2005\"")
+        self.assertEqual([row['title'] for row in rows], ["Madagascar", "Ice Age", "Shrek"])
+
+        rows = self.read_csv(self.client.get(url, {'format': 'csv', 'user_id': self.user2.pk}))
+        self.assertEqual([row['title'] for row in rows], ["Ice Age", "Shrek"])
+        rows = self.read_ndjson(self.client.get(url, {'user_id': self.user2.pk, 'after': self.movie2.pk}))
+        self.assertEqual([row['title'] for row in rows], ["Shrek"])
+
+        # Make sure invalid resume ids are rejected
+        response = self.client.get(url, {'after': 'last'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_movie_vote_export(self):
+        """
+        Test GET: /api/movies/votes/export
+        """
+
+        url = reverse('movie_vote_export')
+
+        # Make sure the endpoint is not publicly accessible
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Make sure every vote is streamed, with the user_id, movie_id & reaction filters
+        self.authenticate(self.user1)
+        rows = self.read_ndjson(self.client.get(url))
+        self.assertEqual([(row['movie_id'], row['reaction']) for row in rows],
+                         [(self.movie1.pk, 'like'), (self.movie2.pk, 'hate'), (self.movie3.pk, 'like')])
+        rows = self.read_csv(self.client.get(url, {'reaction': 'like', 'user_id': self.user1.pk},
+                                             HTTP_ACCEPT='text/csv'))
+        self.assertEqual([int(row['movie_id']) for row in rows], [self.movie3.pk])
+        rows = self.read_ndjson(self.client.get(url, {'movie_id': self.movie2.pk}))
+        self.assertEqual([row['user_id'] for row in rows], [self.user1.pk])
+        rows = self.read_ndjson(self.client.get(url, {'after': rows[0]['id']}))
+        self.assertEqual([row['movie_id'] for row in rows], [self.movie3.pk])
+
+    def test_chunks(self):
+        """
+        Test the chunks the exports are streamed in
+        """
+
+        # Make sure the rows are sent in chunks rather than rendered in a single body
+        with mock.patch.object(ExportView, 'chunk_size', 2):
+            response = self.client.get(reverse('movie_export'), {'format': 'csv'})
+            chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(chunks[0].startswith(b'id,title,'))
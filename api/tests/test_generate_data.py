@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count, F
+from rest_framework.test import APITestCase
+
+from api.management.bulk import deferred_indexes
+from api.models import User, Movie, Vote
+
+
+class GenerateDataTests(APITestCase):
+    """
+    TestCase class that exercises the generate_data management command
+    """
+
+    options = ('--users', '20', '--movies', '50', '--votes', '400', '--seed', '7')
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        User.objects.all().delete()
+        Movie.objects.all().delete()
+        Vote.objects.all().delete()
+
+    def votes(self):
+        return set(Vote.objects.values_list('user__username', 'movie__title', 'reaction'))
+
+    def test_generate_data(self):
+        """
+        Test the generate_data management command
+        """
+
+        call_command('generate_data', *self.options, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Movie.objects.count(), 50)
+        self.assertEqual(Vote.objects.count(), 400)
+
+        # Make sure nobody votes for their own movies
+        self.assertFalse(Vote.objects.filter(user=F('movie__user')).exists())
+
+        # Make sure the votes are skewed towards a few hot movies
+        counts = list(Vote.objects.values('movie').annotate(c=Count('id')).order_by('-c').values_list('c', flat=True))
+        self.assertGreater(sum(counts[:5]), 400 // 10 * 2)
+
+        # Make sure the counters match the votes
+        out = StringIO()
+        call_command('reconcile_vote_counts', '--dry-run', stdout=out)
+        self.assertIn('Found 0 movie(s)', out.getvalue())
+
+        # Make sure an existing data set is not generated twice
+        with self.assertRaises(CommandError):
+            call_command('generate_data', *self.options, stdout=StringIO())
+
+        # Make sure the same seed generates the same data set
+        votes = self.votes()
+        call_command('generate_data', *self.options, '--flush', stdout=StringIO())
+        self.assertEqual(self.votes(), votes)
+        self.assertEqual(User.objects.count(), 20)
+        call_command('generate_data', *self.options[:-1], '8', '--flush', stdout=StringIO())
+        self.assertNotEqual(self.votes(), votes)
+
+    def test_deferred_indexes(self):
+        """
+        Test the indexes dropped during bulk inserts
+        """
+
+        def indexes():
+            with connection.cursor() as cursor:
+                return {name for name, constraint in connection.introspection.get_constraints(
+                    cursor, Vote._meta.db_table).items() if constraint['index'] and not constraint['unique']}
+
+        before = indexes()
+        self.assertTrue(before)
+
+        # Make sure the indexes are created again when the inserts fail
+        with self.assertRaises(RuntimeError):
+            with deferred_indexes(Vote):
+                self.assertFalse(indexes())
+                raise RuntimeError()
+        self.assertEqual(indexes(), before)
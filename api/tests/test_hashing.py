@@ -0,0 +1,129 @@
+import threading
+
+from django.contrib.auth.hashers import make_password
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api import hashing
+from api.metrics import registry
+from api.models import User
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=1, PASSWORD_HASHING_QUEUE=1)
+class PasswordHashingTests(APITestCase):
+    """
+    TestCase class that exercises the password hashing pool
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        self.user1_password = "Testing-123"
+        self.user1 = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com",
+                                         password=make_password(self.user1_password))
+        self.signup = {"first_name": "Jane", "last_name": "Doe", "username": "jane", "email": "jane@mr.com",
+                       "password": "Testing-123"}
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        User.objects.all().delete()
+
+    def test_hashed_on_pool(self):
+        """
+        Test POST: /api/users & /api/token
+        """
+
+        threads = []
+        pool = hashing.get_pool()
+        run = pool.run
+
+        def record_thread(operation, func, *args):
+            def recorded(*args):
+                threads.append(threading.current_thread().name)
+                return func(*args)
+
+            return run(operation, recorded, *args)
+
+        pool.run = record_thread
+
+        # Make sure signups & logins hash the password on the pool and keep working
+        response = self.client.post(reverse('user_list_create'), self.signup, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user = User.objects.get(username="jane")
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(user.check_password("Testing-123"))
+        self.assertFalse(user.check_password("foo"))
+
+        response = self.client.post(reverse('token_obtain_pair'),
+                                    {"username": "jane", "password": "Testing-123"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(threads), 4)
+        self.assertTrue(all(name.startswith('password-hashing') for name in threads))
+
+        # Make sure the hashing latency is exposed
+        metrics = registry.expose()
+        self.assertIn('password_hash_duration_seconds_count{operation="make"}', metrics)
+        self.assertIn('password_hash_duration_seconds_count{operation="check"}', metrics)
+
+    def test_backpressure(self):
+        """
+        Test POST: /api/token & /api/users with a full hashing queue
+        """
+
+        pool = hashing.get_pool()
+        for i in range(pool.capacity):
+            pool.slots.acquire()
+
+        # Make sure logins & signups are turned down with a Retry-After header while the queue is full
+        try:
+            response = self.client.post(reverse('token_obtain_pair'),
+                                        {"username": "john", "password": self.user1_password}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+            response = self.client.post(reverse('user_list_create'), self.signup, format='json')
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertFalse(User.objects.filter(username="jane").exists())
+            self.assertIn('password_hash_rejected_total{operation="check"}', registry.expose())
+        finally:
+            for i in range(pool.capacity):
+                pool.slots.release()
+
+        # Make sure they go through again once the queue drains
+        response = self.client.post(reverse('token_obtain_pair'),
+                                    {"username": "john", "password": self.user1_password}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(REQUEST_THREADS=4, PASSWORD_HASHING_WORKERS=2, PASSWORD_HASHING_QUEUE=4)
+    def test_capacity(self):
+        """
+        Test the number of hashes in flight against the request threads
+        """
+
+        # Make sure the hashes in flight always leave a request thread free for other requests
+        self.assertEqual(hashing.get_pool().capacity, 3)
+        with override_settings(REQUEST_THREADS=8):
+            self.assertEqual(hashing.get_pool().capacity, 6)
+        with override_settings(REQUEST_THREADS=1):
+            self.assertEqual(hashing.get_pool().capacity, 1)
+
+    def test_hash_upgrade(self):
+        """
+        Test the upgrade of outdated password hashes on login
+        """
+
+        # Make sure a valid password hashed with a hasher that is not the preferred one gets rehashed
+        User.objects.filter(pk=self.user1.pk).update(
+            password=make_password(self.user1_password, hasher='pbkdf2_sha1'))
+        response = self.client.post(reverse('token_obtain_pair'),
+                                    {"username": "john", "password": self.user1_password}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user1.refresh_from_db()
+        self.assertTrue(self.user1.password.startswith('pbkdf2_sha256$'))
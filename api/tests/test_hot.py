@@ -0,0 +1,154 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import User, Movie, Vote
+from api.models.movie import hot_score
+
+
+class HotTests(APITestCase):
+    """
+    TestCase class that exercises the `hot` ordering of the Movie API Resource and the update_hot_scores command
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        # Create users
+        self.users = [User.objects.create(first_name="User", last_name=str(i), username="user%d" % i,
+                                          email="user%d@mr.com" % i, password="Testing-123") for i in range(4)]
+
+        # Create movies: an old blockbuster, a recent hit and a new movie
+        self.movie1 = Movie.objects.create(title="Madagascar", description="Animation", user=self.users[0])
+        self.movie2 = Movie.objects.create(title="Ice Age", description="Animation", user=self.users[0])
+        self.movie3 = Movie.objects.create(title="Shrek", description="Animation", user=self.users[0])
+
+        # Create votes
+        for user in self.users[1:]:
+            Vote.objects.create(movie=self.movie1, user=user, reaction=Vote.SupportedMovieVotes.LIKE)
+        for user in self.users[1:3]:
+            Vote.objects.create(movie=self.movie2, user=user, reaction=Vote.SupportedMovieVotes.LIKE)
+
+        # Date the blockbuster & its votes a month back, the hit & its votes a day back
+        now = timezone.now()
+        for movie, age in ((self.movie1, timedelta(days=30)), (self.movie2, timedelta(days=1))):
+            Movie.objects.filter(pk=movie.pk).update(created=now - age)
+            Vote.objects.filter(movie=movie).update(created=now - age)
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        User.objects.all().delete()
+        Movie.objects.all().delete()
+        Vote.objects.all().delete()
+
+    def update_hot_scores(self, *args):
+        out = StringIO()
+        call_command('update_hot_scores', '--once', *args, stdout=out)
+        return out.getvalue()
+
+    def titles(self, **params):
+        response = self.client.get(reverse('movie_list_create'), params, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [movie['title'] for movie in response.data['results']]
+
+    def test_hot_score(self):
+        """
+        Test the hot score of movies
+        """
+
+        now = timezone.now()
+        day = timedelta(days=1)
+
+        # Make sure doubling the net likes is worth a half-life of recency
+        with override_settings(HOT_HALF_LIFE_HOURS=24):
+            self.assertAlmostEqual(hot_score(now, [(now, 1)]) - hot_score(now, ()), 1)
+            self.assertAlmostEqual(hot_score(now - day, [(now - day, 1)] * 3), hot_score(now, [(now, 1)]))
+
+        # Make sure recent votes weigh more than old ones, and hates sink movies
+        self.assertGreater(hot_score(now - day, [(now, 1)]), hot_score(now - day, [(now - day, 1)]))
+        self.assertGreater(hot_score(now, [(now, 1), (now, -1)]), hot_score(now, [(now, -1), (now, -1)]))
+        self.assertLess(hot_score(now, [(now, -1)] * 3), hot_score(now - 30 * day, [(now - 30 * day, -1)] * 3))
+
+    def test_movie_list_hot(self):
+        """
+        Test GET: /api/movies?ordering=-hot
+        """
+
+        # Make sure every movie is scored on the first run, the recent hit ranking above the old blockbuster
+        self.assertIn('Scored 3 movie(s)', self.update_hot_scores())
+        self.assertEqual(self.titles(ordering='-hot'), ["Ice Age", "Shrek", "Madagascar"])
+        self.assertEqual(self.titles(ordering='hot'), ["Madagascar", "Shrek", "Ice Age"])
+
+        # Make sure the ordering is paginated
+        response = self.client.get(reverse('movie_list_create'), {'ordering': '-hot', 'page_size': 2}, format='json')
+        response = self.client.get(response.data['next'], format='json')
+        self.assertEqual([movie['title'] for movie in response.data['results']], ["Madagascar"])
+
+        # Make sure the scores are updated in the background, changing the ETag of the list
+        etag = self.client.get(reverse('movie_list_create'), {'ordering': '-hot'}, format='json')['ETag']
+        for user in self.users[1:]:
+            Vote.objects.create(movie=self.movie3, user=user, reaction=Vote.SupportedMovieVotes.LIKE)
+        self.assertEqual(self.titles(ordering='-hot'), ["Ice Age", "Shrek", "Madagascar"])
+        etag = self.client.get(reverse('movie_list_create'), {'ordering': '-hot'}, format='json',
+                               HTTP_IF_NONE_MATCH=etag)['ETag']
+        self.update_hot_scores()
+        response = self.client.get(reverse('movie_list_create'), {'ordering': '-hot'}, format='json',
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([movie['title'] for movie in response.data['results']], ["Shrek", "Ice Age", "Madagascar"])
+
+    def test_movie_list_hot_cache(self):
+        """
+        Test the response cache of GET: /api/movies?ordering=-hot
+        """
+
+        self.update_hot_scores()
+        for user in self.users[1:]:
+            Vote.objects.create(movie=self.movie3, user=user, reaction=Vote.SupportedMovieVotes.LIKE)
+        response = self.client.get(reverse('movie_list_create'), {'ordering': '-hot'}, format='json')
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+        # Make sure scores updated by another process, whose cache the workers do not share, are not served from
+        # the cached responses
+        with mock.patch('api.management.commands.update_hot_scores.bump_content_version'):
+            self.update_hot_scores()
+        response = self.client.get(reverse('movie_list_create'), {'ordering': '-hot'}, format='json')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([movie['title'] for movie in response.data['results']], ["Shrek", "Ice Age", "Madagascar"])
+
+    def test_update_hot_scores(self):
+        """
+        Test the update_hot_scores management command
+        """
+
+        self.update_hot_scores()
+        scored = Movie.objects.get(pk=self.movie1.pk).hot_updated
+
+        # Make sure only the movies voted for since the previous run are scored again
+        Vote.objects.create(movie=self.movie2, user=self.users[3], reaction=Vote.SupportedMovieVotes.HATE)
+        self.assertIn('Scored 1 movie(s)', self.update_hot_scores('--overlap', '0'))
+        self.assertEqual(Movie.objects.get(pk=self.movie1.pk).hot_updated, scored)
+        self.assertGreater(Movie.objects.get(pk=self.movie2.pk).hot_updated, scored)
+        self.assertIn('Scored 0 movie(s)', self.update_hot_scores('--overlap', '0'))
+
+        # Make sure the movies updated shortly before the previous run are scored again, for the votes of
+        # transactions that were still running during the previous run to be counted
+        self.assertIn('Scored 3 movie(s)', self.update_hot_scores())
+
+        # Make sure votes written without touching the movie are only counted when scoring every movie
+        Vote.objects.filter(movie=self.movie1).update(created=timezone.now())
+        self.assertIn('Scored 0 movie(s)', self.update_hot_scores('--overlap', '0'))
+        self.assertIn('Scored 3 movie(s)', self.update_hot_scores('--all'))
+        self.assertEqual(self.titles(ordering='-hot')[0], "Madagascar")
@@ -0,0 +1,101 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from api.models import User, Movie, Vote
+
+
+class ImportDataTests(APITestCase):
+    """
+    TestCase class that exercises the import_data management command
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        self.directory = tempfile.TemporaryDirectory()
+
+        self.users = self.write('users.jsonl', '\n'.join(json.dumps(row) for row in [
+            {"username": "john", "email": "john@mr.com", "first_name": "John", "last_name": "Doe",
+             "password": "pbkdf2_sha256$216000$salt$hash", "created": "2020-10-15T12:00:00Z"},
+            {"username": "jane", "email": "jane@mr.com", "first_name": "Jane", "last_name": "Doe"},
+            {"username": "broken"},
+        ]))
+        self.movies = self.write('movies.csv', '\n'.join([
+            'title,description,user,created',
+            'Madagascar,Animation,john,2020-10-16T12:00:00Z',
+            'Ice Age,"Animation, with a comma",jane,',
+            'Orphan,Horror,,2020-10-17T12:00:00',
+            'Ghost,Nobody,nobody,',
+        ]))
+        self.votes = self.write('votes.jsonl', '\n'.join(json.dumps(row) for row in [
+            {"user": "jane", "movie": "Madagascar", "reaction": "like"},
+            {"user": "john", "movie": "Orphan", "reaction": "hate"},
+            {"user": "jane", "movie": "Orphan", "reaction": "hate"},
+            {"user": "john", "movie": "Madagascar", "reaction": "like"},
+            {"user": "john", "movie": "Ice Age", "reaction": "meh"},
+            {"user": "nobody", "movie": "Ice Age", "reaction": "like"},
+        ]))
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        self.directory.cleanup()
+        User.objects.all().delete()
+        Movie.objects.all().delete()
+        Vote.objects.all().delete()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_import_data(self):
+        """
+        Test the import_data management command
+        """
+
+        out = StringIO()
+        call_command('import_data', 'users', self.users, '--batch-size', '1', stdout=out)
+        self.assertIn('Imported 2 users', out.getvalue())
+        self.assertIn('0 already present', out.getvalue())
+        self.assertIn('skipped 1 row(s)', out.getvalue())
+
+        # Make sure hashed passwords & dates are kept as given
+        john = User.objects.get(username='john')
+        self.assertEqual(john.password, 'pbkdf2_sha256$216000$salt$hash')
+        self.assertEqual(john.created.isoformat(), '2020-10-15T12:00:00+00:00')
+        self.assertFalse(User.objects.get(username='jane').has_usable_password())
+
+        # Make sure users & movies are resolved by their natural keys and unknown ones are skipped
+        call_command('import_data', 'movies', self.movies, '--transaction-size', '2', stdout=StringIO())
+        self.assertEqual(Movie.objects.count(), 3)
+        self.assertEqual(Movie.objects.get(title='Ice Age').description, 'Animation, with a comma')
+        self.assertIsNone(Movie.objects.get(title='Orphan').user)
+
+        out = StringIO()
+        call_command('import_data', 'votes', self.votes, stdout=out)
+        self.assertIn('Imported 3 votes', out.getvalue())
+        self.assertIn('skipped 3 row(s)', out.getvalue())
+
+        # Make sure the counters are reconciled after the bulk insert
+        orphan = Movie.objects.get(title='Orphan')
+        self.assertEqual((orphan.likes_count, orphan.hates_count), (0, 2))
+
+        # Make sure importing the same file again does not duplicate rows, nor reports them as imported
+        out = StringIO()
+        call_command('import_data', 'votes', self.votes, stdout=out)
+        self.assertIn('Imported 0 votes', out.getvalue())
+        self.assertIn('3 already present', out.getvalue())
+        self.assertEqual(Vote.objects.count(), 3)
+        orphan.refresh_from_db()
+        self.assertEqual((orphan.likes_count, orphan.hates_count), (0, 2))
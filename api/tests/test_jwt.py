@@ -1,10 +1,14 @@
 from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
-from api.models import User
+from api.authentication import token_cache
+from api.models import Movie, User
 
 
 class JwtTests(APITestCase):
@@ -76,3 +80,90 @@ class JwtTests(APITestCase):
         }
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenCacheTests(APITestCase):
+    """
+    TestCase class that exercises the cache of verified tokens
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        token_cache.clear()
+        self.user1 = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com",
+                                         password=make_password("Testing-123"))
+        self.movie = Movie.objects.create(title="Movie", user=self.user1)
+        self.token = str(RefreshToken.for_user(self.user1).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        token_cache.clear()
+        Movie.objects.all().delete()
+        User.objects.all().delete()
+
+    def test_user_not_loaded(self):
+        """
+        Test GET: /api/movies
+        """
+
+        url = reverse('movie_list_create')
+
+        # Make sure an authenticated request that only needs the user id never loads the user
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries if 'FROM "api_user"' in query['sql']])
+        self.assertIn(self.token.encode(), token_cache.entries)
+
+    def test_user_evicted(self):
+        """
+        Test the eviction of the tokens of saved & deleted users
+        """
+
+        url = reverse('movie_list_create')
+        self.client.get(url, format='json')
+        self.assertIn(self.token.encode(), token_cache.entries)
+
+        # Make sure the tokens of a user are forgotten once the user changes
+        self.user1.first_name = "Jane"
+        self.user1.save()
+        self.assertNotIn(self.token.encode(), token_cache.entries)
+
+        # Make sure the token of a deleted user is not accepted anymore
+        self.client.get(url, format='json')
+        self.user1.delete()
+        self.assertNotIn(self.token.encode(), token_cache.entries)
+        response = self.client.post(url, {"title": "Other movie"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(JWT_AUTH_CACHE_SIZE=2)
+    def test_cache_size(self):
+        """
+        Test the eviction of the least recently used tokens
+        """
+
+        tokens = [str(AccessToken.for_user(self.user1)) for i in range(3)]
+        for token in tokens:
+            token_cache.add(token.encode(), AccessToken(token), self.user1.pk)
+
+        # Make sure only the most recently used tokens are kept
+        self.assertEqual(list(token_cache.entries), [token.encode() for token in tokens[1:]])
+        self.assertEqual(token_cache.user_tokens[self.user1.pk], {token.encode() for token in tokens[1:]})
+
+    @override_settings(JWT_AUTH_CACHE_TTL=0)
+    def test_cache_expiry(self):
+        """
+        Test the expiry of cached tokens
+        """
+
+        # Make sure an expired entry is dropped
+        token_cache.add(self.token.encode(), AccessToken(self.token), self.user1.pk)
+        self.assertIsNone(token_cache.get(self.token.encode()))
+        self.assertFalse(token_cache.entries)
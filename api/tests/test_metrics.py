@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import time
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.metrics import process_start_time
+from api.models import User, Movie
+
+
+class MetricsTests(APITestCase):
+    """
+    TestCase class that exercises the /metrics endpoint
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        self.user1 = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com",
+                                         password="Testing-123")
+        self.movie1 = Movie.objects.create(title="Madagascar", description="Animation", user=self.user1)
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        User.objects.all().delete()
+        Movie.objects.all().delete()
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        samples = {}
+        for line in response.content.decode('utf-8').splitlines():
+            if not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+        return samples
+
+    def read_file(self, path):
+        with open(path) as f:
+            return json.load(f)
+
+    def test_metrics(self):
+        """
+        Test GET: /metrics
+        """
+
+        before = self.scrape()
+        for _ in range(3):
+            self.client.get(reverse('movie_list_create'), format='json')
+        self.client.get(reverse('user_retrieve', kwargs={'pk': 0}), format='json')
+        after = self.scrape()
+
+        def delta(sample):
+            return after.get(sample, 0) - before.get(sample, 0)
+
+        # Make sure requests are counted per url name & status
+        self.assertEqual(delta('http_requests_total{view="movie_list_create",method="GET",status="200"}'), 3)
+        self.assertEqual(delta('http_requests_total{view="user_retrieve",method="GET",status="404"}'), 1)
+        self.assertEqual(delta('http_request_duration_seconds_count{view="movie_list_create",method="GET"}'), 3)
+        self.assertEqual(delta('http_request_duration_seconds_bucket{view="movie_list_create",method="GET",le="+Inf"}'),
+                         3)
+
+        # Make sure the cached responses skipped the queries
+        self.assertEqual(delta('db_queries_per_request_bucket{view="movie_list_create",le="1"}'), 2)
+        self.assertEqual(delta('cache_requests_total{cache="response",result="hit"}'), 2)
+        self.assertIn('cache_hit_ratio{cache="response"}', after)
+
+        # Make sure the scrape counts itself as in flight
+        self.assertEqual(after['http_requests_in_flight'], 1)
+
+    def test_metrics_multiprocess(self):
+        """
+        Test GET: /metrics with the samples of several worker processes
+        """
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            # A live worker, an exited one and an exited one whose pid was reused
+            parent = os.getppid()
+            for pid, started in ((parent, process_start_time(parent)), (2 ** 22 + 1, 1), (parent, 1)):
+                with open(os.path.join(directory, '%d-%d.json' % (pid, started)), 'w') as f:
+                    json.dump([
+                        [['http_requests_total', '', ['movie_list_create', 'GET', '200']], 5],
+                        [['http_requests_in_flight', '', []], 2],
+                    ], f)
+
+            samples = self.scrape()
+            path = os.path.join(directory, '%d-%d.json' % (os.getpid(), process_start_time(os.getpid())))
+            self.assertTrue(os.path.exists(path))
+
+            # Make sure the files of the exited workers are folded into one, without counting them twice
+            self.assertEqual(sorted(name for name in os.listdir(directory) if name.endswith('.json')),
+                             sorted(['%d-%d.json' % (parent, process_start_time(parent)), os.path.basename(path),
+                                     'exited.json']))
+            total = 'http_requests_total{view="movie_list_create",method="GET",status="200"}'
+            self.assertEqual(self.scrape()[total], samples[total])
+
+            # Make sure the samples of an idle worker are flushed in the background
+            self.client.get(reverse('movie_list_create'), format='json')
+            idle = [['http_requests_in_flight', '', []], 0]
+            deadline = time.monotonic() + 5
+            while idle not in self.read_file(path) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertIn(idle, self.read_file(path))
+
+        # Make sure counters of every worker add up and gauges only count the live ones
+        self.assertGreaterEqual(samples[total], 15)
+        self.assertEqual(samples['http_requests_in_flight'], 3)
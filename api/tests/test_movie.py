@@ -1,8 +1,15 @@
+import tempfile
+from base64 import urlsafe_b64encode
+
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from api.cache import response_cache_stats
+from api.management.bulk import delete_rows
 from api.models import User, Movie, Vote
 
 
@@ -48,43 +55,57 @@ class MovieTests(APITestCase):
         # Make sure the endpoint is publicly accessible and returns two movies
         response = self.client.get(url, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
         # Make sure all expected fields are in response
         user_fields = ('id', 'title', 'description', 'created', 'user', 'likes', 'hates', 'vote')
-        self.assertTrue(all(k in response.data[0] for k in user_fields), 'Missing field from movie serializer')
+        self.assertTrue(all(k in response.data['results'][0] for k in user_fields),
+                        'Missing field from movie serializer')
 
         # Make sure we get the correct ordering
         response = self.client.get(url + "?ordering=title", format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["title"], self.movie2.title)
-        self.assertEqual(response.data[1]["title"], self.movie1.title)
+        self.assertEqual(response.data['results'][0]["title"], self.movie2.title)
+        self.assertEqual(response.data['results'][1]["title"], self.movie1.title)
         response = self.client.get(url + "?ordering=-likes", format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["id"], self.movie1.id)
-        self.assertEqual(response.data[0]["likes"], 1)
-        self.assertEqual(response.data[0]["hates"], 0)
-        self.assertIsNone(response.data[0]["vote"])
+        self.assertEqual(response.data['results'][0]["id"], self.movie1.id)
+        self.assertEqual(response.data['results'][0]["likes"], 1)
+        self.assertEqual(response.data['results'][0]["hates"], 0)
+        self.assertIsNone(response.data['results'][0]["vote"])
 
         # Make sure filtering is working as expected
         response = self.client.get(url + "?user_id=" + str(self.user2.pk), format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["title"], self.movie2.title)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]["title"], self.movie2.title)
 
         # Make sure user1 does not have any vote for this movie
         token = RefreshToken.for_user(self.user1)
         self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token.access_token))
         response = self.client.get(url + "?user_id=" + str(self.user1.pk), format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIsNone(response.data[0]["vote"])
+        self.assertIsNone(response.data['results'][0]["vote"])
 
         # Make sure user2 has a like vote for this movie
         token = RefreshToken.for_user(self.user2)
         self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token.access_token))
         response = self.client.get(url + "?user_id=" + str(self.user1.pk), format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["vote"], Vote.SupportedMovieVotes.LIKE)
+        self.assertEqual(response.data['results'][0]["vote"], Vote.SupportedMovieVotes.LIKE)
+
+        # Make sure the user's votes of the whole page are loaded with a single query
+        # (ETag, movies page & the user's votes of the page, authentication does not load the user)
+        for i in range(10):
+            movie = Movie.objects.create(title="Movie %d" % i, user=self.user1)
+            Vote.objects.create(movie=movie, user=self.user2, reaction=Vote.SupportedMovieVotes.HATE)
+        with self.assertNumQueries(3):
+            response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        votes = {movie["title"]: movie["vote"] for movie in response.data['results']}
+        self.assertEqual(votes.pop(self.movie1.title), Vote.SupportedMovieVotes.LIKE)
+        self.assertIsNone(votes.pop(self.movie2.title))
+        self.assertTrue(all(vote == Vote.SupportedMovieVotes.HATE for vote in votes.values()))
 
     def test_movie_create(self):
         """
@@ -115,3 +136,219 @@ class MovieTests(APITestCase):
         response = self.client.post(url, {}, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('title', response.data)
+
+    def test_movie_list_pagination(self):
+        """
+        Test GET: /api/movies/ cursor pagination
+        """
+
+        url = reverse('movie_list_create')
+
+        # Add movies sharing the same number of likes so that pages have to be tie-broken on the id
+        for i in range(5):
+            Movie.objects.create(title="Movie %d" % i, user=self.user1)
+
+        for ordering in ('created', '-created', 'title', '-title', 'likes', '-likes', 'hates', '-hates'):
+            expected = [movie['id'] for movie in self.client.get(
+                url + "?page_size=100&ordering=" + ordering, format='json').data['results']]
+            self.assertEqual(len(expected), 7)
+
+            # Walk forward two movies at a time and make sure no movie is skipped or repeated
+            seen = []
+            pages = []
+            next_url = url + "?page_size=2&ordering=" + ordering
+            while next_url:
+                response = self.client.get(next_url, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                pages.append([movie['id'] for movie in response.data['results']])
+                seen.extend(pages[-1])
+                next_url = response.data['next']
+            self.assertEqual(seen, expected, 'Unexpected pages for ordering ' + ordering)
+            self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+
+            # Walk back from the last page using the previous links
+            seen = []
+            previous_url = response.data['previous']
+            while previous_url:
+                response = self.client.get(previous_url, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                seen = [movie['id'] for movie in response.data['results']] + seen
+                previous_url = response.data['previous']
+            self.assertEqual(seen, expected[:6], 'Unexpected previous pages for ordering ' + ordering)
+
+        # Make sure the count is only returned when asked for
+        response = self.client.get(url + "?page_size=2", format='json')
+        self.assertNotIn('count', response.data)
+        response = self.client.get(url + "?page_size=2&count=true&user_id=" + str(self.user1.pk), format='json')
+        self.assertEqual(response.data['count'], 6)
+
+        # Make sure we get 404 for an invalid cursor
+        response = self.client.get(url + "?cursor=foo", format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # Make sure we get 404 for a cursor whose values do not fit the fields of the ordering
+        for ordering, position in (('-created', '["x","y"]'), ('-created', '[1.5,2]'), ('-created', '[null,1]'),
+                                   ('-likes', '[1e400,1]'), ('title', '[[],1]')):
+            cursor = urlsafe_b64encode(('{"r":0,"p":%s}' % position).encode('utf-8')).decode('ascii')
+            response = self.client.get(url, {'ordering': ordering, 'cursor': cursor}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, 'Unexpected status for ' + position)
+
+    def test_movie_list_cache(self):
+        """
+        Test the response cache of GET: /api/movies/
+        """
+
+        url = reverse('movie_list_create')
+        response_cache_stats.reset()
+
+        # Make sure anonymous responses are cached per normalized query parameters
+        response = self.client.get(url + "?ordering=title&user_id=" + str(self.user1.pk), format='json')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        response = self.client.get(url + "?user_id=" + str(self.user1.pk) + "&ordering=title&cursor=", format='json')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(response.data['results']), 1)
+        response = self.client.get(url + "?ordering=-title", format='json')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response_cache_stats.snapshot(), {'hits': 1, 'misses': 2, 'hit_ratio': 1 / 3})
+
+        # Make sure a new movie invalidates the cached responses
+        token = RefreshToken.for_user(self.user1)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token.access_token))
+        response = self.client.get(url, format='json')
+        self.assertNotIn('X-Cache', response)
+        response = self.client.post(url, {"title": "Despicable Me"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.credentials()
+        response = self.client.get(url + "?ordering=title&user_id=" + str(self.user1.pk), format='json')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+        # Make sure a new vote invalidates the cached responses
+        self.client.get(url + "?ordering=-likes", format='json')
+        token = RefreshToken.for_user(self.user1)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token.access_token))
+        vote_url = reverse('movie_vote_list_create_update_delete', kwargs={'movie_id': self.movie2.id})
+        response = self.client.post(vote_url, {"reaction": Vote.SupportedMovieVotes.HATE}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.credentials()
+        response = self.client.get(url + "?ordering=-likes", format='json')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][-1]['hates'], 1)
+
+        # Make sure a write that did not move the content version on (e.g. by another process) is not served
+        # from the cache along with the ETag of the new content
+        etag = response['ETag']
+        Movie.objects.filter(pk=self.movie1.pk).update(likes_count=5, updated=timezone.now())
+        response = self.client.get(url + "?ordering=-likes", format='json')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['likes'], 5)
+        response = self.client.get(url + "?ordering=-likes", format='json')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['results'][0]['likes'], 5)
+
+    def test_movie_list_file_cache(self):
+        """
+        Test the response cache of GET: /api/movies/ with the file based cache backend
+        """
+
+        url = reverse('movie_list_create')
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir},
+        }):
+            response = self.client.get(url, format='json')
+            self.assertEqual(response['X-Cache'], 'MISS')
+            response = self.client.get(url, format='json')
+            self.assertEqual(response['X-Cache'], 'HIT')
+            self.assertEqual(len(response.data['results']), 2)
+
+            Movie.objects.create(title="Despicable Me", user=self.user1)
+            response = self.client.get(url, format='json')
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertEqual(len(response.data['results']), 3)
+
+    def test_movie_list_conditional(self):
+        """
+        Test conditional GET: /api/movies/
+        """
+
+        url = reverse('movie_list_create')
+
+        # Make sure an unchanged list is not serialized again
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        # Make sure logged in users get their own ETag, as the response includes their votes
+        token = RefreshToken.for_user(self.user2)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token.access_token))
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Authorization', response['Vary'])
+        etag = response['ETag']
+
+        # Make sure a vote changes the ETag
+        vote_url = reverse('movie_vote_list_create_update_delete', kwargs={'movie_id': self.movie1.id})
+        response = self.client.patch(vote_url, {"reaction": Vote.SupportedMovieVotes.HATE}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][-1]['vote'], Vote.SupportedMovieVotes.HATE)
+
+        # Make sure a new movie changes the ETag
+        etag = response['ETag']
+        Movie.objects.create(title="Despicable Me", user=self.user1)
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Make sure deleting a movie changes the ETag, even when it is neither the latest movie nor the latest update
+        # and is deleted without the signals of the ORM
+        etag = response['ETag']
+        delete_rows(Movie.objects.filter(pk=self.movie2.pk))
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(self.movie2.pk, [movie['id'] for movie in response.data['results']])
+
+    def test_movie_list_search(self):
+        """
+        Test GET: /api/movies?search=
+        """
+
+        url = reverse('movie_list_create')
+        Movie.objects.create(title="Frozen", description="Animation about a queen and her ice powers", user=self.user1)
+        Movie.objects.create(title="Ice Age 2", description="The meltdown", user=self.user2)
+
+        def titles(**params):
+            response = self.client.get(url, params, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [movie['title'] for movie in response.data['results']]
+
+        # Make sure whole words are matched in titles & descriptions, title matches ranking first, shorter ones first
+        self.assertEqual(titles(search="ICE"), ["Ice Age", "Ice Age 2", "Frozen"])
+        self.assertEqual(titles(search="ice animation"), ["Ice Age", "Frozen"])
+        self.assertEqual(titles(search="madagasc"), [])
+        self.assertEqual(titles(search="\"ice\" OR"), [])
+
+        # Make sure searches combine with the filters & the ordering, and are paged by rank
+        self.assertEqual(titles(search="ice", user_id=self.user2.pk), ["Ice Age", "Ice Age 2"])
+        self.assertEqual(titles(search="ice", ordering="title"), ["Frozen", "Ice Age", "Ice Age 2"])
+        response = self.client.get(url, {'search': 'ice', 'page_size': 2}, format='json')
+        self.assertEqual([movie['title'] for movie in response.data['results']], ["Ice Age", "Ice Age 2"])
+        response = self.client.get(response.data['next'], format='json')
+        self.assertEqual([movie['title'] for movie in response.data['results']], ["Frozen"])
+
+        # Make sure the rank ordering is ignored outside of searches
+        self.assertEqual(titles(ordering="rank")[0], "Ice Age 2")
+
+        # Make sure the index follows the updates & deletes of movies
+        self.movie2.title = "Ice Age 1"
+        self.movie2.save()
+        self.assertEqual(titles(search="1"), ["Ice Age 1"])
+        self.movie2.delete()
+        self.assertEqual(titles(search="ice age"), ["Ice Age 2"])
@@ -1,3 +1,6 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -160,3 +163,210 @@ class MovieVoteTests(APITestCase):
         url = reverse('movie_vote_list_create_update_delete', kwargs={'movie_id': self.movie4.id})
         response = self.client.patch(url, format='json')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_movie_vote_counts(self):
+        """
+        Test the like/hate counters of movies across POST, PATCH & DELETE: /api/movies/<id>/votes
+        """
+
+        url = reverse('movie_vote_list_create_update_delete', kwargs={'movie_id': self.movie2.id})
+        self.movie2.refresh_from_db()
+        self.assertEqual((self.movie2.likes_count, self.movie2.hates_count), (0, 1))
+
+        # Make sure a new vote increments the counter of its reaction
+        token = RefreshToken.for_user(self.user3)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token.access_token))
+        response = self.client.post(url, {"reaction": Vote.SupportedMovieVotes.LIKE}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.movie2.refresh_from_db()
+        self.assertEqual((self.movie2.likes_count, self.movie2.hates_count), (1, 1))
+
+        # Make sure switching the reaction moves the vote from one counter to the other
+        response = self.client.patch(url, {"reaction": Vote.SupportedMovieVotes.HATE}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.movie2.refresh_from_db()
+        self.assertEqual((self.movie2.likes_count, self.movie2.hates_count), (0, 2))
+
+        # Make sure re-submitting the same reaction leaves the counters untouched
+        response = self.client.put(url, {"reaction": Vote.SupportedMovieVotes.HATE}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.movie2.refresh_from_db()
+        self.assertEqual((self.movie2.likes_count, self.movie2.hates_count), (0, 2))
+
+        # Make sure deleting the vote decrements its counter
+        response = self.client.delete(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.movie2.refresh_from_db()
+        self.assertEqual((self.movie2.likes_count, self.movie2.hates_count), (0, 1))
+
+        # Make sure the movie list reads the counters without joining the votes
+        # (ETag, movies page & the user's votes of the page)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('movie_list_create') + "?ordering=-likes", format='json')
+        self.assertEqual([movie['likes'] for movie in response.data['results']], [2, 1, 1, 0])
+
+    def test_movie_vote_counts_concurrent_switch(self):
+        """
+        Test the like/hate counters of a movie when its vote is switched while being deleted or saved
+        """
+
+        # Make sure the counter of the reaction actually deleted is decremented, not the one the vote was read with
+        vote = Vote.objects.get(movie=self.movie1, user=self.user2)
+        Vote.objects.filter(pk=vote.pk).update(reaction=Vote.SupportedMovieVotes.HATE)
+        Movie.update_vote_counts(self.movie1.id, added=Vote.SupportedMovieVotes.HATE,
+                                 removed=Vote.SupportedMovieVotes.LIKE)
+        vote.delete()
+        self.movie1.refresh_from_db()
+        self.assertEqual((self.movie1.likes_count, self.movie1.hates_count), (0, 0))
+
+        # Make sure saving a vote moves the counters from the reaction actually stored
+        vote = Vote.objects.get(movie=self.movie4, user=self.user3)
+        Vote.objects.filter(pk=vote.pk).update(reaction=Vote.SupportedMovieVotes.HATE)
+        Movie.update_vote_counts(self.movie4.id, added=Vote.SupportedMovieVotes.HATE,
+                                 removed=Vote.SupportedMovieVotes.LIKE)
+        vote.reaction = Vote.SupportedMovieVotes.HATE
+        vote.save()
+        self.movie4.refresh_from_db()
+        self.assertEqual((self.movie4.likes_count, self.movie4.hates_count), (1, 1))
+
+    def test_reconcile_vote_counts(self):
+        """
+        Test the reconcile_vote_counts management command
+        """
+
+        # Bypass the counters the same way fixtures & queryset deletes do
+        Vote.objects.filter(movie=self.movie3).delete()
+        Movie.objects.filter(pk=self.movie4.pk).update(likes_count=7)
+
+        out = StringIO()
+        call_command('reconcile_vote_counts', '--dry-run', stdout=out)
+        self.assertIn('Found 2 movie(s)', out.getvalue())
+        self.movie3.refresh_from_db()
+        self.assertEqual((self.movie3.likes_count, self.movie3.hates_count), (1, 1))
+
+        out = StringIO()
+        call_command('reconcile_vote_counts', stdout=out)
+        self.assertIn('Fixed 2 movie(s)', out.getvalue())
+        self.movie3.refresh_from_db()
+        self.movie4.refresh_from_db()
+        self.assertEqual((self.movie3.likes_count, self.movie3.hates_count), (0, 0))
+        self.assertEqual((self.movie4.likes_count, self.movie4.hates_count), (2, 0))
+
+    def test_movie_votes_list_conditional(self):
+        """
+        Test conditional GET: /api/movies/<id>/votes
+        """
+
+        url = reverse('movie_vote_list_create_update_delete', kwargs={'movie_id': self.movie3.id})
+
+        # Make sure an unauthorized request never gets a 304
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        token = RefreshToken.for_user(self.user1)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token.access_token))
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Make sure switching a reaction changes the ETag
+        vote = Vote.objects.get(movie=self.movie3, user=self.user2)
+        vote.reaction = Vote.SupportedMovieVotes.HATE
+        vote.save()
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        # Make sure deleting a vote changes the ETag
+        vote.delete()
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+    def test_movie_vote_upsert(self):
+        """
+        Test PUT: /api/movies/<id>/votes creating a vote
+        """
+
+        url = reverse('movie_vote_list_create_update_delete', kwargs={'movie_id': self.movie2.id})
+        token = RefreshToken.for_user(self.user3)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token.access_token))
+
+        # Make sure PUT creates the vote when there is none, and updates it afterwards
+        response = self.client.put(url, {"reaction": Vote.SupportedMovieVotes.LIKE}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['reaction'], Vote.SupportedMovieVotes.LIKE)
+        self.assertEqual(response.data['user']['id'], self.user3.id)
+        response = self.client.put(url, {"reaction": Vote.SupportedMovieVotes.HATE}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['reaction'], Vote.SupportedMovieVotes.HATE)
+        self.movie2.refresh_from_db()
+        self.assertEqual((self.movie2.likes_count, self.movie2.hates_count), (0, 2))
+
+        # Make sure PUT follows the same rules as POST
+        token = RefreshToken.for_user(self.user1)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token.access_token))
+        response = self.client.put(url, {"reaction": Vote.SupportedMovieVotes.LIKE}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['non_field_errors'][0], 'You can not vote for movies you submitted.')
+        self.assertFalse(Vote.objects.filter(movie=self.movie2, user=self.user1).exists())
+
+        # Make sure voting for a missing movie is a 404
+        url = reverse('movie_vote_list_create_update_delete', kwargs={'movie_id': 0})
+        response = self.client.post(url, {"reaction": Vote.SupportedMovieVotes.LIKE}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_movie_vote_bulk(self):
+        """
+        Test POST: /api/movies/votes
+        """
+
+        url = reverse('movie_vote_bulk')
+
+        # Make sure the endpoint is not publicly accessible
+        response = self.client.post(url, [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        token = RefreshToken.for_user(self.user3)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token.access_token))
+
+        # Make sure invalid votes are rejected as a whole
+        response = self.client.post(url, [{"movie_id": self.movie1.id, "reaction": "love"}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # user3 hates movie3 & likes movie4, submitted nothing and has not voted for movie1 & movie2
+        data = [
+            {"movie_id": self.movie1.id, "reaction": Vote.SupportedMovieVotes.LIKE},
+            {"movie_id": self.movie2.id, "reaction": Vote.SupportedMovieVotes.HATE},
+            {"movie_id": self.movie3.id, "reaction": Vote.SupportedMovieVotes.LIKE},
+            {"movie_id": self.movie4.id, "reaction": None},
+            {"movie_id": self.movie1.id, "reaction": Vote.SupportedMovieVotes.HATE},
+            {"movie_id": 0, "reaction": Vote.SupportedMovieVotes.LIKE},
+        ]
+        # Make sure the votes are applied with a fixed number of queries, whatever their number
+        with self.assertNumQueries(9):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.data], [201, 201, 200, 204, 400, 404])
+        self.assertEqual(response.data[4]['detail'], 'You can not vote for this movie twice.')
+
+        # Make sure the votes & the counters were written
+        votes = dict(Vote.objects.filter(user=self.user3).values_list('movie_id', 'reaction'))
+        self.assertEqual(votes, {self.movie1.id: 'like', self.movie2.id: 'hate', self.movie3.id: 'like'})
+        counts = {movie.id: (movie.likes_count, movie.hates_count) for movie in Movie.objects.all()}
+        self.assertEqual(counts, {self.movie1.id: (2, 0), self.movie2.id: (0, 2), self.movie3.id: (2, 0),
+                                  self.movie4.id: (1, 0)})
+
+        # Make sure the rules of single votes apply
+        token = RefreshToken.for_user(self.user1)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token.access_token))
+        data = [
+            {"movie_id": self.movie1.id, "reaction": Vote.SupportedMovieVotes.LIKE},
+            {"movie_id": self.movie2.id, "reaction": None},
+        ]
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['detail'], 'You can not vote for movies you submitted.')
+        self.assertEqual(response.data[1]['status'], status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,94 @@
+import threading
+
+from django.db import connection
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import User, Movie, Vote
+
+
+class MovieVoteConcurrencyTests(TransactionTestCase):
+    """
+    TestCase class that fires parallel votes at the Movie Vote API Resource
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        # Create users
+        self.user1 = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com",
+                                         password="Testing-123")
+        self.voters = [
+            User.objects.create(first_name="Jane", last_name="Doe", username="jane%d" % i, email="jane%d@mr.com" % i,
+                                password="Testing-123")
+            for i in range(4)
+        ]
+
+        # Create movies
+        self.movie1 = Movie.objects.create(title="Madagascar", description="Animation", user=self.user1)
+
+    def fire(self, requests):
+        """
+        Send the (user, method, data) requests to the vote endpoint of movie1 in parallel threads
+        """
+
+        url = reverse('movie_vote_list_create_update_delete', kwargs={'movie_id': self.movie1.id})
+        barrier = threading.Barrier(len(requests))
+        responses = [None] * len(requests)
+
+        def send(index, user, method, data):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION="Bearer " + str(RefreshToken.for_user(user).access_token))
+            try:
+                barrier.wait()
+                responses[index] = getattr(client, method)(url, data, format='json')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=send, args=(index,) + request) for index, request in enumerate(requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_parallel_duplicate_votes(self):
+        """
+        Test parallel POST: /api/movies/<id>/votes of the same user
+        """
+
+        voter = self.voters[0]
+        responses = self.fire([(voter, 'post', {"reaction": Vote.SupportedMovieVotes.LIKE})] * 8)
+
+        # Make sure exactly one vote got in and the others were rejected with the usual error
+        codes = sorted(response.status_code for response in responses)
+        self.assertEqual(codes, [status.HTTP_201_CREATED] + [status.HTTP_400_BAD_REQUEST] * 7)
+        for response in responses:
+            if response.status_code == status.HTTP_400_BAD_REQUEST:
+                self.assertEqual(response.data['non_field_errors'][0], 'You can not vote for this movie twice.')
+        self.assertEqual(Vote.objects.filter(movie=self.movie1, user=voter).count(), 1)
+        self.movie1.refresh_from_db()
+        self.assertEqual((self.movie1.likes_count, self.movie1.hates_count), (1, 0))
+
+    def test_parallel_votes(self):
+        """
+        Test parallel POST & PUT: /api/movies/<id>/votes of different users
+        """
+
+        requests = []
+        for voter in self.voters:
+            requests.append((voter, 'post', {"reaction": Vote.SupportedMovieVotes.LIKE}))
+            requests.append((voter, 'put', {"reaction": Vote.SupportedMovieVotes.HATE}))
+        responses = self.fire(requests)
+        self.assertTrue(all(response.status_code in (200, 201, 400) for response in responses))
+
+        # Make sure every user ends up with a single vote and the counters match the votes
+        self.assertEqual(Vote.objects.filter(movie=self.movie1).count(), len(self.voters))
+        self.movie1.refresh_from_db()
+        self.assertEqual(self.movie1.likes_count, Vote.objects.filter(movie=self.movie1, reaction='like').count())
+        self.assertEqual(self.movie1.hates_count, Vote.objects.filter(movie=self.movie1, reaction='hate').count())
@@ -0,0 +1,121 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import User, Movie, Vote
+
+
+class QueryPlanTests(APITestCase):
+    """
+    TestCase class that makes sure every query of the API Resources is served by an index
+    """
+
+    # Plan details of a scan of a table or index, rather than a search of an index, or of sorting rows in a temporary
+    # b-tree. Scans are only accepted where a test lists them as deliberate
+    FULL_SCAN = re.compile(r'^SCAN ')
+    TEMP_SORT = re.compile(r'USE TEMP B-TREE')
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        # Create users
+        self.user1 = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com",
+                                         password="Testing-123")
+        self.user2 = User.objects.create(first_name="Jane", last_name="Doe", username="jane", email="jane@mr.com",
+                                         password="Testing-123")
+
+        # Create movies
+        self.movie1 = Movie.objects.create(title="Madagascar", description="Animation", user=self.user1)
+        self.movie2 = Movie.objects.create(title="Ice Age", description="Animation", user=self.user2)
+
+        # Create Vote
+        Vote.objects.create(movie=self.movie1, user=self.user2, reaction=Vote.SupportedMovieVotes.LIKE)
+
+        token = RefreshToken.for_user(self.user2)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token.access_token))
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        User.objects.all().delete()
+        Movie.objects.all().delete()
+        Vote.objects.all().delete()
+
+    def assertIndexedQueries(self, url, scans=()):
+        """
+        Request the url and assert that the query plan of every SELECT it ran searches indexes, but for the scans
+        given as their exact plan details
+        """
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        queries = [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(queries)
+        for sql in queries:
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+            for detail in plan:
+                if detail not in scans:
+                    self.assertIsNone(self.FULL_SCAN.search(detail), 'Scan for %s\n%s\n%s' % (url, sql, detail))
+                self.assertIsNone(self.TEMP_SORT.search(detail), 'Temporary sort for %s\n%s' % (url, sql))
+
+    def test_movie_list_query_plans(self):
+        """
+        Test GET: /api/movies/
+        """
+
+        url = reverse('movie_list_create')
+        response = self.client.get(url + "?page_size=1", format='json')
+        cursor = response.data['next'].split('cursor=')[1]
+
+        # The first page walks the index of the ordering from one end and stops after a page of movies
+        indexes = {'created': 'movie_created_idx', 'likes': 'movie_likes_count_idx', 'hates': 'movie_hates_count_idx',
+                   'title': 'sqlite_autoindex_api_movie_1', 'hot': 'movie_hot_score_idx'}
+        for field, index in indexes.items():
+            for ordering in (field, '-' + field):
+                self.assertIndexedQueries(url + "?ordering=" + ordering, scans=('SCAN api_movie USING INDEX ' + index,))
+        self.assertIndexedQueries(url + "?cursor=" + cursor)
+        self.assertIndexedQueries(url + "?user_id=" + str(self.user1.pk))
+        self.assertIndexedQueries(url + "?user_id=" + str(self.user1.pk) + "&ordering=created")
+
+    def test_movie_vote_list_query_plans(self):
+        """
+        Test GET: /api/movies/<id>/votes
+        """
+
+        url = reverse('movie_vote_list_create_update_delete', kwargs={'movie_id': self.movie1.id})
+        self.assertIndexedQueries(url)
+        self.assertIndexedQueries(url + "?reaction=" + Vote.SupportedMovieVotes.LIKE)
+
+    def test_user_query_plans(self):
+        """
+        Test GET: /api/users/ & /api/users/<id>
+        """
+
+        # The user list is not paginated and returns every user
+        self.assertIndexedQueries(reverse('user_list_create'), scans=('SCAN api_user USING INDEX user_created_idx',))
+        self.assertIndexedQueries(reverse('user_retrieve', kwargs={'pk': self.user1.pk}))
+
+    def test_export_query_plans(self):
+        """
+        Test GET: /api/movies/export & /api/movies/votes/export
+        """
+
+        # Exports stream every row in id order, walking the table or its primary key from the start or `after`
+        self.assertIndexedQueries(reverse('movie_export'), scans=('SCAN api_movie',))
+        self.assertIndexedQueries(reverse('movie_export') + "?after=" + str(self.movie1.pk))
+        self.assertIndexedQueries(reverse('movie_vote_export'), scans=('SCAN api_vote',))
@@ -0,0 +1,192 @@
+import os
+import sqlite3
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import replica
+from api.authentication import JWTAuthentication
+from api.models import User, Movie, Vote
+
+
+class ReplicaTests(APITransactionTestCase):
+    """
+    TestCase class that exercises the reads of the API from the replica
+
+    The replicator copies committed data, so it is committed rather than rolled back.
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'replica.sqlite3')
+        self.settings = override_settings(REPLICA_DATABASE=self.path)
+        self.settings.enable()
+        connections.databases[replica.REPLICA] = {
+            'ENGINE': 'movierama.sqlite3',
+            'NAME': 'file:%s?mode=ro' % self.path,
+            'OPTIONS': {},
+        }
+        cache.clear()
+
+        # Create users
+        self.user1 = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com",
+                                         password="Testing-123")
+        self.user2 = User.objects.create(first_name="Jane", last_name="Doe", username="jane", email="jane@mr.com",
+                                         password="Testing-123")
+
+        # Create movies
+        self.movie1 = Movie.objects.create(title="Madagascar", description="Animation", user=self.user1)
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        connections[replica.REPLICA].close()
+        del connections.databases[replica.REPLICA]
+        delattr(connections._connections, replica.REPLICA)
+        self.settings.disable()
+        self.directory.cleanup()
+        cache.clear()
+        Vote.objects.all().delete()
+        Movie.objects.all().delete()
+        User.objects.all().delete()
+
+    def replicate(self):
+        """
+        Copy the database to the replica
+        """
+
+        call_command('replicate', once=True, stdout=StringIO())
+
+    def titles(self, user=None):
+        """
+        Return the titles of the movie list, as seen by `user` if given
+        """
+
+        if user is not None:
+            self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(RefreshToken.for_user(user).access_token))
+        response = self.client.get(reverse('movie_list_create'), {'ordering': 'title'})
+        self.client.credentials()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [movie['title'] for movie in response.data['results']]
+
+    def test_replicate(self):
+        """
+        Test the replicate command
+        """
+
+        # Make sure the replica is a copy of the database, whose generation moves on with every copy
+        self.replicate()
+        generation = replica.read_state()[0]
+        self.assertEqual(Movie.objects.using(replica.REPLICA).count(), 1)
+        Movie.objects.create(title="Ice Age", description="Animation", user=self.user2)
+        self.replicate()
+        self.assertGreater(replica.read_state()[0], generation)
+        self.assertEqual(Movie.objects.using(replica.REPLICA).count(), 2)
+
+    def test_replicate_rate(self):
+        """
+        Test the copy rate of the replicate command
+        """
+
+        states = []
+
+        def sleep(seconds):
+            states.append(replica.read_state())
+            if len(states) > 1:
+                raise KeyboardInterrupt
+            # Commit from another connection, which moves the data_version of the database on
+            with sqlite3.connect(connection.settings_dict['NAME']) as writer:
+                writer.execute("UPDATE api_movie SET title = 'Ice Age'")
+            writer.close()
+
+        # Make sure a change waits for its copy after a copy, without the replica being checked meanwhile
+        with mock.patch('api.management.commands.replicate.time.sleep', sleep), self.assertRaises(KeyboardInterrupt):
+            call_command('replicate', max_duty=0.000001, stdout=StringIO())
+        self.assertEqual(states[1], states[0])
+        self.assertEqual(Movie.objects.using(replica.REPLICA).get().title, "Madagascar")
+        self.assertEqual(Movie.objects.get().title, "Ice Age")
+
+    def test_reads(self):
+        """
+        Test GET: /api/movies with a replica
+        """
+
+        # Make sure safe requests read from the replica while it is fresh
+        self.replicate()
+        Movie.objects.create(title="Ice Age", description="Animation", user=self.user2)
+        self.assertEqual(self.titles(), ["Madagascar"])
+        self.assertEqual(self.titles(self.user1), ["Madagascar"])
+        with override_settings(REPLICA_MAX_LAG=0):
+            self.assertEqual(self.titles(), ["Ice Age", "Madagascar"])
+
+        # Make sure users read their own writes from the primary database after writing
+        url = reverse('movie_vote_list_create_update_delete', kwargs={'movie_id': self.movie1.pk})
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(RefreshToken.for_user(self.user2).access_token))
+        response = self.client.post(url, {'reaction': 'like'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.titles(self.user2), ["Ice Age", "Madagascar"])
+        self.assertEqual(self.titles(self.user1), ["Madagascar"])
+
+        # Make sure the list cached from the replica is not served once the replica moved on
+        self.replicate()
+        self.assertEqual(self.titles(), ["Ice Age", "Madagascar"])
+
+    def test_signup(self):
+        """
+        Test GET: /api/users/<id> with a replica, for a user who just signed up
+        """
+
+        self.replicate()
+        signup = {"first_name": "Jim", "last_name": "Doe", "username": "jim", "email": "jim@mr.com",
+                  "password": "Testing-123"}
+        response = self.client.post(reverse('user_list_create'), signup, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user3 = User.objects.get(username="jim")
+        url = reverse('user_retrieve', kwargs={'pk': user3.pk})
+
+        # Make sure the new user is pinned to the primary database, and found by anyone missing it in the replica
+        self.assertTrue(cache.get(replica.pin_key(user3.pk)))
+        self.assertFalse(User.objects.using(replica.REPLICA).filter(pk=user3.pk).exists())
+        self.assertEqual(self.client.get(url).data['username'], "jim")
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(RefreshToken.for_user(user3).access_token))
+        self.assertEqual(self.client.get(url).data['username'], "jim")
+        self.client.credentials()
+
+        # Make sure unknown users are still not found
+        url = reverse('user_retrieve', kwargs={'pk': user3.pk + 1})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_new_user(self):
+        """
+        Test the authentication of a user missing from the replica
+        """
+
+        self.replicate()
+        user3 = User.objects.create(first_name="Jim", last_name="Doe", username="jim", email="jim@mr.com",
+                                    password="Testing-123")
+        request = RequestFactory().get(reverse('movie_list_create'),
+                                       HTTP_AUTHORIZATION="Bearer " + str(RefreshToken.for_user(user3).access_token))
+
+        # Make sure users are loaded from the primary database while the request reads from the replica
+        token = replica.request_reads.set(replica.ReplicaReads(request))
+        try:
+            self.assertFalse(User.objects.filter(pk=user3.pk).exists())
+            user, validated_token = JWTAuthentication().authenticate(request)
+            self.assertEqual(user.username, "jim")
+        finally:
+            replica.request_reads.reset(token)
@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from movierama import schema
+
+
+class SchemaTests(APITestCase):
+    """
+    TestCase class that exercises the API documentation
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'openapi.json')
+        schema.get_schema.cache_clear()
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        schema.get_schema.cache_clear()
+        self.directory.cleanup()
+
+    def test_swagger_ui(self):
+        """
+        Test GET: /
+        """
+
+        url = reverse('schema-swagger-ui')
+
+        # Make sure the Swagger UI is served, with an ETag to revalidate it
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+        self.assertIn(b'swagger-ui', response.content)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Make sure the page is read only
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_schema(self):
+        """
+        Test GET: /?format=openapi
+        """
+
+        url = reverse('schema-swagger-ui') + '?format=openapi'
+
+        # Make sure the schema is generated in process when there is no schema file
+        with override_settings(OPENAPI_SCHEMA=self.path):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/openapi+json')
+        document = json.loads(response.content)
+        self.assertEqual(document['info']['title'], "Movierama API")
+        self.assertIn('/movies/{movie_id}/votes', document['paths'])
+
+    def test_generate_schema(self):
+        """
+        Test the schema written by the generate_schema command
+        """
+
+        # Make sure the command writes the schema and the view serves that file
+        out = StringIO()
+        call_command('generate_schema', output=self.path, stdout=out)
+        self.assertIn(self.path, out.getvalue())
+        with open(self.path, 'rb') as f:
+            written = f.read()
+        self.assertIn('/movies', json.loads(written)['paths'])
+
+        with open(self.path, 'wb') as f:
+            f.write(b'{"swagger": "2.0", "paths": {}}')
+        with override_settings(OPENAPI_SCHEMA=self.path):
+            response = self.client.get(reverse('schema-swagger-ui'), {'format': 'openapi'})
+        self.assertEqual(response.content, b'{"swagger": "2.0", "paths": {}}')
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import User, Movie
+from api.slow_queries import fingerprint
+
+
+class SlowQueryTests(APITestCase):
+    """
+    TestCase class that exercises the slow query log
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        self.user1 = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com",
+                                         password="Testing-123")
+        self.movie1 = Movie.objects.create(title="Madagascar", description="Animation", user=self.user1)
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        User.objects.all().delete()
+        Movie.objects.all().delete()
+
+    def test_fingerprint(self):
+        """
+        Test the normalization of queries into fingerprints
+        """
+
+        self.assertEqual(
+            fingerprint('SELECT "id" FROM "api_vote" WHERE "user_id" = %s AND "movie_id" IN (%s, %s) LIMIT 21'),
+            'SELECT "id" FROM "api_vote" WHERE "user_id" = ? AND "movie_id" IN (...) LIMIT ?')
+        self.assertEqual(fingerprint("SELECT 'it''s', 1.5"), 'SELECT ?, ?')
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_query_log(self):
+        """
+        Test GET: /api/movies with every query logged as slow
+        """
+
+        with self.assertLogs('api.slow_queries', level='WARNING') as logs:
+            response = self.client.get(reverse('movie_list_create') + '?user_id=%d' % self.user1.id, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Make sure the page query is logged with its view, parameters & plan
+        queries = [json.loads(record.getMessage()) for record in logs.records]
+        page = next(query for query in queries if 'FROM "api_movie"' in query['sql'] and 'user_id" =' in query['sql'])
+        self.assertEqual(page['view'], 'movie_list_create')
+        self.assertIn(str(self.user1.id), page['params'])
+        self.assertTrue(any('movie_user_created_idx' in step for step in page['plan']))
+
+    def test_slow_queries_command(self):
+        """
+        Test the slow_queries management command
+        """
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow_queries.log')
+            for name, durations in ((path + '.1', (300, 100)), (path, (250,))):
+                with open(name, 'w', encoding='utf-8') as f:
+                    for i, duration in enumerate(durations):
+                        f.write(json.dumps({'fingerprint': 'Q%d' % (duration // 200), 'duration_ms': duration,
+                                            'view': 'movie_list_create', 'plan': ['SCAN api_movie']}) + '\n')
+
+            out = StringIO()
+            call_command('slow_queries', '--path', path, '--plans', stdout=out)
+
+        # Make sure the fingerprints are ranked by total time across the rotated files
+        output = out.getvalue()
+        self.assertIn('#1 total 550.0 ms, 2 queries', output)
+        self.assertIn('#2 total 100.0 ms, 1 queries', output)
+        self.assertIn('SCAN api_movie', output)
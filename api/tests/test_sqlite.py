@@ -0,0 +1,83 @@
+import threading
+
+from django.db import OperationalError, connection, transaction
+from django.test import TransactionTestCase
+
+from api.models import User, Movie
+
+
+class SQLiteTests(TransactionTestCase):
+    """
+    TestCase class that exercises the connection options of the SQLite database
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        self.user1 = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com",
+                                         password="Testing-123")
+        self.movie1 = Movie.objects.create(title="Madagascar", description="Animation", user=self.user1)
+
+    def run_in_thread(self, func):
+        """
+        Call func on its own connection in another thread and return its result or exception
+        """
+
+        result = []
+
+        def target():
+            try:
+                result.append(func())
+            except Exception as e:
+                result.append(e)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+        return result[0]
+
+    def test_pragmas(self):
+        """
+        Test the pragmas set on new connections
+        """
+
+        # Make sure the database is in WAL mode with the configured pragmas
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -20000)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def test_transactions(self):
+        """
+        Test readers & writers running next to a writing transaction
+        """
+
+        def write():
+            with transaction.atomic():
+                return Movie.objects.count()
+
+        # Other threads' connections give up waiting for locks quickly
+        options = connection.settings_dict['OPTIONS']
+        timeout, options['timeout'] = options['timeout'], 0.1
+        try:
+            with transaction.atomic():
+                Movie.objects.filter(pk=self.movie1.pk).update(title="Ice Age")
+
+                # Make sure readers are not blocked by the writer and see the last committed data
+                self.assertEqual(self.run_in_thread(lambda: Movie.objects.get(pk=self.movie1.pk).title),
+                                 "Madagascar")
+
+                # Make sure the transaction holds the write lock from its beginning, so that other writers wait
+                self.assertIsInstance(self.run_in_thread(write), OperationalError)
+            self.assertEqual(self.run_in_thread(write), 1)
+        finally:
+            options['timeout'] = timeout
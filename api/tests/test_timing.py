@@ -0,0 +1,75 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import User, Movie, Vote
+from api.timing import RequestTiming
+
+
+class ServerTimingTests(APITestCase):
+    """
+    TestCase class that exercises the Server-Timing instrumentation
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        self.user1 = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com",
+                                         password="Testing-123")
+        self.user2 = User.objects.create(first_name="Jane", last_name="Doe", username="jane", email="jane@mr.com",
+                                         password="Testing-123")
+        self.movie1 = Movie.objects.create(title="Madagascar", description="Animation", user=self.user1)
+        Vote.objects.create(movie=self.movie1, user=self.user2, reaction=Vote.SupportedMovieVotes.LIKE)
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        User.objects.all().delete()
+        Movie.objects.all().delete()
+        Vote.objects.all().delete()
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        """
+        Test GET: /api/movies without instrumentation
+        """
+
+        response = self.client.get(reverse('movie_list_create'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing(self):
+        """
+        Test GET: /api/movies with instrumentation
+        """
+
+        token = RefreshToken.for_user(self.user2)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token.access_token))
+        response = self.client.get(reverse('movie_list_create'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Make sure every part of the request is broken down
+        metrics = dict(metric.split(';', 1) for metric in response['Server-Timing'].split(', '))
+        self.assertEqual(set(metrics), {'auth', 'serialize', 'render', 'db', 'total'})
+        self.assertIn('desc="3 queries"', metrics['db'])
+
+    def test_repeated_queries(self):
+        """
+        Test the detection of duplicate & N+1 queries
+        """
+
+        timing = RequestTiming()
+        for movie_id in (1, 2, 3, 3):
+            timing.queries.append(('SELECT * FROM api_vote WHERE movie_id = %s', repr((movie_id,))))
+        timing.queries.append(('SELECT * FROM api_movie', repr(())))
+
+        duplicates, repeated = timing.repeated_queries(3)
+        self.assertEqual(duplicates, 1)
+        self.assertEqual(repeated, {'SELECT * FROM api_vote WHERE movie_id = %s': 3})
@@ -99,3 +99,34 @@ class UserTests(APITestCase):
         self.assertIn('last_name', response.data)
         self.assertIn('email', response.data)
         self.assertIn('password', response.data)
+
+    def test_user_retrieve_conditional(self):
+        """
+        Test conditional GET: /api/users/<id>
+        """
+
+        url = reverse('user_retrieve', kwargs={'pk': self.user1.pk})
+
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        # Make sure an unchanged user is not serialized again
+        with self.assertNumQueries(1):
+            response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(url, format='json', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Make sure an updated user is returned
+        self.user1.first_name = "Johnny"
+        self.user1.save()
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['first_name'], "Johnny")
+
+        # Make sure a missing user is still a 404
+        url = reverse('user_retrieve', kwargs={'pk': 0})
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
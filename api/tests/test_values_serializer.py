@@ -0,0 +1,86 @@
+from django.db.models import F
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from api.models import User, Movie, Vote
+from api.serializers.movie import MovieSerializer, MovieVoteSerializer
+from api.serializers.user import UserSerializer
+from api.serializers.values import ValuesSerializer
+
+
+class ValuesSerializerTests(APITestCase):
+    """
+    TestCase class that makes sure the ValuesSerializer renders the same JSON as the DRF serializers
+    """
+
+    def setUp(self) -> None:
+        """
+        Initial test-suite setup
+        """
+
+        # Create users
+        self.user1 = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com",
+                                         password="Testing-123")
+        self.user2 = User.objects.create(first_name="Jäne", last_name="Doe", username="jane", email="jane@mr.com",
+                                         password="Testing-123")
+
+        # Create movies, including one without a user and one with an empty description
+        self.movie1 = Movie.objects.create(title="Madagascar", description="Animation", user=self.user1)
+        self.movie2 = Movie.objects.create(title="Ice Age ΙΙ", description="", user=self.user2)
+        self.movie3 = Movie.objects.create(title="Orphan", description="Horror \"quoted\"")
+
+        # Create Vote
+        Vote.objects.create(movie=self.movie1, user=self.user2, reaction=Vote.SupportedMovieVotes.LIKE)
+        Vote.objects.create(movie=self.movie3, user=self.user2, reaction=Vote.SupportedMovieVotes.HATE)
+        Vote.objects.create(movie=self.movie3, user=self.user1, reaction=Vote.SupportedMovieVotes.LIKE)
+
+    def tearDown(self):
+        """
+        Handle end of test-runs
+        """
+
+        User.objects.all().delete()
+        Movie.objects.all().delete()
+        Vote.objects.all().delete()
+
+    def assertSameJSON(self, serializer_class, queryset, prepare=lambda item: item):
+        """
+        Assert that serializing the queryset with either serializer renders byte-identical JSON
+        """
+
+        expected = serializer_class([prepare(item) for item in queryset], many=True).data
+        values_serializer = ValuesSerializer(serializer_class)
+        rows = [prepare(row) for row in values_serializer.values(queryset)]
+        self.assertEqual(JSONRenderer().render(values_serializer.many(rows)), JSONRenderer().render(expected))
+
+    def test_movie_serializer_parity(self):
+        """
+        Test the ValuesSerializer of MovieSerializer
+        """
+
+        queryset = Movie.objects.select_related('user').annotate(
+            likes=F('likes_count'), hates=F('hates_count')).order_by('id')
+        votes = dict(Vote.objects.filter(user=self.user2).values_list('movie_id', 'reaction'))
+
+        def set_vote(movie):
+            if isinstance(movie, dict):
+                movie['vote'] = votes.get(movie['id'])
+            else:
+                movie.vote = votes.get(movie.id)
+            return movie
+
+        self.assertSameJSON(MovieSerializer, queryset, set_vote)
+
+    def test_movie_vote_serializer_parity(self):
+        """
+        Test the ValuesSerializer of MovieVoteSerializer
+        """
+
+        self.assertSameJSON(MovieVoteSerializer, Vote.objects.filter(movie=self.movie3).order_by('-created'))
+
+    def test_user_serializer_parity(self):
+        """
+        Test the ValuesSerializer of UserSerializer
+        """
+
+        self.assertSameJSON(UserSerializer, User.objects.order_by('-created'))
@@ -0,0 +1,144 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from api.asynchronous import AsyncCapableMiddleware, execute_wrapper
+
+logger = logging.getLogger(__name__)
+
+# Timing of the request being handled, None when the middleware is disabled
+current_timing = ContextVar('current_timing', default=None)
+
+
+class RequestTiming:
+    """
+    Durations & queries recorded while handling a single request
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = Counter()
+        self.db_time = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        Database execute wrapper recording every query and its duration
+        """
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries.append((sql, repr(params)))
+
+    def repeated_queries(self, threshold):
+        """
+        Return the exact duplicate queries and the statements run at least `threshold` times with different
+        parameters, the telltale of an N+1 pattern
+        """
+
+        duplicates = sum(count - 1 for count in Counter(self.queries).values() if count > 1)
+        statements = Counter(sql for sql, params in set(self.queries))
+        return duplicates, {sql: count for sql, count in statements.items() if count >= threshold}
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the time spent in the block, database time excluded, to the named span of the current request
+    """
+
+    timing = current_timing.get()
+    if timing is None:
+        yield
+        return
+
+    start, db_time = time.perf_counter(), timing.db_time
+    try:
+        yield
+    finally:
+        timing.spans[name] += (time.perf_counter() - start) - (timing.db_time - db_time)
+
+
+class ServerTimingMiddleware(AsyncCapableMiddleware):
+    """
+    Break the handling time of every request down into `Server-Timing` header metrics
+
+        auth       authentication of the request, its queries excluded
+        db         number & time of the SQL queries
+        serialize  view code & serialization, auth & db excluded
+        render     rendering of the response body
+        total      the whole request, middleware included
+
+    Statements run over and over for the same view are logged as likely N+1 patterns and reported with the
+    exact duplicate queries in the `dup` & `nplus1` metrics. Enabled with the SERVER_TIMING setting, the
+    middleware removes itself from the stack otherwise.
+    """
+
+    repeated_threshold = 3
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVER_TIMING', False):
+            raise MiddlewareNotUsed()
+        super(ServerTimingMiddleware, self).__init__(get_response)
+
+    @contextmanager
+    def handling(self, request):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        request.timing = timing
+        try:
+            with execute_wrapper(timing):
+                yield
+        finally:
+            current_timing.reset(token)
+
+    def process_response(self, request, response):
+        timing = request.timing
+        if 'render' in timing.spans:
+            # Whatever the view did that is not auth or db counts as serialization
+            timing.spans['serialize'] = max(0.0, timing.view_time - timing.spans['auth'] - timing.view_db_time)
+        self.report(request, response, timing)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view_start = time.perf_counter()
+        request.timing.view_name = getattr(view_func, '__name__', repr(view_func))
+
+    def process_template_response(self, request, response):
+        # Responses are rendered by the handler right after this hook, render() is wrapped to time it
+        timing = request.timing
+        timing.view_time = time.perf_counter() - timing.view_start
+        timing.view_db_time = timing.db_time
+        render = response.render
+
+        def timed_render():
+            with timed('render'):
+                return render()
+
+        response.render = timed_render
+        return response
+
+    def report(self, request, response, timing):
+        metrics = ['%s;dur=%.2f' % (name, timing.spans[name] * 1000)
+                   for name in ('auth', 'serialize', 'render') if name in timing.spans]
+        metrics.append('db;dur=%.2f;desc="%d queries"' % (timing.db_time * 1000, len(timing.queries)))
+
+        duplicates, repeated = timing.repeated_queries(self.repeated_threshold)
+        if duplicates:
+            metrics.append('dup;desc="%d duplicate queries"' % duplicates)
+        if repeated:
+            metrics.append('nplus1;desc="%d statements run %d+ times"' % (len(repeated), self.repeated_threshold))
+            for sql, count in repeated.items():
+                logger.warning('Possible N+1 queries in %s (%s %s): %d x %s', getattr(timing, 'view_name', '-'),
+                               request.method, request.path, count, sql)
+
+        metrics.append('total;dur=%.2f' % ((time.perf_counter() - timing.start) * 1000))
+        response['Server-Timing'] = ', '.join(metrics)
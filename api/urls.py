@@ -1,7 +1,16 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from api.views import user, movie
+from api.views import export, user, movie
+
+# The ASGI entry point serves the async implementations of the busiest endpoints, see api.asynchronous
+if settings.ASYNC_VIEWS:
+    MovieListCreate, MovieVoteListCreateUpdateDelete, UserDetail = (
+        movie.AsyncMovieListCreate, movie.AsyncMovieVoteListCreateUpdateDelete, user.AsyncUserDetail)
+else:
+    MovieListCreate, MovieVoteListCreateUpdateDelete, UserDetail = (
+        movie.MovieListCreate, movie.MovieVoteListCreateUpdateDelete, user.UserDetail)
 
 urlpatterns = [
     # JWT
@@ -10,12 +19,21 @@ urlpatterns = [
 
     # User resource
     path('users', user.UserListCreate.as_view(), name='user_list_create'),
-    path('users/<int:pk>', user.UserDetail.as_view(), name='user_retrieve'),
+    path('users/<int:pk>', UserDetail.as_view(), name='user_retrieve'),
 
     # Movie resource
-    path('movies', movie.MovieListCreate.as_view(), name='movie_list_create'),
+    path('movies', MovieListCreate.as_view(), name='movie_list_create'),
 
     # Movie Vote resource
-    path('movies/<int:movie_id>/votes', movie.MovieVoteListCreateUpdateDelete.as_view(),
+    path('movies/<int:movie_id>/votes', MovieVoteListCreateUpdateDelete.as_view(),
          name='movie_vote_list_create_update_delete'),
+    path('movies/votes', movie.MovieVoteBulk.as_view(), name='movie_vote_bulk'),
 ]
+
+# Django 3.1 sends streaming responses from the event loop under ASGI, where the exports could not query the
+# database, so they are only served by the WSGI deployment
+if not settings.ASYNC_VIEWS:
+    urlpatterns += [
+        path('movies/export', export.MovieExport.as_view(), name='movie_export'),
+        path('movies/votes/export', export.MovieVoteExport.as_view(), name='movie_vote_export'),
+    ]
@@ -0,0 +1,99 @@
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+
+from api.models import Movie, Vote
+from api.renderers import CSVRenderer, NDJSONRenderer
+from api.serializers.movie import MovieExportSerializer, MovieVoteExportSerializer
+from api.serializers.values import ValuesListMixin
+
+
+class ExportView(ValuesListMixin, generics.GenericAPIView):
+    """
+    Base class of the export views, streaming every row of the filtered queryset in NDJSON or CSV
+
+    Rows are streamed in id order from a database cursor, fetched & sent `chunk_size` rows at a time, so the
+    memory used does not grow with the number of rows. `?after=<id>` resumes an export after the last id seen.
+    """
+
+    renderer_classes = (NDJSONRenderer, CSVRenderer)
+    filter_backends = (DjangoFilterBackend,)
+    chunk_size = 2000
+
+    def get_after(self):
+        after = self.request.query_params.get('after', '')
+        if not after:
+            return None
+        try:
+            return int(after)
+        except ValueError:
+            raise ValidationError({'after': ['A valid integer is required.']})
+
+    def get(self, request, *args, **kwargs):
+        values_serializer = self.get_values_serializer()
+        queryset = self.filter_queryset(self.get_queryset())
+        after = self.get_after()
+        if after is not None:
+            queryset = queryset.filter(pk__gt=after)
+        rows = values_serializer.values(queryset.order_by('pk'))
+        # The rows are only fetched once the middleware are done with the request, which picks the database
+        rows = rows.using(rows.db)
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(self.stream(renderer, values_serializer, rows),
+                                         content_type='%s; charset=%s' % (renderer.media_type, renderer.charset))
+        response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (self.export_name, renderer.format)
+        return response
+
+    def stream(self, renderer, values_serializer, rows):
+        """
+        Yield the rendered rows in chunks
+        """
+
+        fields = [name for name, getter in values_serializer.getters]
+        rows = map(values_serializer.to_representation, rows.iterator(chunk_size=self.chunk_size))
+        lines = renderer.lines(fields, rows)
+        while True:
+            chunk = ''.join(islice(lines, self.chunk_size))
+            if not chunk:
+                break
+            yield chunk
+
+
+class MovieExport(ExportView):
+    """
+    get:
+        Streams all user submitted movies, in id order
+
+        Publicly accessible: Yes
+        Available formats: ndjson (default), csv, with `?format=` or the Accept header
+        Available filters: user_id
+        Resuming: `after` returns the movies after the given id
+    """
+
+    serializer_class = MovieExportSerializer
+    queryset = Movie.objects.all()
+    filterset_fields = ('user_id',)
+    export_name = 'movies'
+
+
+class MovieVoteExport(ExportView):
+    """
+    get:
+        Streams the votes of all movies, in id order
+
+        Publicly accessible: No
+        Available formats: ndjson (default), csv, with `?format=` or the Accept header
+        Available filters: movie_id, user_id, reaction
+        Resuming: `after` returns the votes after the given id
+    """
+
+    permission_classes = (IsAuthenticated,)
+    serializer_class = MovieVoteExportSerializer
+    queryset = Vote.objects.all()
+    filterset_fields = ('movie_id', 'user_id', 'reaction')
+    export_name = 'votes'
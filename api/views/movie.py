@@ -1,22 +1,46 @@
-from django.db.models import Count, Q, CharField, Value, Subquery, OuterRef
-from rest_framework import generics
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, Max, Subquery, Value
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-from api.models import Movie, Vote
+from api.asynchronous import AsyncAPIViewMixin
+from api.cache import AnonymousListCacheMixin, bump_content_version
+from api.conditional import ConditionalGetMixin
+from api.filters import MovieSearchFilter, RankOrderingFilter
+from api.models import Movie, MovieDeletions, Vote
+from api.pagination import KeysetPagination
 from api.permissions import AuthenticatedCreate
-from api.serializers.movie import MovieSerializer, MovieVoteSerializer
+from api.serializers.movie import MovieSerializer, MovieVoteOperationSerializer, MovieVoteSerializer
+from api.serializers.values import ValuesListMixin
 
 
-class MovieListCreate(generics.ListCreateAPIView):
+def latest_movie(field):
+    """
+    Return a subquery of the maximum of a field over all movies
+    """
+
+    # Grouping by a constant leaves the GROUP BY clause out, for a plain `SELECT MAX(field)`
+    return Subquery(Movie.objects.order_by().annotate(movies=Value(1, IntegerField())).values('movies').annotate(
+        latest=Max(field)).values('latest'))
+
+
+class MovieListCreate(ConditionalGetMixin, AnonymousListCacheMixin, ValuesListMixin, generics.ListCreateAPIView):
     """
     get:
         Returns all user submitted movies
 
         Publicly accessible: Yes
-        Default ordering: created date (DESC)
-        Available ordering: created, title, likes, hates
+        Default ordering: created date (DESC), relevance when searching
+        Available ordering: created, title, likes, hates, hot (recent likes), rank (relevance, when searching)
         Available filters: user_id
+        Search: `search` returns the movies whose title or description contain all of its words
+        Pagination: cursor based, `page_size` up to 100 (default 20), `count=true` to include the total count
+        Caching: responses to anonymous users are cached until the next write, supports ETag & Last-Modified
 
     post:
         Submits a new movie
@@ -27,33 +51,72 @@ class MovieListCreate(generics.ListCreateAPIView):
 
     permission_classes = (AuthenticatedCreate,)
     serializer_class = MovieSerializer
+    pagination_class = KeysetPagination
+    filter_backends = (MovieSearchFilter, RankOrderingFilter, DjangoFilterBackend)
     ordering = ('-created',)
-    ordering_fields = ('created', 'title', 'likes', 'hates')
+    ordering_fields = ('created', 'title', 'likes', 'hates', 'hot')
     filterset_fields = ('user_id',)
+    per_user_etag = True
+
+    def get_validators(self):
+        # Vote writes update the movie too, so the latest update, the latest id (of bulk inserted movies) & the
+        # number of deletions cover every change, along with the latest update of the hot scores, which are updated
+        # in the background. Each is a subquery of its own, for SQLite to read every maximum from the end of an index
+        # instead of scanning all movies for them together
+        deleted = MovieDeletions.objects.filter(pk=1).values('count')
+        validators = Movie.objects.filter(pk=latest_movie('id')).values_list(
+            'id', latest_movie('updated'), latest_movie('hot_updated'), Subquery(deleted)).first()
+        latest_id, updated, scored, deleted = validators or (None, None, None, None)
+        last_modified = max(filter(None, (updated, scored)), default=None)
+        return (updated, latest_id, deleted, scored), last_modified
 
     def get_queryset(self):
+        # Likes & hates are read from the counters maintained on every vote write, hot scores from the ones
+        # updated by `manage.py update_hot_scores`
         queryset = Movie.objects.select_related(
             'user'
         ).annotate(
-            likes=Count('movie_votes', filter=Q(movie_votes__reaction=Vote.SupportedMovieVotes.LIKE))
-        ).annotate(
-            hates=Count('movie_votes', filter=Q(movie_votes__reaction=Vote.SupportedMovieVotes.HATE)),
+            likes=F('likes_count'),
+            hates=F('hates_count'),
+            hot=F('hot_score'),
         )
 
-        # Add custom field to return logged in user's vote or null in case of no vote
-        if self.request.user.is_anonymous:
-            queryset = queryset.annotate(vote=Value(None, output_field=CharField(null=True)))
-        else:
-            queryset = queryset.annotate(
-                vote=Subquery(
-                    Vote.objects.filter(movie=OuterRef('id'), user=self.request.user).values('reaction')[:1],
-                    output_field=CharField(null=True)),
+        return queryset.all()
+
+    def paginate_queryset(self, queryset):
+        page = super(MovieListCreate, self).paginate_queryset(queryset)
+        if page is not None:
+            self.add_user_votes(page)
+        return page
+
+    def add_user_votes(self, movies):
+        """
+        Set the logged in user's vote (or null in case of no vote) on each movie of the page
+
+        The votes of the whole page are loaded with a single `IN` query, instead of a correlated
+        subquery that the database would have to run for every movie row.
+        """
+
+        votes = {}
+        if not self.request.user.is_anonymous and movies:
+            votes = dict(
+                Vote.objects.filter(
+                    user_id=self.request.user.pk, movie_id__in=[movie['id'] for movie in movies]
+                ).values_list('movie_id', 'reaction')
             )
 
-        return queryset.all()
+        for movie in movies:
+            movie['vote'] = votes.get(movie['id'])
+
+
+class AsyncMovieListCreate(AsyncAPIViewMixin, MovieListCreate):
+    """
+    MovieListCreate as an async view, served under ASGI
+    """
 
 
-class MovieVoteListCreateUpdateDelete(generics.ListCreateAPIView, generics.UpdateAPIView, generics.DestroyAPIView):
+class MovieVoteListCreateUpdateDelete(ConditionalGetMixin, ValuesListMixin, generics.ListCreateAPIView,
+                                      generics.UpdateAPIView, generics.DestroyAPIView):
     """
     get:
         Returns all votes for the requested movie
@@ -61,6 +124,7 @@ class MovieVoteListCreateUpdateDelete(generics.ListCreateAPIView, generics.Updat
         Publicly accessible: No
         Default ordering: created date (DESC)
         Available filters: reaction
+        Caching: supports ETag & Last-Modified
 
     post:
         Creates a new vote for the requested movie
@@ -69,7 +133,7 @@ class MovieVoteListCreateUpdateDelete(generics.ListCreateAPIView, generics.Updat
         Required parameters: reaction
 
     put:
-        Updates the vote for the requested movie
+        Creates or updates the vote for the requested movie
 
         Publicly accessible: No
         Required parameters: reaction
@@ -92,6 +156,13 @@ class MovieVoteListCreateUpdateDelete(generics.ListCreateAPIView, generics.Updat
     ordering_fields = ('created',)
     filterset_fields = ('reaction',)
 
+    def get_validators(self):
+        # Changing a reaction leaves the votes as they are, but updates the movie's counters
+        votes = Vote.objects.filter(movie_id=self.kwargs['movie_id']).aggregate(
+            created=Max('created'), count=Count('id'), movie_updated=Max('movie__updated'))
+        last_modified = max(filter(None, (votes['created'], votes['movie_updated'])), default=None)
+        return (votes['created'], votes['count'], votes['movie_updated']), last_modified
+
     def get_queryset(self):
         return Vote.objects.filter(movie_id=self.kwargs['movie_id'])
 
@@ -100,6 +171,113 @@ class MovieVoteListCreateUpdateDelete(generics.ListCreateAPIView, generics.Updat
         Override get_object() to find the vote instance based on movie id & logged in user
         """
 
-        obj = get_object_or_404(self.get_queryset(), user=self.request.user)
+        obj = get_object_or_404(self.get_queryset(), user_id=self.request.user.pk)
         self.check_object_permissions(self.request, obj)
         return obj
+
+    def update(self, request, *args, **kwargs):
+        """
+        Override update() to write the vote without fetching it first, PUT creates the vote if there is none
+        """
+
+        partial = kwargs.pop('partial', False)
+        serializer = self.get_serializer(data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        vote, created = serializer.upsert(serializer.validated_data, create=not partial)
+        response_status = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        return Response(self.get_serializer(vote).data, status=response_status)
+
+
+class AsyncMovieVoteListCreateUpdateDelete(AsyncAPIViewMixin, MovieVoteListCreateUpdateDelete):
+    """
+    MovieVoteListCreateUpdateDelete as an async view, served under ASGI
+    """
+
+
+class MovieVoteBulk(generics.GenericAPIView):
+    """
+    post:
+        Applies a list of votes of the logged in user in a single transaction
+
+        Publicly accessible: No
+        Required parameters: a list of {movie_id, reaction}, a null reaction removes the vote
+        Returns: a result per vote, in the same order, with its status code and the error detail of failed votes
+    """
+
+    permission_classes = (IsAuthenticated,)
+    serializer_class = MovieVoteOperationSerializer
+    max_operations = 1000
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        if len(serializer.validated_data) > self.max_operations:
+            raise ValidationError('Ensure there are no more than %d votes.' % self.max_operations)
+
+        try:
+            results = self.apply(serializer.validated_data)
+        except IntegrityError:
+            # A concurrent vote of the same user got in between reading the votes and writing them
+            results = self.apply(serializer.validated_data)
+        return Response(results)
+
+    def apply(self, operations):
+        """
+        Apply the valid operations with bulk queries, following the rules of MovieVoteSerializer
+        """
+
+        user = self.request.user
+        movie_ids = {operation['movie_id'] for operation in operations}
+        results = []
+
+        with transaction.atomic():
+            owners = dict(Movie.objects.filter(pk__in=movie_ids).values_list('id', 'user_id'))
+            votes = {vote.movie_id: vote for vote in Vote.objects.filter(user_id=user.pk, movie_id__in=movie_ids)}
+
+            created, updated, deleted, seen = [], [], [], set()
+            counts = {movie_id: {'like': 0, 'hate': 0} for movie_id in movie_ids}
+            for operation in operations:
+                movie_id, reaction = operation['movie_id'], operation['reaction']
+                vote = votes.get(movie_id)
+                result = {'movie_id': movie_id, 'reaction': reaction}
+                results.append(result)
+
+                if movie_id not in owners or (vote is None and reaction is None):
+                    result.update(status=status.HTTP_404_NOT_FOUND, detail='Not found.')
+                elif owners[movie_id] == user.id:
+                    result.update(status=status.HTTP_400_BAD_REQUEST, detail=MovieVoteSerializer.own_movie_message)
+                elif movie_id in seen:
+                    result.update(status=status.HTTP_400_BAD_REQUEST, detail=MovieVoteSerializer.duplicate_message)
+                elif reaction is None:
+                    deleted.append(vote.pk)
+                    counts[movie_id][vote.reaction] -= 1
+                    result['status'] = status.HTTP_204_NO_CONTENT
+                elif vote is None:
+                    created.append(Vote(user_id=user.pk, movie_id=movie_id, reaction=reaction))
+                    counts[movie_id][reaction] += 1
+                    result['status'] = status.HTTP_201_CREATED
+                else:
+                    if vote.reaction != reaction:
+                        counts[movie_id][vote.reaction] -= 1
+                        counts[movie_id][reaction] += 1
+                        vote.reaction = reaction
+                        updated.append(vote)
+                    result['status'] = status.HTTP_200_OK
+                seen.add(movie_id)
+
+            # Bulk writes bypass Vote.save() & Vote.delete(), so the counters are moved here
+            Vote.objects.bulk_create(created)
+            Vote.objects.bulk_update(updated, ['reaction'])
+            Vote.objects.filter(pk__in=deleted).delete()
+
+            now = timezone.now()
+            movies = [
+                Movie(pk=movie_id, updated=now, likes_count=F('likes_count') + count['like'],
+                      hates_count=F('hates_count') + count['hate'])
+                for movie_id, count in counts.items() if count['like'] or count['hate']
+            ]
+            Movie.objects.bulk_update(movies, ['likes_count', 'hates_count', 'updated'])
+
+        if created or updated or deleted:
+            bump_content_version()
+        return results
@@ -1,10 +1,15 @@
+from django.http import Http404
 from rest_framework import generics
 
+from api.asynchronous import AsyncAPIViewMixin
+from api.conditional import ConditionalGetMixin
 from api.models import User
+from api.replica import pin_to_primary, primary_reads, replica_generation
 from api.serializers.user import UserSerializer
+from api.serializers.values import ValuesListMixin
 
 
-class UserListCreate(generics.ListCreateAPIView):
+class UserListCreate(ValuesListMixin, generics.ListCreateAPIView):
     """
     get:
         Returns all registered users
@@ -25,14 +30,40 @@ class UserListCreate(generics.ListCreateAPIView):
     ordering = ('-created',)
     ordering_fields = ('first_name', 'last_name', 'created')
 
+    def perform_create(self, serializer):
+        super(UserListCreate, self).perform_create(serializer)
+        # Signing up is anonymous, the replica middleware only pins the users who wrote while logged in
+        pin_to_primary(serializer.instance.pk)
 
-class UserDetail(generics.RetrieveAPIView):
+
+class UserDetail(ConditionalGetMixin, generics.RetrieveAPIView):
     """
     get:
         Retrieves the requested user
 
         Publicly accessible: Yes
+        Caching: supports ETag & Last-Modified
     """
 
     serializer_class = UserSerializer
     queryset = User.objects.all()
+
+    def get_validators(self):
+        updated = User.objects.filter(pk=self.kwargs['pk']).values_list('updated', flat=True).first()
+        return ((updated,) if updated else None), updated
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return super(UserDetail, self).get(request, *args, **kwargs)
+        except Http404:
+            if replica_generation() is None:
+                raise
+        # Users who just signed up may be missing from the replica, whoever asks for them
+        with primary_reads():
+            return super(UserDetail, self).get(request, *args, **kwargs)
+
+
+class AsyncUserDetail(AsyncAPIViewMixin, UserDetail):
+    """
+    UserDetail as an async view, served under ASGI
+    """
@@ -0,0 +1,66 @@
+"""
+Benchmarks for the MovieRama API
+
+Every module of this package is a script that runs against a throwaway test database, e.g.
+
+    pipenv run python -m benchmarks.movie_votes
+"""
+import os
+import statistics
+import time
+
+import django
+
+
+def setup():
+    """
+    Configure Django and create a throwaway database for the benchmark to run against
+    """
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'movierama.settings')
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    return connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+
+def teardown(old_name):
+    """
+    Destroy the database created by setup()
+    """
+
+    from django.db import connection
+    from django.test.utils import teardown_test_environment
+
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+    teardown_test_environment()
+
+
+def measure(func, repeat=20, warmup=2):
+    """
+    Call func repeatedly and return the median wall time of a call in milliseconds
+    """
+
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def print_table(headers, rows):
+    """
+    Print rows as a plain text table
+    """
+
+    rows = [[str(value) for value in row] for row in rows]
+    widths = [max(len(value) for value in column) for column in zip(headers, *rows)]
+    for row in [headers, ['-' * width for width in widths]] + rows:
+        print('  '.join(value.rjust(width) for value, width in zip(row, widths)))
@@ -0,0 +1,182 @@
+"""
+Throughput & latency against the number of concurrent connections, for the WSGI deployment with its pool of
+request threads and the ASGI deployment with the async views
+
+    pipenv run python -m benchmarks.asgi --concurrency 1 8 32 128 --threads 8 --client-ms 50
+
+Both handlers are driven in process: WSGI connections each take one of `--threads` request threads, like the
+threads of a gthread worker, ASGI connections are coroutines of a single event loop. Every response is read by
+its client in `--client-ms` milliseconds, the time a slow client keeps a WSGI thread busy writing the response
+while the ASGI handler awaits it. The requests are spread over the movie list, a movie's votes & a user's
+details, all sent by authenticated users.
+"""
+import argparse
+import asyncio
+import importlib
+import logging
+import random
+import threading
+import time
+from io import StringIO
+
+import benchmarks
+from benchmarks.replay import percentile
+
+
+def load_urls(async_views):
+    """
+    Import the URLs again with the views of the deployment, the URL conf picks them at import time
+    """
+
+    from django.test import override_settings
+    from django.urls import clear_url_caches
+
+    import api.urls
+    import movierama.urls
+
+    with override_settings(ASYNC_VIEWS=async_views):
+        importlib.reload(api.urls)
+        importlib.reload(movierama.urls)
+    clear_url_caches()
+
+
+def plan_requests(count, seed):
+    """
+    Return `count` random (path, token) requests of seeded users
+    """
+
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from api.models import Movie, User
+
+    rng = random.Random(seed)
+    users = list(User.objects.all()[:50])
+    tokens = {user.pk: str(RefreshToken.for_user(user).access_token) for user in users}
+    movies = list(Movie.objects.values_list('id', flat=True))
+
+    requests = []
+    for i in range(count):
+        user = rng.choice(users)
+        path = rng.choice(('/api/movies', '/api/movies/%d/votes' % rng.choice(movies), '/api/users/%d' % user.pk))
+        requests.append((path, tokens[user.pk]))
+    return requests
+
+
+def run_wsgi(requests, concurrency, threads, client_delay):
+    """
+    Send the requests from `concurrency` connections to the WSGI handler, returning the latencies in ms
+    """
+
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+    from django.test.client import FakePayload, RequestFactory
+
+    handler, factory = WSGIHandler(), RequestFactory()
+    request_threads = threading.Semaphore(threads)
+    pending, latencies = list(reversed(requests)), []
+
+    def connection():
+        while True:
+            try:
+                path, token = pending.pop()
+            except IndexError:
+                break
+            environ = factory._base_environ(PATH_INFO=path, REQUEST_METHOD='GET', HTTP_AUTHORIZATION='Bearer ' +
+                                            token, **{'wsgi.input': FakePayload(b'')})
+            start = time.perf_counter()
+            with request_threads:
+                response = handler(environ, lambda status, headers: None)
+                b''.join(response)
+                response.close()
+                # The thread writes the response until the client has read it
+                time.sleep(client_delay)
+            latencies.append((time.perf_counter() - start) * 1000)
+        connections.close_all()
+
+    clients = [threading.Thread(target=connection) for i in range(concurrency)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    return latencies
+
+
+def run_asgi(requests, concurrency, client_delay):
+    """
+    Send the requests from `concurrency` connections to the ASGI handler, returning the latencies in ms
+    """
+
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+    pending, latencies = list(reversed(requests)), []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.body' and not message.get('more_body'):
+            # The handler awaits the client reading the response
+            await asyncio.sleep(client_delay)
+
+    async def connection():
+        while pending:
+            path, token = pending.pop()
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'query_string': b'', 'root_path': '',
+                'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+                'headers': [(b'host', b'testserver'), (b'authorization', ('Bearer ' + token).encode())],
+            }
+            start = time.perf_counter()
+            await handler(scope, receive, send)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    async def connections():
+        await asyncio.gather(*(connection() for i in range(concurrency)))
+
+    asyncio.run(connections())
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128],
+                        help='Numbers of concurrent connections')
+    parser.add_argument('--threads', type=int, default=8, help='Request threads of the WSGI worker')
+    parser.add_argument('--client-ms', type=float, default=50, help='Milliseconds a client takes to read a response')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per measurement')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the data set and of the requests')
+    args = parser.parse_args()
+
+    old_name = benchmarks.setup()
+
+    from django.core.management import call_command
+
+    # Responses are checked by their latency only, 404s of random ids would otherwise be logged one by one
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    client_delay = args.client_ms / 1000
+    try:
+        call_command('generate_data', users=200, movies=2000, votes=20000, seed=args.seed, stdout=StringIO())
+        requests = plan_requests(args.requests, args.seed)
+
+        rows = []
+        for concurrency in args.concurrency:
+            for deployment in ('wsgi', 'asgi'):
+                load_urls(async_views=deployment == 'asgi')
+                start = time.perf_counter()
+                if deployment == 'wsgi':
+                    latencies = run_wsgi(requests, concurrency, args.threads, client_delay)
+                else:
+                    latencies = run_asgi(requests, concurrency, client_delay)
+                elapsed = time.perf_counter() - start
+                rows.append((concurrency, deployment, '%.0f' % (len(latencies) / elapsed),
+                             '%.1f' % percentile(latencies, 50), '%.1f' % percentile(latencies, 95)))
+
+        benchmarks.print_table(('connections', 'deployment', 'req/s', 'p50 ms', 'p95 ms'), rows)
+    finally:
+        benchmarks.teardown(old_name)
+
+
+if __name__ == '__main__':
+    main()
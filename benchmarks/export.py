@@ -0,0 +1,99 @@
+"""
+Time & peak memory of a full dump of the movies and their votes, pulled page by page from the movie list and
+the votes of every movie, and streamed by the NDJSON & CSV export endpoints
+
+    pipenv run python -m benchmarks.export --votes 20000 100000
+
+The peak memory is measured with tracemalloc, in a second run of every dump, while the responses are read and
+dropped as a client writing the dump to a file would.
+"""
+import argparse
+import time
+import tracemalloc
+from io import StringIO
+
+import benchmarks
+
+
+def read(response):
+    """
+    Read & drop the body of a response, returning its size in bytes
+    """
+
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def dump_pages(client):
+    """
+    Pull every movie from the movie list and the votes of every movie from its votes endpoint
+    """
+
+    size, movie_ids, url = 0, [], '/api/movies?page_size=100&ordering=created'
+    while url:
+        response = client.get(url)
+        size += read(response)
+        movie_ids.extend(movie['id'] for movie in response.data['results'])
+        url = response.data['next']
+    for movie_id in movie_ids:
+        size += read(client.get('/api/movies/%d/votes' % movie_id))
+    return size
+
+
+def dump_export(client, format):
+    """
+    Stream every movie & vote from the export endpoints
+    """
+
+    return read(client.get('/api/movies/export', {'format': format})) + read(
+        client.get('/api/movies/votes/export', {'format': format}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--votes', type=int, nargs='+', default=[20000, 100000], help='Numbers of votes')
+    parser.add_argument('--movies', type=int, default=1000, help='Number of movies')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the data set')
+    args = parser.parse_args()
+
+    old_name = benchmarks.setup()
+
+    from django.core.management import call_command
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from api.models import User
+
+    dumps = {
+        'pages': dump_pages,
+        'export ndjson': lambda client: dump_export(client, 'ndjson'),
+        'export csv': lambda client: dump_export(client, 'csv'),
+    }
+    try:
+        rows = []
+        for votes in args.votes:
+            call_command('generate_data', users=1000, movies=args.movies, votes=votes, seed=args.seed, flush=True,
+                         stdout=StringIO())
+            token = RefreshToken.for_user(User.objects.first()).access_token
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Bearer %s' % token)
+
+            for name, dump in dumps.items():
+                start = time.perf_counter()
+                size = dump(client)
+                elapsed = time.perf_counter() - start
+
+                tracemalloc.start()
+                dump(client)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                rows.append((votes, name, '%.1f' % (size / 2 ** 20), '%.2f' % elapsed, '%.1f' % (peak / 2 ** 20)))
+
+        benchmarks.print_table(('votes', 'dump', 'MiB', 'seconds', 'peak MiB'), rows)
+    finally:
+        benchmarks.teardown(old_name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Movie list latency of the `hot` ordering against the number of movies, comparing the net likes of the past week
+aggregated from the votes on every request against the materialized hot scores, along with the time it takes
+`update_hot_scores` to score every movie and to score again the movies voted for since its previous run
+
+    pipenv run python -m benchmarks.hot --sizes 10000 100000
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+from io import StringIO
+
+import benchmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='Numbers of movies')
+    parser.add_argument('--votes-per-movie', type=int, default=10, help='Average number of votes per movie')
+    parser.add_argument('--new-votes', type=int, default=100, help='Votes cast between two incremental runs')
+    parser.add_argument('--repeat', type=int, default=10, help='Requests per measurement')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the data set')
+    args = parser.parse_args()
+
+    old_name = benchmarks.setup()
+
+    from django.core.management import call_command
+    from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+    from django.db.models.functions import Coalesce
+    from django.utils import timezone
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from api.models import Movie, User, Vote
+    from api.views.movie import MovieListCreate
+
+    class AggregateMovieListCreate(MovieListCreate):
+        """
+        The movie list ordered by the net likes of the past week, aggregated from the votes of every movie
+        """
+
+        def get_queryset(self):
+            week = timezone.now() - timedelta(days=7)
+            votes = Vote.objects.filter(movie=OuterRef('pk'), created__gte=week).order_by().values('movie')
+            net = votes.annotate(net=Count('pk', filter=Q(reaction='like')) - Count('pk', filter=Q(reaction='hate')))
+            return super(AggregateMovieListCreate, self).get_queryset().annotate(
+                hot=Coalesce(Subquery(net.values('net'), output_field=IntegerField()), 0))
+
+    views = (AggregateMovieListCreate.as_view(), MovieListCreate.as_view())
+    factory = APIRequestFactory()
+    rng = random.Random(args.seed)
+
+    try:
+        rows = []
+        for size in args.sizes:
+            call_command('generate_data', users=1000, movies=size, votes=size * args.votes_per_movie,
+                         seed=args.seed, flush=True, stdout=StringIO())
+
+            start = time.perf_counter()
+            call_command('update_hot_scores', once=True, all=True, stdout=StringIO())
+            full = time.perf_counter() - start
+
+            # New votes from a user that submitted no movie, written as the API writes them
+            voter = User.objects.create(first_name="Jane", last_name="Doe", username="jane", email="jane@mr.com")
+            for movie_id in rng.sample(list(Movie.objects.values_list('id', flat=True)), args.new_votes):
+                Vote.objects.create(movie_id=movie_id, user=voter, reaction=rng.choice(('like', 'hate')))
+            start = time.perf_counter()
+            call_command('update_hot_scores', once=True, overlap=0, stdout=StringIO())
+            incremental = time.perf_counter() - start
+
+            timings = []
+            for view in views:
+                def list_movies():
+                    request = factory.get('/api/movies', {'ordering': '-hot'})
+                    force_authenticate(request, user=voter)
+                    response = view(request)
+                    assert response.status_code == 200, response.status_code
+
+                timings.append(benchmarks.measure(list_movies, repeat=args.repeat))
+            voter.delete()
+            rows.append((size, '%.2f' % timings[0], '%.2f' % timings[1], '%.1fx' % (timings[0] / timings[1]),
+                         '%.2f' % full, '%.1f' % (incremental * 1000)))
+
+        benchmarks.print_table(('movies', 'aggregate ms', 'materialized ms', 'speedup', 'all scored s',
+                                '%d votes scored ms' % args.new_votes), rows)
+    finally:
+        benchmarks.teardown(old_name)
+
+
+if __name__ == '__main__':
+    main()
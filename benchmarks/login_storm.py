@@ -0,0 +1,105 @@
+"""
+Latency of movie list reads served while a storm of logins hits the same server worker, with the passwords
+hashed on the request threads and on the bounded password hashing pool
+
+    pipenv run python -m benchmarks.login_storm --threads 4 --logins 32 --reads 200
+
+Requests are handled by a pool of `--threads` request threads, like the threads of a server worker. The logins
+all arrive at once and the reads every `--interval` milliseconds from then on, the latency of a request counts
+the time it waited for a free request thread.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import benchmarks
+from benchmarks.replay import percentile
+
+PASSWORD = "Testing-123"
+
+
+def seed(movies):
+    """
+    Create a user with a password & `movies` movies submitted by the user
+    """
+
+    from django.contrib.auth.hashers import make_password
+
+    from api.models import Movie, User
+
+    user = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com",
+                               password=make_password(PASSWORD))
+    Movie.objects.bulk_create(Movie(title="Movie %d" % i, user=user) for i in range(movies))
+
+
+def storm(threads, logins, reads, interval):
+    """
+    Send the logins at once and the reads at a steady pace, returning the (kind, status, latency) of requests
+    """
+
+    from django.db import connections
+    from django.test import Client
+
+    def send(kind, arrived):
+        client = Client()
+        if kind == 'login':
+            response = client.post('/api/token', {"username": "john", "password": PASSWORD},
+                                   content_type='application/json')
+        else:
+            response = client.get('/api/movies')
+        connections.close_all()
+        return kind, response.status_code, (time.perf_counter() - arrived) * 1000
+
+    futures = []
+    with ThreadPoolExecutor(threads) as executor:
+        futures.extend(executor.submit(send, 'login', time.perf_counter()) for i in range(logins))
+        for i in range(reads):
+            futures.append(executor.submit(send, 'read', time.perf_counter()))
+            time.sleep(interval / 1000)
+    return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=4, help='Request threads of the server worker')
+    parser.add_argument('--logins', type=int, default=32, help='Logins of the storm')
+    parser.add_argument('--reads', type=int, default=200, help='Movie list reads sent during the storm')
+    parser.add_argument('--interval', type=float, default=5, help='Milliseconds between two reads')
+    parser.add_argument('--workers', type=int, default=2, help='Workers of the password hashing pool')
+    parser.add_argument('--queue', type=int, help='Hashes waiting for a worker of the pool, as many as leave a '
+                                                  'request thread free by default')
+    parser.add_argument('--movies', type=int, default=100, help='Movies to list')
+    args = parser.parse_args()
+
+    old_name = benchmarks.setup()
+
+    from django.test import override_settings
+
+    scenarios = (
+        ('no logins', 0, {}),
+        ('request threads', args.logins, {'PASSWORD_HASHING_WORKERS': 0}),
+        ('hashing pool', args.logins, {'PASSWORD_HASHING_WORKERS': args.workers, 'REQUEST_THREADS': args.threads,
+                                       'PASSWORD_HASHING_QUEUE': max(args.threads - 1 - args.workers, 0)
+                                       if args.queue is None else args.queue}),
+    )
+
+    try:
+        seed(args.movies)
+        rows = []
+        for name, logins, hashing in scenarios:
+            with override_settings(**hashing):
+                results = storm(args.threads, logins, args.reads, args.interval)
+            read = [latency for kind, status, latency in results if kind == 'read']
+            login = [latency for kind, status, latency in results if kind == 'login' and status == 200]
+            rejected = sum(1 for kind, status, latency in results if kind == 'login' and status == 429)
+            rows.append((name, '%.1f' % percentile(read, 50), '%.1f' % percentile(read, 95), '%.1f' % max(read),
+                         len(login), rejected, '%.1f' % percentile(login, 95) if login else '-'))
+
+        benchmarks.print_table(
+            ('hashing', 'read p50 ms', 'read p95 ms', 'read max ms', 'logins', 'logins 429', 'login p95 ms'), rows)
+    finally:
+        benchmarks.teardown(old_name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Authenticated movie list latency against the number of movies, comparing the logged in user's vote
+looked up with a correlated subquery per movie row against a single batched lookup per page
+
+    pipenv run python -m benchmarks.movie_votes --sizes 1000 10000 100000
+"""
+import argparse
+
+import benchmarks
+
+
+def seed(size):
+    """
+    Create `size` movies submitted by one user and a voter that voted for every other movie
+    """
+
+    from api.models import Movie, User, Vote
+
+    Vote.objects.all().delete()
+    Movie.objects.all().delete()
+    User.objects.all().delete()
+
+    owner = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com")
+    voter = User.objects.create(first_name="Jane", last_name="Doe", username="jane", email="jane@mr.com")
+    Movie.objects.bulk_create(
+        (Movie(title="Movie %d" % i, user=owner, likes_count=i % 7, hates_count=i % 5) for i in range(size)),
+        batch_size=1000)
+    Vote.objects.bulk_create(
+        (Vote(movie_id=movie_id, user=voter, reaction=Vote.SupportedMovieVotes.LIKE)
+         for movie_id in Movie.objects.values_list('id', flat=True)[::2]),
+        batch_size=1000)
+    return voter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000], help='Numbers of movies')
+    parser.add_argument('--orderings', nargs='+', default=['-created', 'title', '-likes'], help='Orderings to list')
+    parser.add_argument('--repeat', type=int, default=20, help='Requests per measurement')
+    args = parser.parse_args()
+
+    old_name = benchmarks.setup()
+
+    from django.db.models import CharField, OuterRef, Subquery
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from api.models import Vote
+    from api.views.movie import MovieListCreate
+
+    class SubqueryMovieListCreate(MovieListCreate):
+        """
+        The movie list as it used to look up the user's vote, with a correlated subquery per movie row
+        """
+
+        def get_queryset(self):
+            return super(SubqueryMovieListCreate, self).get_queryset().annotate(
+                vote=Subquery(
+                    Vote.objects.filter(movie=OuterRef('id'), user=self.request.user).values('reaction')[:1],
+                    output_field=CharField(null=True)),
+            )
+
+        def add_user_votes(self, movies):
+            pass
+
+    views = (SubqueryMovieListCreate.as_view(), MovieListCreate.as_view())
+    factory = APIRequestFactory()
+
+    try:
+        rows = []
+        for size in args.sizes:
+            voter = seed(size)
+            for ordering in args.orderings:
+                timings = []
+                for view in views:
+                    def list_movies():
+                        request = factory.get('/api/movies', {'ordering': ordering})
+                        force_authenticate(request, user=voter)
+                        response = view(request)
+                        assert response.status_code == 200, response.status_code
+
+                    timings.append(benchmarks.measure(list_movies, repeat=args.repeat))
+                rows.append((size, ordering, '%.2f' % timings[0], '%.2f' % timings[1],
+                             '%.1fx' % (timings[0] / timings[1])))
+
+        benchmarks.print_table(('movies', 'ordering', 'subquery ms', 'batched ms', 'speedup'), rows)
+    finally:
+        benchmarks.teardown(old_name)
+
+
+if __name__ == '__main__':
+    main()
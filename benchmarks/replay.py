@@ -0,0 +1,284 @@
+"""
+Per-endpoint latency, SQL queries and allocations of a recorded request mix, replayed through the Django
+test client against a database seeded by `generate_data`
+
+    pipenv run python -m benchmarks.replay --requests 2000 --output after.json --baseline before.json
+
+Every line of the requests file is a JSON object recording one kind of request:
+
+    name     label the results are grouped by
+    method   HTTP method, GET by default
+    path     request path, e.g. "/api/movies/{movie}/votes"
+    query    query string parameters, optional
+    body     JSON body, optional
+    auth     "user" to send the bearer token of a random seeded user, anonymous by default
+    weight   relative frequency of the request in the mix, 1 by default
+    expect   accepted status codes, any status below 400 by default
+
+`{movie}`, `{user}` & `{username}` in the path, query or body are replaced with a random seeded movie id,
+user id & username, `{random}` with a random number. With `--baseline`, the run fails when an endpoint's
+p95 latency grew by more than `--threshold` or it runs more queries than in the baseline results.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from io import StringIO
+from urllib.parse import urlencode
+
+import benchmarks
+
+DEFAULT_REQUESTS = os.path.join(os.path.dirname(__file__), 'requests.jsonl')
+
+
+def load_mix(path):
+    """
+    Read the recorded requests of a JSON lines file
+    """
+
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, p):
+    """
+    Return the nearest-rank percentile of the values
+    """
+
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))]
+
+
+class Replayer:
+    """
+    Turn recorded requests into test client calls against the seeded data
+    """
+
+    def __init__(self, seed):
+        from django.test import Client
+
+        from api.models import Movie, User
+
+        self.rng = random.Random(seed)
+        self.client = Client()
+        self.movies = list(Movie.objects.values_list('id', flat=True))
+        self.users = list(User.objects.values_list('id', 'username'))
+        self.tokens = {}
+
+    def fill(self, value, user):
+        """
+        Replace the placeholders of a recorded value, keeping ids that make up a whole value integers
+        """
+
+        if isinstance(value, dict):
+            return {key: self.fill(item, user) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.fill(item, user) for item in value]
+        if not isinstance(value, str):
+            return value
+        if value == '{movie}':
+            return self.rng.choice(self.movies)
+        if value == '{user}':
+            return user[0]
+        return value.format(movie=self.rng.choice(self.movies), user=user[0], username=user[1],
+                            random=self.rng.getrandbits(32))
+
+    def token(self, user_id):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        from api.models import User
+
+        if user_id not in self.tokens:
+            self.tokens[user_id] = str(RefreshToken.for_user(User.objects.get(pk=user_id)).access_token)
+        return self.tokens[user_id]
+
+    def prepare(self, recorded):
+        """
+        Return a callable sending a concrete request of the recorded kind
+        """
+
+        user = self.rng.choice(self.users)
+        path = self.fill(recorded['path'], user)
+        query = self.fill(recorded.get('query', {}), user)
+        if query:
+            path += '?' + urlencode(query)
+
+        extra = {}
+        if recorded.get('auth') == 'user':
+            extra['HTTP_AUTHORIZATION'] = 'Bearer ' + self.token(user[0])
+        if 'body' in recorded:
+            extra['data'] = json.dumps(self.fill(recorded['body'], user))
+            extra['content_type'] = 'application/json'
+
+        send = getattr(self.client, recorded.get('method', 'GET').lower())
+        return lambda: send(path, **extra)
+
+
+class QueryTimer:
+    """
+    Database execute wrapper counting the queries and summing their time
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - start
+            self.queries += 1
+
+
+def replay(mix, requests, warmup, seed):
+    """
+    Replay a weighted random sequence of the mix, returning the raw samples per endpoint
+    """
+
+    from django.core.cache import cache
+    from django.db import connection
+
+    cache.clear()
+    replayer = Replayer(seed)
+    weights = [recorded.get('weight', 1) for recorded in mix]
+    sequence = replayer.rng.choices(mix, weights=weights, k=warmup + requests)
+    samples = defaultdict(lambda: defaultdict(list))
+
+    # Allocations are traced in a separate pass, tracemalloc slows every allocation down
+    for tracing in (False, True):
+        if tracing:
+            tracemalloc.start()
+        for i, recorded in enumerate(sequence):
+            send = replayer.prepare(recorded)
+            if tracing:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                send()
+                if i >= warmup:
+                    samples[recorded['name']]['alloc'].append(tracemalloc.get_traced_memory()[1] - before)
+                continue
+
+            timer = QueryTimer()
+            with connection.execute_wrapper(timer):
+                start = time.perf_counter()
+                response = send()
+                elapsed = time.perf_counter() - start
+            if i < warmup:
+                continue
+
+            endpoint = samples[recorded['name']]
+            endpoint['latency'].append(elapsed * 1000)
+            endpoint['queries'].append(timer.queries)
+            endpoint['sql'].append(timer.time * 1000)
+            expect = recorded.get('expect')
+            endpoint['errors'].append(
+                response.status_code not in expect if expect else response.status_code >= 400)
+        if tracing:
+            tracemalloc.stop()
+    return samples
+
+
+def summarize(samples):
+    """
+    Reduce the raw samples to the statistics of every endpoint
+    """
+
+    results = {}
+    for name, endpoint in sorted(samples.items()):
+        latency = endpoint['latency']
+        results[name] = {
+            'count': len(latency),
+            'errors': sum(endpoint['errors']),
+            'p50': percentile(latency, 50),
+            'p95': percentile(latency, 95),
+            'p99': percentile(latency, 99),
+            'queries': sum(endpoint['queries']) / len(latency),
+            'sql_ms': sum(endpoint['sql']) / len(latency),
+            'alloc_kib': sum(endpoint['alloc']) / len(endpoint['alloc']) / 1024 if endpoint['alloc'] else 0,
+        }
+    return results
+
+
+def regressions(results, baseline, threshold):
+    """
+    Return the endpoints whose p95 latency or query count regressed against the baseline results
+    """
+
+    regressed = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['p95'] > base['p95'] * (1 + threshold):
+            regressed.append('%s: p95 %.2f ms -> %.2f ms' % (name, base['p95'], result['p95']))
+        if result['queries'] > base['queries'] + 0.5:
+            regressed.append('%s: %.1f -> %.1f queries' % (name, base['queries'], result['queries']))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file', default=DEFAULT_REQUESTS, help='Recorded requests to replay')
+    parser.add_argument('--requests', type=int, default=1000, help='Number of requests to replay')
+    parser.add_argument('--warmup', type=int, default=50, help='Number of requests to send before measuring')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the data set and of the request sequence')
+    parser.add_argument('--users', type=int, default=1000, help='Number of users to seed')
+    parser.add_argument('--movies', type=int, default=5000, help='Number of movies to seed')
+    parser.add_argument('--votes', type=int, default=50000, help='Number of votes to seed')
+    parser.add_argument('--output', help='Save the results as JSON to this path')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Tolerated p95 latency growth against the baseline, as a fraction')
+    args = parser.parse_args()
+
+    mix = load_mix(args.file)
+    old_name = benchmarks.setup()
+
+    from django.core.management import call_command
+
+    # Expected 4xx responses of the mix would otherwise be logged one by one
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    try:
+        call_command('generate_data', users=args.users, movies=args.movies, votes=args.votes, seed=args.seed,
+                     stdout=StringIO())
+        results = summarize(replay(mix, args.requests, args.warmup, args.seed))
+    finally:
+        benchmarks.teardown(old_name)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['endpoints']
+
+    rows = []
+    for name, result in results.items():
+        row = [name, result['count'], result['errors']] + ['%.2f' % result[key] for key in ('p50', 'p95', 'p99')]
+        row += ['%.1f' % result['queries'], '%.2f' % result['sql_ms'], '%.1f' % result['alloc_kib']]
+        if baseline:
+            base = baseline.get(name)
+            row.append('%+.0f%%' % ((result['p95'] / base['p95'] - 1) * 100) if base else 'new')
+        rows.append(row)
+    headers = ['endpoint', 'n', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'sql ms', 'alloc KiB']
+    benchmarks.print_table(headers + (['p95 vs baseline'] if baseline else []), rows)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'settings': {key: value for key, value in vars(args).items()
+                                    if key not in ('output', 'baseline', 'threshold')},
+                       'endpoints': results}, f, indent=2)
+
+    regressed = regressions(results, baseline, args.threshold)
+    if regressed:
+        print('\nRegressed endpoints:\n' + '\n'.join(regressed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
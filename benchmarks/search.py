@@ -0,0 +1,113 @@
+"""
+Authenticated movie list search latency against the number of movies, comparing DRF's SearchFilter, a
+`LIKE '%term%'` scan of the titles & descriptions, against the `search` of the FTS5 index
+
+    pipenv run python -m benchmarks.search --sizes 100000 1000000
+
+Titles & descriptions are drawn from a vocabulary with Zipf distributed words, so that the terms searched for
+range from common ones matching most of the movies to rare ones matching a handful, or none. The ETag
+validators of the movie list, which count every movie on every request, are left out of both lists so as to time
+the searches alone.
+"""
+import argparse
+import random
+import time
+
+import benchmarks
+
+WORDS = 5000
+
+
+def seed(size, seed):
+    """
+    Create `size` movies, with unique titles of 1 to 4 words and descriptions of 5 to 30 words, and return their user
+    """
+
+    from api.models import Movie, User
+
+    Movie.objects.all().delete()
+    User.objects.all().delete()
+
+    rng = random.Random(seed)
+    vocabulary = ['word%d' % i for i in range(WORDS)]
+    weights = [1 / (rank + 1) for rank in range(WORDS)]
+
+    def text(low, high):
+        return ' '.join(rng.choices(vocabulary, weights, k=rng.randint(low, high)))
+
+    owner = User.objects.create(first_name="John", last_name="Doe", username="john", email="john@mr.com")
+    Movie.objects.bulk_create(
+        (Movie(title='%s %d' % (text(1, 4), i), description=text(5, 30), user=owner) for i in range(size)),
+        batch_size=1000)
+    return owner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000], help='Numbers of movies')
+    parser.add_argument('--terms', nargs='+', default=['word1', 'word100', 'word4000', 'word1 word4000', 'missing'],
+                        help='Searches, from common to rare words')
+    parser.add_argument('--repeat', type=int, default=5, help='Requests per measurement')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the data set')
+    args = parser.parse_args()
+
+    old_name = benchmarks.setup()
+
+    from rest_framework import filters
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from api.views.movie import MovieListCreate
+
+    class SearchMovieListCreate(MovieListCreate):
+        """
+        The movie list without its ETag validators
+        """
+
+        def get(self, request, *args, **kwargs):
+            return self.list(request, *args, **kwargs)
+
+    class LikeMovieListCreate(SearchMovieListCreate):
+        """
+        The movie list searched with DRF's SearchFilter, a `LIKE '%term%'` match of every term
+        """
+
+        filter_backends = (filters.SearchFilter, filters.OrderingFilter)
+        search_fields = ('title', 'description')
+
+    views = {'like': LikeMovieListCreate.as_view(), 'fts': SearchMovieListCreate.as_view()}
+    factory = APIRequestFactory()
+
+    try:
+        rows = []
+        for size in args.sizes:
+            start = time.perf_counter()
+            user = seed(size, args.seed)
+            print('Seeded %d movies in %.1f s' % (size, time.perf_counter() - start))
+
+            for term in args.terms:
+                for ordering in ('-created', 'rank'):
+                    timings = {}
+                    for name, view in views.items():
+                        if ordering == 'rank' and name == 'like':
+                            # LIKE matches have no relevance to be ranked by
+                            continue
+
+                        def search():
+                            params = {'search': term} if ordering == 'rank' else {'search': term, 'ordering': ordering}
+                            request = factory.get('/api/movies', params)
+                            force_authenticate(request, user=user)
+                            response = view(request)
+                            assert response.status_code == 200, response.status_code
+
+                        timings[name] = benchmarks.measure(search, repeat=args.repeat, warmup=1)
+                    like = '%.2f' % timings['like'] if 'like' in timings else '-'
+                    speedup = '%.1fx' % (timings['like'] / timings['fts']) if 'like' in timings else '-'
+                    rows.append((size, term, ordering, like, '%.2f' % timings['fts'], speedup))
+
+        benchmarks.print_table(('movies', 'search', 'ordering', 'like ms', 'fts ms', 'speedup'), rows)
+    finally:
+        benchmarks.teardown(old_name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Movie list serialization time against the number of rows, comparing the DRF MovieSerializer over model
+instances against the ValuesSerializer over `.values()` rows, each including the query and JSON rendering
+
+    pipenv run python -m benchmarks.serialization --sizes 1000 10000 100000
+"""
+import argparse
+
+import benchmarks
+
+
+def seed(size):
+    """
+    Create `size` movies submitted by a hundred users
+    """
+
+    from api.models import Movie, User
+
+    Movie.objects.all().delete()
+    User.objects.all().delete()
+
+    User.objects.bulk_create(
+        User(first_name="User", last_name="%d" % i, username="user%d" % i, email="user%d@mr.com" % i)
+        for i in range(100))
+    user_ids = list(User.objects.values_list('id', flat=True))
+    Movie.objects.bulk_create(
+        (Movie(title="Movie %d" % i, description="Description of movie %d" % i, user_id=user_ids[i % 100],
+               likes_count=i % 7, hates_count=i % 5) for i in range(size)),
+        batch_size=1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Numbers of movies')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement')
+    args = parser.parse_args()
+
+    old_name = benchmarks.setup()
+
+    from django.db.models import F
+    from rest_framework.renderers import JSONRenderer
+
+    from api.models import Movie
+    from api.serializers.movie import MovieSerializer
+    from api.serializers.values import ValuesSerializer
+
+    renderer = JSONRenderer()
+    values_serializer = ValuesSerializer(MovieSerializer)
+    queryset = Movie.objects.select_related('user').annotate(
+        likes=F('likes_count'), hates=F('hates_count')).order_by('-created', '-id')
+
+    def drf():
+        movies = list(queryset.all())
+        for movie in movies:
+            movie.vote = None
+        return renderer.render(MovieSerializer(movies, many=True).data)
+
+    def values():
+        rows = list(values_serializer.values(queryset))
+        for row in rows:
+            row['vote'] = None
+        return renderer.render(values_serializer.many(rows))
+
+    try:
+        rows = []
+        for size in args.sizes:
+            seed(size)
+            assert drf() == values(), 'The serializers rendered different JSON'
+            drf_ms = benchmarks.measure(drf, repeat=args.repeat, warmup=1)
+            values_ms = benchmarks.measure(values, repeat=args.repeat, warmup=1)
+            rows.append((size, '%.1f' % drf_ms, '%.1f' % values_ms, '%.1fx' % (drf_ms / values_ms)))
+
+        benchmarks.print_table(('movies', 'MovieSerializer ms', 'ValuesSerializer ms', 'speedup'), rows)
+    finally:
+        benchmarks.teardown(old_name)
+
+
+if __name__ == '__main__':
+    main()
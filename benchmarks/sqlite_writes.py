@@ -0,0 +1,186 @@
+"""
+Movie list throughput & latency while bursts of votes are written, for SQLite's default configuration, the
+production profile of the settings (WAL, connection pragmas, IMMEDIATE transactions & persistent connections)
+and the production profile reading from a replica
+
+    pipenv run python -m benchmarks.sqlite_writes --readers 8 --writers 4 --seconds 5
+
+Readers list movies continuously while every writer likes `--burst` movies in one bulk vote request, unlikes
+them in another and pauses for `--pause-ms` milliseconds. Requests go through the WSGI handler on their own
+threads, which open & close database connections like the threads of a gthread worker. Failed requests are the
+500 responses, typically "database is locked" errors.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+
+import benchmarks
+from benchmarks.replay import percentile
+
+
+def get_profiles():
+    """
+    Return the journal mode & connection settings of every profile
+    """
+
+    from django.conf import settings
+
+    database = settings.DATABASES['default']
+    return {
+        # Django's defaults: rollback journal, DEFERRED transactions & a connection per request
+        'default': {'journal_mode': 'DELETE', 'OPTIONS': {}, 'CONN_MAX_AGE': 0},
+        'production': {'journal_mode': settings.SQLITE_PRAGMAS['journal_mode'], 'OPTIONS': dict(database['OPTIONS']),
+                       'CONN_MAX_AGE': database['CONN_MAX_AGE'] or 600},
+        # The production profile, with safe requests reading from a replica copied every REPLICA_INTERVAL
+        'replica': {'journal_mode': settings.SQLITE_PRAGMAS['journal_mode'], 'OPTIONS': dict(database['OPTIONS']),
+                    'CONN_MAX_AGE': database['CONN_MAX_AGE'] or 600, 'replica': True},
+    }
+
+
+def use_profile(profile):
+    """
+    Configure the connections, and the journal mode of the database file, for the profile
+    """
+
+    from django.conf import settings
+    from django.db import connection, connections
+
+    connections.close_all()
+    connections.databases['default'].update(OPTIONS=profile['OPTIONS'], CONN_MAX_AGE=profile['CONN_MAX_AGE'])
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=%s' % profile['journal_mode'])
+    connection.close()
+
+    if profile.get('replica'):
+        settings.REPLICA_DATABASE = os.path.join(tempfile.mkdtemp(), 'replica.sqlite3')
+        connections.databases['replica'] = {
+            'ENGINE': 'movierama.sqlite3', 'NAME': 'file:%s?mode=ro' % settings.REPLICA_DATABASE, 'OPTIONS': {},
+            'CONN_MAX_AGE': profile['CONN_MAX_AGE'],
+        }
+
+
+def replicate(stop):
+    """
+    Copy the database to the replica every REPLICA_INTERVAL until `stop` is set, like `manage.py replicate`
+    """
+
+    from django.conf import settings
+    from django.core.management import call_command
+
+    while not stop.wait(settings.REPLICA_INTERVAL):
+        call_command('replicate', once=True)
+
+
+def run(readers, writers, seconds, burst, pause):
+    """
+    Run the readers & writers for `seconds`, returning the read latencies in ms, the votes written and the failed
+    reads & writes
+    """
+
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+    from django.test.client import FakePayload, RequestFactory
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from api.models import Movie, User
+
+    handler, factory = WSGIHandler(), RequestFactory()
+    users = list(User.objects.all()[:writers])
+    movies = list(Movie.objects.values_list('id', 'user_id'))
+    latencies, writes, failures = [], [], {'read': 0, 'write': 0}
+    deadline = time.perf_counter() + seconds
+
+    def send(method, path, token=None, body=b''):
+        environ = factory._base_environ(PATH_INFO=path, REQUEST_METHOD=method, CONTENT_TYPE='application/json',
+                                        CONTENT_LENGTH=str(len(body)), **{'wsgi.input': FakePayload(body)})
+        if token:
+            environ['HTTP_AUTHORIZATION'] = 'Bearer ' + token
+        response = handler(environ, lambda status, headers: None)
+        b''.join(response)
+        response.close()
+        return response.status_code
+
+    def reader():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if send('GET', '/api/movies') >= 500:
+                failures['read'] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+        connections.close_all()
+
+    def writer(user, rng):
+        token = str(RefreshToken.for_user(user).access_token)
+        votable = [movie_id for movie_id, owner_id in movies if owner_id != user.pk]
+        while time.perf_counter() < deadline:
+            movie_ids = rng.sample(votable, burst)
+            for reaction in ('like', None):
+                body = json.dumps([{'movie_id': movie_id, 'reaction': reaction} for movie_id in movie_ids])
+                if send('POST', '/api/movies/votes', token, body.encode()) >= 500:
+                    failures['write'] += 1
+                else:
+                    writes.append(burst)
+            time.sleep(pause)
+        connections.close_all()
+
+    threads = [threading.Thread(target=reader) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(user, random.Random(i))) for i, user in enumerate(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(writes), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8, help='Threads listing movies')
+    parser.add_argument('--writers', type=int, default=4, help='Threads voting, each as another user')
+    parser.add_argument('--seconds', type=float, default=5, help='Duration of every measurement')
+    parser.add_argument('--burst', type=int, default=20, help='Votes written per request')
+    parser.add_argument('--pause-ms', type=float, default=100, help='Milliseconds between bursts')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the data set')
+    args = parser.parse_args()
+
+    old_name = benchmarks.setup()
+
+    from django.conf import settings
+    from django.core.management import call_command
+
+    # Failures are counted, rather than logged one by one
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    try:
+        call_command('generate_data', users=200, movies=2000, votes=20000, seed=args.seed, stdout=StringIO())
+
+        rows = []
+        for name, profile in get_profiles().items():
+            use_profile(profile)
+            stop = threading.Event()
+            if profile.get('replica'):
+                call_command('replicate', once=True)
+                threading.Thread(target=replicate, args=(stop,), daemon=True).start()
+            for writers in (0, args.writers):
+                latencies, votes, failures = run(args.readers, writers, args.seconds, args.burst,
+                                                 args.pause_ms / 1000)
+                rows.append((name, writers, '%.0f' % (len(latencies) / args.seconds),
+                             '%.0f' % (votes / args.seconds),
+                             '%.1f' % percentile(latencies, 50), '%.1f' % percentile(latencies, 95),
+                             failures['read'], failures['write']))
+            stop.set()
+
+        benchmarks.print_table(('profile', 'writers', 'reads/s', 'votes/s', 'p50 ms', 'p95 ms', 'failed reads',
+                                'failed writes'), rows)
+    finally:
+        benchmarks.teardown(old_name)
+        if settings.REPLICA_DATABASE:
+            shutil.rmtree(os.path.dirname(settings.REPLICA_DATABASE))
+
+
+if __name__ == '__main__':
+    main()
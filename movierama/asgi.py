@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'movierama.settings')
+# Serve the async views of the API, see api.asynchronous
+os.environ.setdefault('ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
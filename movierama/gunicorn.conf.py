@@ -0,0 +1,65 @@
+"""
+Gunicorn configuration of the production server
+
+    pipenv run gunicorn -c movierama/gunicorn.conf.py
+
+Pre-forked worker processes each serve requests with a few threads. The application is imported once by the
+master before forking, so the workers share its code pages instead of importing it each. Every setting below
+can be changed with its environment variable, or with gunicorn's own GUNICORN_CMD_ARGS.
+
+Signals to the master (its pid is written to GUNICORN_PIDFILE):
+
+    HUP          start new workers with the current configuration and stop the old ones gracefully
+    USR2 + TERM  deploy new code, which HUP does not reload since it is preloaded: USR2 starts a new master
+                 & workers next to the old ones, TERM then stops the old master, see `./start.sh reload`
+    TERM         stop gracefully, within graceful_timeout
+"""
+import multiprocessing
+import os
+import shutil
+
+wsgi_app = 'movierama.wsgi:application'
+bind = os.getenv('BIND', '0.0.0.0:%s' % os.getenv('PORT', '8000'))
+pidfile = os.getenv('GUNICORN_PIDFILE', '/tmp/movierama-gunicorn.pid')
+
+# (2 x CPUs) + 1 workers, so that a worker waiting on I/O always leaves another one to use the CPU
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+preload_app = True
+
+# Idle keep-alive connections are kept open longer than by the load balancer in front, which then never sends a
+# request on a connection the server is closing. Each worker holds up to worker_connections of them.
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '75'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+# Workers are recycled after about max_requests requests, at staggered times, to bound slow memory growth
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def on_starting(server):
+    # The samples of the workers of a previous run would be summed up with the new ones
+    metrics_dir = os.getenv('METRICS_DIR')
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+
+
+def when_ready(server):
+    # Connections opened while preloading the application must not be shared by the forked workers
+    from django.db import connections
+
+    connections.close_all()
+
+    # The API documentation is built once by the master rather than by every worker
+    from movierama.schema import get_schema, get_swagger_ui
+
+    get_schema()
+    get_swagger_ui()
@@ -0,0 +1,89 @@
+"""
+The OpenAPI schema of the API & its Swagger UI, built once instead of on every request
+
+`manage.py generate_schema` writes the schema to the OPENAPI_SCHEMA file at build time (see start.sh & the
+Dockerfile), the view then serves it from memory. drf_yasg2, whose introspection of every view & serializer is
+the expensive part, is only imported when the file is missing and the schema has to be generated in process, and
+to render the Swagger UI page once per process.
+"""
+import functools
+import hashlib
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.views.decorators.http import etag, require_safe
+
+TITLE = "Movierama API"
+VERSION = 'v1'
+CONTACT_EMAIL = "rania.marou@gmail.com"
+
+
+def generate_schema():
+    """
+    Introspect the API and return its OpenAPI schema as JSON bytes
+
+    The schema is generated without a request, so it is the same for every client and leaves the host out:
+    Swagger UI then uses the host the page was served from.
+    """
+
+    from drf_yasg2 import openapi
+    from drf_yasg2.codecs import OpenAPICodecJson
+    from drf_yasg2.generators import OpenAPISchemaGenerator
+
+    info = openapi.Info(title=TITLE, default_version=VERSION, contact=openapi.Contact(email=CONTACT_EMAIL))
+    schema = OpenAPISchemaGenerator(info, version=VERSION).get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+@functools.lru_cache(maxsize=None)
+def get_schema():
+    """
+    Return the schema written by `generate_schema`, or generate it if there is none
+    """
+
+    if os.path.exists(settings.OPENAPI_SCHEMA):
+        with open(settings.OPENAPI_SCHEMA, 'rb') as f:
+            return f.read()
+    return generate_schema()
+
+
+@functools.lru_cache(maxsize=None)
+def get_swagger_ui():
+    """
+    Return the Swagger UI page, which does not depend on the request and loads the schema from `?format=openapi`
+    """
+
+    from drf_yasg2.renderers import SwaggerUIRenderer
+
+    context = {}
+    SwaggerUIRenderer().set_context(context)
+    context.update(title=TITLE, version=VERSION)
+    return render_to_string(SwaggerUIRenderer.template, context).encode('utf-8')
+
+
+@functools.lru_cache(maxsize=None)
+def content_etag(content):
+    return '"%s"' % hashlib.md5(content).hexdigest()
+
+
+def schema_document(request):
+    """
+    Return the content & content type the request asks for
+    """
+
+    if request.GET.get('format') == 'openapi':
+        return get_schema(), 'application/openapi+json'
+    return get_swagger_ui(), 'text/html; charset=utf-8'
+
+
+@require_safe
+@etag(lambda request: content_etag(schema_document(request)[0]))
+def schema_view(request):
+    """
+    Serve the Swagger UI, or the OpenAPI schema with `?format=openapi`
+    """
+
+    content, content_type = schema_document(request)
+    return HttpResponse(content, content_type=content_type)
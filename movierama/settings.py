@@ -39,10 +39,14 @@ INSTALLED_APPS = [
     'rest_framework',
     'drf_yasg2',
     'django_filters',
-    'api',
+    'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.timing.ServerTimingMiddleware',
+    'api.slow_queries.SlowQueryMiddleware',
+    'api.replica.ReplicaMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -50,9 +54,65 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'movierama.urls'
 
+# Serve the movie list, movie votes & user detail endpoints with async views, set by the ASGI entry point
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', '0') == '1'
+
+# Request, query & cache metrics exposed at /metrics, set METRICS=0 to turn them off. Set METRICS_DIR to a
+# directory shared by the worker processes (emptied on every restart) to aggregate the metrics of all of them
+METRICS = os.getenv('METRICS', '1') == '1'
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+
+# Set SLOW_QUERY_MS to log the SQL queries slower than that many milliseconds with their query plan to
+# SLOW_QUERY_LOG. The log is appended to by every worker process and is meant to be rotated externally
+SLOW_QUERY_MS = os.getenv('SLOW_QUERY_MS', '')
+SLOW_QUERY_MS = float(SLOW_QUERY_MS) if SLOW_QUERY_MS else None
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', str(BASE_DIR / 'slow_queries.log'))
+
+# Passwords are hashed on a pool of PASSWORD_HASHING_WORKERS threads (or processes with
+# PASSWORD_HASHING_EXECUTOR=process), signups & logins beyond PASSWORD_HASHING_QUEUE waiting hashes get a 429
+# response. Hashes in flight never take more than all but one of the REQUEST_THREADS of a server worker (its
+# GUNICORN_THREADS), which are always left a thread for other requests. Set PASSWORD_HASHING_WORKERS=0 to hash on
+# the request threads
+REQUEST_THREADS = int(os.getenv('GUNICORN_THREADS', '4'))
+PASSWORD_HASHING_EXECUTOR = os.getenv('PASSWORD_HASHING_EXECUTOR', 'thread')
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', '2'))
+# By default as many hashes wait for a worker as leave a request thread free
+PASSWORD_HASHING_QUEUE = os.getenv('PASSWORD_HASHING_QUEUE')
+PASSWORD_HASHING_QUEUE = int(PASSWORD_HASHING_QUEUE) if PASSWORD_HASHING_QUEUE \
+    else max(REQUEST_THREADS - 1 - PASSWORD_HASHING_WORKERS, 0)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {
+            'format': '%(message)s',
+        },
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'delay': True,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'api.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# Set SERVER_TIMING=1 to break the handling time of every request down into Server-Timing headers
+SERVER_TIMING = os.getenv('SERVER_TIMING', '0') == '1'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.JWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'rest_framework.filters.OrderingFilter',
@@ -67,6 +127,13 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
 }
 
+# Verified access tokens and their users are cached in process, see api.authentication.TokenCache
+JWT_AUTH_CACHE_SIZE = 1024
+JWT_AUTH_CACHE_TTL = 300
+
+# OpenAPI schema written by `manage.py generate_schema`, generated on the first request when missing
+OPENAPI_SCHEMA = os.getenv('OPENAPI_SCHEMA', str(BASE_DIR / 'openapi.json'))
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'api_key': {
@@ -101,10 +168,80 @@ WSGI_APPLICATION = 'movierama.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
+# Readers never wait for writers in WAL mode, which is safe with synchronous=NORMAL: a power loss may only lose
+# the last commits. Pages are cached per connection (cache_size in KiB when negative) & read through mmap
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'movierama.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Seconds a connection is kept open by its worker thread, 0 closes it at the end of every request
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', '0')),
+        'OPTIONS': {
+            'init_command': '; '.join('PRAGMA %s=%s' % pragma for pragma in SQLITE_PRAGMAS.items()),
+            # Writing transactions wait up to SQLITE_BUSY_TIMEOUT seconds for each other instead of failing with
+            # "database is locked", see movierama/sqlite3/base.py
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', '5')),
+        },
+        # Tests run against a file rather than SQLite's shared in-memory database, which fails concurrent
+        # writers with "database table is locked" instead of letting them wait for each other
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+# Set REPLICA_DATABASE to the path of a read-only copy of the database kept in sync by `manage.py replicate`, for
+# safe requests to read from while it was checked within REPLICA_MAX_LAG seconds. Users who wrote read from the
+# primary database for REPLICA_PIN_SECONDS afterwards, see api/replica.py. Every copy reads and writes the whole
+# database, the replicator waits between copies so that it spends at most REPLICA_MAX_DUTY of its time copying
+REPLICA_DATABASE = os.getenv('REPLICA_DATABASE', '')
+REPLICA_INTERVAL = float(os.getenv('REPLICA_INTERVAL', '1'))
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', '5'))
+REPLICA_PIN_SECONDS = float(os.getenv('REPLICA_PIN_SECONDS', '5'))
+REPLICA_MAX_DUTY = float(os.getenv('REPLICA_MAX_DUTY', '0.25'))
+
+if REPLICA_DATABASE:
+    DATABASES['replica'] = {
+        'ENGINE': 'movierama.sqlite3',
+        'NAME': 'file:%s?mode=ro' % REPLICA_DATABASE,
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'OPTIONS': {
+            # The journal mode is the primary database's, copied along with it
+            'init_command': '; '.join('PRAGMA %s=%s' % pragma for pragma in SQLITE_PRAGMAS.items()
+                                      if pragma[0] != 'journal_mode'),
+            'timeout': DATABASES['default']['OPTIONS']['timeout'],
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    }
+
+DATABASE_ROUTERS = ['api.replica.ReplicaRouter']
+
+# The votes of the `hot` ordering of movies count for half as much every HOT_HALF_LIFE_HOURS, their scores are
+# updated every HOT_INTERVAL seconds by `manage.py update_hot_scores`, see api/models/movie.py
+HOT_HALF_LIFE_HOURS = float(os.getenv('HOT_HALF_LIFE_HOURS', '24'))
+HOT_INTERVAL = float(os.getenv('HOT_INTERVAL', '60'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# Local memory by default, set CACHE_DIR to share the cache between worker processes through files
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache' if os.getenv('CACHE_DIR')
+        else 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': os.getenv('CACHE_DIR', 'movierama'),
     }
 }
 
@@ -148,6 +285,9 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# Static files are gathered here by `collectstatic` for the production server, see movierama/wsgi.py
+STATIC_ROOT = os.getenv('STATIC_ROOT', str(BASE_DIR / 'staticfiles'))
+
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
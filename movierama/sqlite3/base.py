@@ -0,0 +1,44 @@
+"""
+SQLite database backend with the connection options of Django 5.1, which Django 3.1 lacks
+
+    'OPTIONS': {
+        'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 5,
+    }
+
+`init_command` statements run on every new connection. `transaction_mode` is the BEGIN mode of transactions:
+DEFERRED transactions take the write lock on their first write, and when another connection holds it SQLite
+fails them at once with "database is locked" rather than wait, since waiting could deadlock the readers it has
+already let in. IMMEDIATE transactions take the write lock when they begin, waiting up to `timeout` seconds
+for it, retried by SQLite's busy handler as the other writers commit.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+    def get_connection_params(self):
+        kwargs = super(DatabaseWrapper, self).get_connection_params()
+        self.init_command = kwargs.pop('init_command', None)
+        self.transaction_mode = kwargs.pop('transaction_mode', None)
+        if self.transaction_mode is not None and self.transaction_mode.upper() not in self.TRANSACTION_MODES:
+            raise ImproperlyConfigured("settings.DATABASES['%s']['OPTIONS']['transaction_mode'] must be one of %s"
+                                       % (self.alias, ', '.join(self.TRANSACTION_MODES)))
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super(DatabaseWrapper, self).get_new_connection(conn_params)
+        if self.init_command:
+            for statement in self.init_command.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super(DatabaseWrapper, self)._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute('BEGIN %s' % self.transaction_mode.upper())
@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.1/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
+from whitenoise import WhiteNoise
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'movierama.settings')
 
 application = get_wsgi_application()
+
+# Static files gathered by `collectstatic` are served by WhiteNoise, compressed & with caching headers
+if os.path.isdir(settings.STATIC_ROOT):
+    application = WhiteNoise(application, root=settings.STATIC_ROOT, prefix=settings.STATIC_URL)
@@ -1,4 +1,26 @@
 #!/usr/bin/env bash
+#
+# Usage: ./start.sh [production|dev|reload]
+#
+#   production  initialize the project and serve it with the pre-fork gunicorn server (default)
+#   dev         initialize the project and serve it with Django's autoreloading development server
+#   reload      deploy the current code to the running production server without dropping requests
+
+MODE=${1:-production}
+PIDFILE=${GUNICORN_PIDFILE:-/tmp/movierama-gunicorn.pid}
+
+if [ "$MODE" = "reload" ]; then
+    # A new master with the new code starts its workers on the same socket (writing its pid to $PIDFILE.2),
+    # then the old master lets its workers finish their requests and exits
+    OLD_PID=$(cat "$PIDFILE")
+    kill -USR2 "$OLD_PID"
+    for i in $(seq 30); do
+        [ -f "$PIDFILE.2" ] && break
+        sleep 1
+    done
+    kill -TERM "$OLD_PID"
+    exit
+fi
 
 # Ensure requirements met
 pipenv install --dev
@@ -9,5 +31,39 @@ pipenv run python manage.py migrate
 # Load fixtures
 pipenv run python manage.py loaddata users movies votes
 
+# Fixtures bypass the vote counters, so recompute them
+pipenv run python manage.py reconcile_vote_counts
+
+# Score the movies of the `hot` ordering that were never scored, e.g. loaded from the fixtures
+pipenv run python manage.py update_hot_scores --once
+
 # Start service
-pipenv run python manage.py runserver 0.0.0.0:8000
+if [ "$MODE" = "dev" ]; then
+    pipenv run python manage.py runserver 0.0.0.0:8000
+else
+    # Static files are served by the application from STATIC_ROOT
+    pipenv run python manage.py collectstatic --noinput
+
+    # The Swagger interface serves the prebuilt OpenAPI schema instead of introspecting the API on every request
+    pipenv run python manage.py generate_schema
+
+    # Every worker thread keeps its database connection open across requests
+    export CONN_MAX_AGE=${CONN_MAX_AGE:-600}
+
+    # The workers and background commands share the content version, the cached responses and the users pinned to
+    # the primary database through the file cache, a write through any worker invalidates the responses of them all
+    export CACHE_DIR=${CACHE_DIR:-/tmp/movierama-cache}
+
+    # Safe requests read from a replica when REPLICA_DATABASE is set
+    if [ -n "$REPLICA_DATABASE" ]; then
+        pipenv run python manage.py replicate &
+    fi
+
+    # The hot scores of the movies voted for are updated every HOT_INTERVAL seconds
+    pipenv run python manage.py update_hot_scores &
+
+    # The metrics of all workers are aggregated through a shared directory
+    export METRICS_DIR=${METRICS_DIR:-/tmp/movierama-metrics}
+    export GUNICORN_PIDFILE=$PIDFILE
+    exec pipenv run gunicorn -c movierama/gunicorn.conf.py
+fi